@@ -0,0 +1,52 @@
+"""Độ trễ áp dụng service template vào project (POST /api/projects/{id}/apply-template).
+
+Chạy từ thư mục backend:
+
+    python -m benchmarks.apply_template --shape 25x20x3 --runs 10
+"""
+import argparse
+import asyncio
+import json
+
+from benchmarks.common import server, bench_user, measure, seed_template_tree
+from benchmarks.template_hierarchy import parse_shape
+from indexes import ensure_indexes
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--shape", default="25x20x3", help="services x tasks x components (25x20 = 500 tasks)")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    db = server.db
+    await ensure_indexes(db)
+    user = bench_user()
+    services, tasks, components = parse_shape(args.shape)
+    template_id = await seed_template_tree(services, tasks, components)
+    project = server.Project(name="Bench project", client_id="bench")
+    await db.projects.insert_one(project.dict())
+
+    run = {"n": 0}
+
+    async def apply():
+        run["n"] += 1
+        request = server.ApplyTemplateRequest(template_id=template_id, idempotency_key=str(run["n"]))
+        return await server.apply_template_to_project(project.id, request, current_user=user)
+
+    stats = await measure(apply, runs=args.runs, warmup=1)
+    retry = await server.apply_template_to_project(
+        project.id, server.ApplyTemplateRequest(template_id=template_id, idempotency_key="1"), current_user=user
+    )
+    print(json.dumps({
+        "shape": args.shape,
+        "tasks_per_apply": services * tasks,
+        "retry_created": retry["created"],
+        **stats,
+    }))
+    await db.tasks.delete_many({"project_id": project.id})
+    server.client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+"""Đo tốc độ import hàng loạt (dòng/giây) cho clients, projects và tasks.
+
+Sinh file CSV/NDJSON trong bộ nhớ rồi gọi server.import_records như endpoint
+POST /api/import/{collection}. Chạy từ thư mục backend:
+
+    python -m benchmarks.bulk_import --rows 100000 --format csv
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import random
+import time
+
+from benchmarks.common import server, new_id, pick
+from bulk_import import iter_rows
+from indexes import ensure_indexes
+
+
+def encode(rows, fmt: str) -> io.BytesIO:
+    buffer = io.StringIO()
+    if fmt == "csv":
+        writer = None
+        for row in rows:
+            if writer is None:
+                writer = csv.DictWriter(buffer, fieldnames=list(row))
+                writer.writeheader()
+            writer.writerow({key: json.dumps(value) if isinstance(value, list) else value
+                             for key, value in row.items()})
+    else:
+        for row in rows:
+            buffer.write(json.dumps(row, ensure_ascii=False) + "\n")
+    return io.BytesIO(buffer.getvalue().encode("utf-8"))
+
+
+def client_rows(count: int, rng: random.Random):
+    for index in range(count):
+        yield {"id": new_id(), "name": f"Khách hàng {index}", "company": f"Công ty {index}",
+               "industry": pick(rng, ["retail", "fnb", "education", "tech"]), "tags": ["import"]}
+
+
+def project_rows(count: int, client_ids, rng: random.Random):
+    for index in range(count):
+        yield {"id": new_id(), "name": f"Dự án {index}", "client_id": pick(rng, client_ids),
+               "status": pick(rng, ["planning", "in_progress", "completed"])}
+
+
+def task_rows(count: int, project_ids, rng: random.Random):
+    for index in range(count):
+        yield {"title": f"Công việc {index}", "description": "Thiết kế banner quảng cáo",
+               "project_id": pick(rng, project_ids), "status": pick(rng, ["todo", "in_progress", "completed"]),
+               "priority": pick(rng, ["low", "medium", "high"])}
+
+
+async def timed_import(collection: str, rows, fmt: str):
+    rows = list(rows)
+    payload = encode(rows, fmt)
+    started = time.perf_counter()
+    report = await server.import_records(collection, iter_rows(payload, fmt), created_by="bench")
+    elapsed = time.perf_counter() - started
+    return rows, {
+        "rows": len(rows),
+        "inserted": report["inserted"],
+        "failed": report["failed"],
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(len(rows) / elapsed) if elapsed else None,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000, help="Số task; clients/projects bằng 1/100 và 1/10")
+    parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    args = parser.parse_args()
+
+    db = server.db
+    for collection in ("clients", "projects", "tasks", "dashboard_counters"):
+        await db[collection].drop()
+    await ensure_indexes(db)
+    rng = random.Random(11)
+
+    clients, client_stats = await timed_import("clients", client_rows(max(1, args.rows // 100), rng), args.format)
+    projects, project_stats = await timed_import(
+        "projects", project_rows(max(1, args.rows // 10), [row["id"] for row in clients], rng), args.format
+    )
+    _, task_stats = await timed_import(
+        "tasks", task_rows(args.rows, [row["id"] for row in projects], rng), args.format
+    )
+    print(json.dumps({"format": args.format, "clients": client_stats, "projects": project_stats,
+                      "tasks": task_stats}, indent=2))
+    server.client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,138 @@
+"""Tiện ích dùng chung cho các script benchmark.
+
+Các benchmark chạy trực tiếp với một mongod local (mặc định
+mongodb://localhost:27017, database `crm_benchmark`) và gọi thẳng các
+handler trong server.py, không đi qua mạng.
+"""
+import json
+import os
+import sys
+import time
+import uuid
+import random
+import statistics
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "crm_benchmark")
+
+import server  # noqa: E402
+
+
+def bench_user(role: str = "admin"):
+    """User giả lập để gọi các handler cần current_user"""
+    return server.User(email="bench@example.com", full_name="Benchmark", role=role)
+
+
+def percentile(ordered, fraction: float):
+    """Phân vị theo nearest-rank trên danh sách đã sắp xếp"""
+    return ordered[max(0, int(round(len(ordered) * fraction)) - 1)]
+
+
+def summarize(samples_ms):
+    """Tính p50/p95/p99 (ms) từ danh sách thời gian đo"""
+    ordered = sorted(samples_ms)
+    return {
+        "runs": len(ordered),
+        "p50_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(percentile(ordered, 0.95), 3),
+        "p99_ms": round(percentile(ordered, 0.99), 3),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+async def measure(coro_factory, runs: int = 50, warmup: int = 3):
+    """Chạy coro_factory() nhiều lần và trả về thống kê độ trễ"""
+    for _ in range(warmup):
+        await coro_factory()
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        await coro_factory()
+        samples.append((time.perf_counter() - started) * 1000)
+    return summarize(samples)
+
+
+async def insert_in_batches(collection, docs, batch_size: int = 10_000):
+    """insert_many theo lô để không giữ toàn bộ dữ liệu trong một lệnh"""
+    batch = []
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            await collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        await collection.insert_many(batch, ordered=False)
+
+
+async def asgi_request(app, method: str, path: str, query: str = "", body=None, headers=None):
+    """Gọi ứng dụng ASGI trong tiến trình (không qua mạng); trả về (status, body bytes)"""
+    raw_headers = [(key.lower().encode(), value.encode()) for key, value in (headers or {}).items()]
+    payload = b""
+    if body is not None:
+        payload = json.dumps(body, default=str).encode()
+        raw_headers.append((b"content-type", b"application/json"))
+    raw_headers.append((b"content-length", str(len(payload)).encode()))
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+        "root_path": "", "headers": raw_headers, "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    status = None
+    chunks = []
+
+    async def receive():
+        return {"type": "http.request", "body": payload, "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, b"".join(chunks)
+
+
+def new_id() -> str:
+    return str(uuid.uuid4())
+
+
+def pick(rng: random.Random, values):
+    return values[rng.randrange(len(values))]
+
+
+async def seed_template_tree(services: int, tasks_per_service: int, components_per_task: int) -> str:
+    """Tạo một service template với cây services -> task templates -> components.
+
+    Trả về id của template. Dữ liệu được ghi bằng insert_many theo từng cấp.
+    """
+    db = server.db
+    template = server.ServiceTemplate(name=f"Bench {services}x{tasks_per_service}x{components_per_task}", created_by="bench")
+    service_docs, task_docs, component_docs = [], [], []
+    for s_index in range(services):
+        service = server.Service(template_id=template.id, name=f"Service {s_index}", order_index=s_index,
+                                 estimated_hours=8)
+        service_docs.append(service.dict())
+        for t_index in range(tasks_per_service):
+            task = server.TaskTemplate(service_id=service.id, name=f"Task {s_index}.{t_index}",
+                                       order_index=t_index, estimated_hours=2)
+            task_docs.append(task.dict())
+            for c_index in range(components_per_task):
+                component_docs.append(server.TaskDetailComponent(
+                    task_template_id=task.id, component_type="checklist",
+                    component_data={"items": ["a", "b"]}, order_index=c_index,
+                ).dict())
+    await db.service_templates.insert_one(template.dict())
+    for collection, docs in (
+        (db.services, service_docs),
+        (db.task_templates, task_docs),
+        (db.task_detail_components, component_docs),
+    ):
+        await insert_in_batches(collection, docs)
+    return template.id
@@ -0,0 +1,90 @@
+"""Benchmark GET /api/dashboard ở 10k, 100k và 1M document.
+
+Chạy từ thư mục backend:
+
+    python -m benchmarks.dashboard --sizes 10000 100000 1000000
+"""
+import argparse
+import asyncio
+import json
+import random
+from datetime import datetime, timedelta
+
+from benchmarks.common import server, bench_user, measure, insert_in_batches, new_id, pick
+
+TASK_STATUSES = ["to_do", "in_progress", "review", "completed"]
+PRIORITIES = ["low", "medium", "high", "urgent"]
+
+
+def generate_tasks(count: int, rng: random.Random, user_ids):
+    now = datetime.utcnow()
+    for _ in range(count):
+        yield {
+            "id": new_id(),
+            "title": "Benchmark task",
+            "status": pick(rng, TASK_STATUSES),
+            "priority": pick(rng, PRIORITIES),
+            "assigned_to": pick(rng, user_ids),
+            "due_date": now + timedelta(days=rng.randint(-30, 30)),
+            "created_at": now,
+            "updated_at": now,
+        }
+
+
+def generate_invoices(count: int, rng: random.Random):
+    now = datetime.utcnow()
+    for _ in range(count):
+        yield {
+            "id": new_id(),
+            "client_id": new_id(),
+            "title": "Benchmark invoice",
+            "amount": round(rng.uniform(100, 10_000), 2),
+            "status": pick(rng, server.INVOICE_STATUSES),
+            "due_date": now + timedelta(days=rng.randint(-30, 30)),
+            "created_at": now,
+            "updated_at": now,
+        }
+
+
+def generate_projects(count: int, rng: random.Random):
+    now = datetime.utcnow()
+    for _ in range(count):
+        yield {
+            "id": new_id(),
+            "client_id": new_id(),
+            "name": "Benchmark project",
+            "status": pick(rng, server.PROJECT_STATUSES),
+            "created_at": now,
+            "updated_at": now,
+        }
+
+
+async def seed(size: int, user):
+    rng = random.Random(size)
+    db = server.db
+    for name in ("tasks", "invoices", "projects", "clients", "contracts", "dashboard_counters"):
+        await db[name].drop()
+    user_ids = [user.id] + [new_id() for _ in range(49)]
+    await insert_in_batches(db.tasks, generate_tasks(size, rng, user_ids))
+    await insert_in_batches(db.invoices, generate_invoices(size, rng))
+    await insert_in_batches(db.projects, generate_projects(max(1, size // 10), rng))
+    await insert_in_batches(db.clients, ({"id": new_id(), "name": "c", "company": "c"} for _ in range(max(1, size // 100))))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--runs", type=int, default=30)
+    args = parser.parse_args()
+
+    user = bench_user()
+    results = {}
+    for size in args.sizes:
+        await seed(size, user)
+        results[size] = await measure(lambda: server.get_dashboard_data(current_user=user), runs=args.runs)
+        print(json.dumps({"documents": size, **results[size]}))
+    server.client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+"""Đo thời gian và bộ nhớ (peak RSS) khi export toàn bộ task dạng NDJSON/CSV.
+
+Chạy từ thư mục backend:
+
+    python -m benchmarks.export --tasks 1000000 --format ndjson --max-rss-mb 300
+
+Script thoát với mã 1 nếu peak RSS vượt --max-rss-mb.
+"""
+import argparse
+import asyncio
+import json
+import random
+import resource
+import sys
+import time
+from datetime import datetime, timedelta
+
+from starlette.requests import Request
+
+from benchmarks.common import server, bench_user, insert_in_batches, new_id, pick
+from indexes import ensure_indexes
+
+
+def generate_tasks(count: int, rng: random.Random):
+    started = datetime.utcnow()
+    for index in range(count):
+        updated = started + timedelta(milliseconds=index)
+        yield {
+            "id": new_id(),
+            "title": f"Task {index}",
+            "description": "Mô tả công việc " * rng.randint(1, 10),
+            "status": pick(rng, ["to_do", "in_progress", "review", "completed"]),
+            "priority": pick(rng, ["low", "medium", "high", "urgent"]),
+            "created_at": updated,
+            "updated_at": updated,
+        }
+
+
+def peak_rss_mb() -> float:
+    # Linux trả ru_maxrss theo KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--max-rss-mb", type=float, default=300)
+    parser.add_argument("--skip-seed", action="store_true")
+    args = parser.parse_args()
+
+    db = server.db
+    if not args.skip_seed:
+        await db.tasks.drop()
+        await insert_in_batches(db.tasks, generate_tasks(args.tasks, random.Random(17)), batch_size=5_000)
+    await ensure_indexes(db)
+
+    rss_before = peak_rss_mb()
+    request = Request({"type": "http", "query_string": b"", "headers": []})
+    started = time.perf_counter()
+    response = await server.export_collection(
+        "tasks", request, format=args.format, current_user=bench_user()
+    )
+    total_bytes = 0
+    async for chunk in response.body_iterator:
+        total_bytes += len(chunk)
+    elapsed = time.perf_counter() - started
+    rss_after = peak_rss_mb()
+
+    result = {
+        "tasks": args.tasks,
+        "format": args.format,
+        "seconds": round(elapsed, 2),
+        "rows_per_second": round(args.tasks / elapsed) if elapsed else None,
+        "megabytes": round(total_bytes / 1024 / 1024, 1),
+        "peak_rss_mb_before": round(rss_before, 1),
+        "peak_rss_mb_after": round(rss_after, 1),
+    }
+    print(json.dumps(result, indent=2))
+    server.client.close()
+    if rss_after > args.max_rss_mb:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,218 @@
+"""Load test trong tiến trình: nhiều virtual user gọi ứng dụng ASGI theo các kịch bản.
+
+Thay cho backend_test.py (chỉ chạy tuần tự với URL preview cố định). Ứng dụng chạy
+ngay trong tiến trình (startup/shutdown handler thật, xác thực JWT thật) với mongod
+local. Mỗi kịch bản là một tập request có trọng số; kết quả RPS/p50/p95/p99 theo kịch
+bản và theo endpoint được in ra dạng JSON (key đã sắp xếp) để diff giữa các commit.
+
+Chạy từ thư mục backend:
+
+    python -m benchmarks.loadtest --users 20 --duration 30 --output before.json
+    python -m benchmarks.loadtest --scenario task_board --users 50
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from benchmarks.common import server, asgi_request, summarize, insert_in_batches, pick, seed_template_tree
+from indexes import ensure_indexes
+
+
+# Mỗi request: (trọng số, tên endpoint, hàm sinh (method, path, query, body) từ state và rng)
+SCENARIOS = {
+    "dashboard": [
+        (50, "GET /api/dashboard", lambda s, r: ("GET", "/api/dashboard", "", None)),
+        (25, "GET /api/tasks/stats", lambda s, r: ("GET", "/api/tasks/stats", "", None)),
+        (15, "GET /api/invoices/", lambda s, r: ("GET", "/api/invoices/", "limit=20&sort=-created_at", None)),
+        (10, "GET /api/contracts/", lambda s, r: ("GET", "/api/contracts/", "limit=20", None)),
+    ],
+    "task_board": [
+        (35, "GET /api/tasks/", lambda s, r: (
+            "GET", "/api/tasks/", f"status={pick(r, ['todo', 'in_progress', 'review'])}&limit=50", None)),
+        (20, "GET /api/tasks/project/{project_id}", lambda s, r: (
+            "GET", f"/api/tasks/project/{pick(r, s['project_ids'])}", "", None)),
+        (20, "PATCH /api/tasks/{task_id}", lambda s, r: (
+            "PATCH", f"/api/tasks/{pick(r, s['task_ids'])}", "",
+            {"status": pick(r, ["todo", "in_progress", "review", "completed"])})),
+        (10, "POST /api/tasks/", lambda s, r: (
+            "POST", "/api/tasks/", "",
+            {"title": "Load test task", "project_id": pick(r, s["project_ids"]), "priority": "medium"})),
+        (10, "GET /api/tasks/{task_id}/feedback", lambda s, r: (
+            "GET", f"/api/tasks/{pick(r, s['task_ids'])}/feedback", "", None)),
+        (5, "GET /api/tasks/?search", lambda s, r: ("GET", "/api/tasks/", "search=banner&limit=20", None)),
+    ],
+    "template_editing": [
+        (35, "GET /api/service-templates/{template_id}/hierarchy", lambda s, r: (
+            "GET", f"/api/service-templates/{pick(r, s['template_ids'])}/hierarchy", "", None)),
+        (20, "GET /api/service-templates", lambda s, r: ("GET", "/api/service-templates", "", None)),
+        (20, "GET /api/service-templates/{template_id}/services", lambda s, r: (
+            "GET", f"/api/service-templates/{pick(r, s['template_ids'])}/services", "", None)),
+        (15, "PUT /api/service-templates/{template_id}", lambda s, r: (
+            "PUT", f"/api/service-templates/{pick(r, s['template_ids'])}", "",
+            {"name": f"Template {r.randrange(1000)}", "category": pick(r, ["seo", "ads", "content"])})),
+        (10, "PUT /api/services/reorder", lambda s, r: reorder_request(s, r)),
+    ],
+}
+
+
+def reorder_request(state, rng):
+    template_id = pick(rng, state["template_ids"])
+    services = state["services_by_template"][template_id]
+    return "PUT", "/api/services/reorder", "", {
+        "parent_id": template_id,
+        "move": {"id": pick(rng, services), "after_id": pick(rng, services + [None])},
+    }
+
+
+async def seed(args, rng: random.Random):
+    db = server.db
+    for collection in ("users", "clients", "projects", "tasks", "task_feedbacks", "contracts", "invoices",
+                       "service_templates", "services", "task_templates", "task_detail_components",
+                       "dashboard_counters", "counters", "cache_versions"):
+        await db[collection].drop()
+
+    user = server.UserInDB(
+        email="loadtest@example.com", full_name="Load Test", role="admin",
+        hashed_password=server.get_password_hash("loadtest"),
+    )
+    await db.users.insert_one(user.dict())
+
+    now = datetime.utcnow()
+    clients = [server.Client(name=f"Client {i}", company=f"Company {i}").dict() for i in range(args.clients)]
+    projects = [server.Project(name=f"Project {i}", client_id=pick(rng, clients)["id"]).dict()
+                for i in range(args.clients * 4)]
+    await insert_in_batches(db.clients, clients)
+    await insert_in_batches(db.projects, projects)
+
+    task_ids = []
+
+    def tasks():
+        for i in range(args.tasks):
+            task = server.Task(
+                title=f"Thiết kế banner {i}", project_id=pick(rng, projects)["id"], assigned_to=user.id,
+                due_date=now + timedelta(days=rng.randint(-10, 30)),
+                status=pick(rng, ["todo", "in_progress", "review", "completed"]),
+                priority=pick(rng, ["low", "medium", "high", "urgent"]),
+            ).dict()
+            task["search"] = server.task_search_fields(task)
+            task_ids.append(task["id"])
+            yield task
+
+    await insert_in_batches(db.tasks, tasks())
+    template_ids = [await seed_template_tree(8, 5, 3) for _ in range(args.templates)]
+    services_by_template = defaultdict(list)
+    async for service in db.services.find({"template_id": {"$in": template_ids}}, {"id": 1, "template_id": 1}):
+        services_by_template[service["template_id"]].append(service["id"])
+    await server.reconcile_dashboard_counters()
+
+    token = server.create_access_token({"sub": user.email}, expires_delta=timedelta(hours=1))
+    return {
+        "headers": {"Authorization": f"Bearer {token}"},
+        "project_ids": [project["id"] for project in projects],
+        "task_ids": task_ids,
+        "template_ids": template_ids,
+        "services_by_template": dict(services_by_template),
+    }
+
+
+async def run_scenario(name: str, state, users: int, duration: float, seed_value: int):
+    requests = SCENARIOS[name]
+    weights = [weight for weight, _, _ in requests]
+    samples = defaultdict(list)
+    errors = defaultdict(int)
+    deadline = time.perf_counter() + duration
+
+    async def virtual_user(index: int):
+        rng = random.Random(seed_value * 1000 + index)
+        while time.perf_counter() < deadline:
+            _, label, factory = rng.choices(requests, weights)[0]
+            method, path, query, body = factory(state, rng)
+            started = time.perf_counter()
+            try:
+                status, _ = await asgi_request(server.app, method, path, query, body, state["headers"])
+            except Exception:
+                # Starlette gửi 500 rồi raise lại lỗi: tính là lỗi, không dừng cả lượt chạy
+                status = 500
+            samples[label].append((time.perf_counter() - started) * 1000)
+            if status >= 400:
+                errors[label] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(virtual_user(index) for index in range(users)))
+    elapsed = time.perf_counter() - started
+
+    all_samples = [sample for values in samples.values() for sample in values]
+    return {
+        "users": users,
+        "seconds": round(elapsed, 2),
+        "requests": len(all_samples),
+        "errors": sum(errors.values()),
+        "rps": round(len(all_samples) / elapsed, 1),
+        **({key: value for key, value in summarize(all_samples).items() if key != "runs"} if all_samples else {}),
+        "endpoints": {
+            label: {
+                "requests": len(values),
+                "errors": errors[label],
+                **{key: value for key, value in summarize(values).items() if key != "runs"},
+            }
+            for label, values in samples.items()
+        },
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append",
+                        help="Kịch bản cần chạy (lặp lại được); mặc định chạy tất cả")
+    parser.add_argument("--users", type=int, default=20, help="Số virtual user đồng thời")
+    parser.add_argument("--duration", type=float, default=20, help="Số giây cho mỗi kịch bản")
+    parser.add_argument("--warmup", type=float, default=3, help="Số giây chạy nóng trước mỗi kịch bản")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--tasks", type=int, default=50_000)
+    parser.add_argument("--templates", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Ghi kết quả JSON ra file")
+    args = parser.parse_args()
+
+    for handler in server.app.router.on_startup:
+        await handler()
+    state = await seed(args, random.Random(args.seed))
+    # seed() drop các collection (mất luôn index tạo lúc startup): tạo lại index
+    await ensure_indexes(server.db)
+
+    results = {}
+    for name in args.scenario or sorted(SCENARIOS):
+        if args.warmup:
+            await run_scenario(name, state, args.users, args.warmup, args.seed + 1)
+        results[name] = await run_scenario(name, state, args.users, args.duration, args.seed)
+
+    report = json.dumps({
+        "commit": git_commit(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "scenarios": results,
+    }, indent=2, sort_keys=True)
+    print(report)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(report + "\n")
+
+    for handler in server.app.router.on_shutdown:
+        await handler()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
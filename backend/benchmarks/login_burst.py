@@ -0,0 +1,80 @@
+"""Đo độ trễ của endpoint không liên quan khi có 50 lượt đăng nhập đồng thời.
+
+Chạy từ thư mục backend:
+
+    python -m benchmarks.login_burst --logins 50
+    python -m benchmarks.login_burst --logins 50 --inline   # bcrypt chạy trên event loop (hành vi cũ)
+"""
+import argparse
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+from benchmarks.common import server, summarize
+
+EMAIL = "burst@example.com"
+PASSWORD = "burst-password"
+
+
+async def ensure_user():
+    await server.db.users.delete_many({"email": EMAIL})
+    user = server.UserInDB(
+        email=EMAIL, full_name="Burst", role="staff",
+        hashed_password=server.get_password_hash(PASSWORD),
+    )
+    await server.db.users.insert_one(user.dict())
+
+
+async def probe(stop: asyncio.Event, samples, interval: float = 0.005):
+    """Gọi liên tục một endpoint nhẹ và ghi lại độ trễ"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await server.health_check()
+        await asyncio.sleep(0)
+        samples.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(interval)
+
+
+async def run_burst(logins: int):
+    form = SimpleNamespace(username=EMAIL, password=PASSWORD)
+    stop = asyncio.Event()
+    samples = []
+    probe_task = asyncio.create_task(probe(stop, samples))
+    await asyncio.sleep(0.1)
+    baseline = list(samples)
+    started = time.perf_counter()
+    await asyncio.gather(*(server.login_for_access_token(form_data=form) for _ in range(logins)))
+    burst_seconds = time.perf_counter() - started
+    stop.set()
+    await probe_task
+    return baseline, samples[len(baseline):], burst_seconds
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--inline", action="store_true", help="verify bcrypt directly on the event loop")
+    args = parser.parse_args()
+
+    if args.inline:
+        async def inline_verify(plain, hashed):
+            return server.verify_password(plain, hashed)
+        server.verify_password_async = inline_verify
+
+    await ensure_user()
+    baseline, during, burst_seconds = await run_burst(args.logins)
+    print(json.dumps({
+        "mode": "inline" if args.inline else "pool",
+        "logins": args.logins,
+        "burst_seconds": round(burst_seconds, 3),
+        "probe_idle": summarize(baseline) if baseline else None,
+        "probe_during_burst": summarize(during) if during else None,
+        "pool": server.password_hash_pool.stats(),
+    }, indent=2))
+    await server.db.users.delete_many({"email": EMAIL})
+    server.client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
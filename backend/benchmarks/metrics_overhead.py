@@ -0,0 +1,82 @@
+"""Đo chi phí của metrics Prometheus (middleware + CommandListener) trên một route thật.
+
+So sánh cùng một request GET /api/tasks/?limit=20 qua:
+- baseline: router không có middleware, Motor client không có listener
+- metrics: PrometheusMiddleware + Motor client có MongoCommandMetrics/MongoPoolMetrics
+
+Chạy từ thư mục backend (cần mongod local), thoát mã 1 nếu overhead p50 vượt --max-overhead:
+
+    python -m benchmarks.metrics_overhead --runs 2000
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from benchmarks.common import server, asgi_request, bench_user, measure, insert_in_batches, new_id, pick
+from metrics import MongoCommandMetrics, MongoPoolMetrics, PrometheusMiddleware
+
+
+async def call(app, path: str, query: str = ""):
+    status, body = await asgi_request(app, "GET", path, query)
+    assert status == 200, body
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=1_000)
+    parser.add_argument("--runs", type=int, default=2_000)
+    parser.add_argument("--max-overhead", type=float, default=0.02)
+    args = parser.parse_args()
+
+    db_name = server.db.name
+    rng = random.Random(3)
+    await server.db.tasks.drop()
+    await insert_in_batches(server.db.tasks, ({
+        "id": new_id(), "title": f"Task {index}", "status": pick(rng, ["todo", "completed"]),
+        "priority": "medium", "version": 0,
+    } for index in range(args.tasks)))
+    server.app.dependency_overrides[server.get_current_active_user] = bench_user
+
+    plain_client = AsyncIOMotorClient(server.mongo_url)
+    instrumented_client = AsyncIOMotorClient(
+        server.mongo_url, event_listeners=[MongoCommandMetrics(), MongoPoolMetrics()]
+    )
+    router = server.app.router
+    instrumented = PrometheusMiddleware(router)
+
+    async def baseline_request():
+        server.db = plain_client[db_name]
+        await call(router, "/api/tasks/", "limit=20")
+
+    async def metrics_request():
+        server.db = instrumented_client[db_name]
+        await call(instrumented, "/api/tasks/", "limit=20")
+
+    # Xen kẽ hai vòng đo để giảm ảnh hưởng của nhiễu theo thời gian
+    results = {"baseline": [], "metrics": []}
+    for _ in range(2):
+        results["baseline"].append(await measure(baseline_request, runs=args.runs // 2, warmup=50))
+        results["metrics"].append(await measure(metrics_request, runs=args.runs // 2, warmup=50))
+    baseline = min(stats["p50_ms"] for stats in results["baseline"])
+    with_metrics = min(stats["p50_ms"] for stats in results["metrics"])
+    overhead = (with_metrics - baseline) / baseline
+    print(json.dumps({
+        "baseline_p50_ms": baseline,
+        "metrics_p50_ms": with_metrics,
+        "overhead": round(overhead, 4),
+        "runs": results,
+    }, indent=2))
+
+    plain_client.close()
+    instrumented_client.close()
+    server.client.close()
+    if overhead > args.max_overhead:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,67 @@
+"""So sánh độ trễ trang sâu giữa skip/limit và cursor trên 1M task.
+
+Chạy từ thư mục backend:
+
+    python -m benchmarks.pagination --tasks 1000000 --depths 0 10000 100000 900000
+"""
+import argparse
+import asyncio
+import json
+import random
+from datetime import datetime, timedelta
+
+from starlette.responses import Response
+
+from benchmarks.common import server, bench_user, measure, insert_in_batches, new_id, pick
+from indexes import ensure_indexes
+from pagination import encode_cursor
+
+PAGE_SIZE = 100
+
+
+def generate_tasks(count: int, rng: random.Random):
+    start = datetime(2024, 1, 1)
+    for i in range(count):
+        yield {
+            "id": new_id(),
+            "title": f"Task {i}",
+            "status": pick(rng, ["todo", "in_progress", "review", "completed"]),
+            "priority": pick(rng, ["low", "medium", "high", "urgent"]),
+            "created_at": start + timedelta(seconds=i),
+            "updated_at": start + timedelta(seconds=i),
+        }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--depths", type=int, nargs="+", default=[0, 10_000, 100_000, 900_000])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--skip-seed", action="store_true")
+    args = parser.parse_args()
+
+    db = server.db
+    if not args.skip_seed:
+        await db.tasks.drop()
+        await insert_in_batches(db.tasks, generate_tasks(args.tasks, random.Random(42)))
+    await ensure_indexes(db)
+    user = bench_user()
+
+    for depth in args.depths:
+        anchor = None
+        if depth:
+            anchor = await db.tasks.find().sort([("created_at", 1), ("id", 1)]).skip(depth - 1).limit(1).to_list(1)
+        cursor = encode_cursor("created_at", 1, anchor[0]) if anchor else None
+
+        skip_stats = await measure(lambda: server.read_tasks(
+            response=Response(), skip=depth, limit=PAGE_SIZE, current_user=user
+        ), runs=args.runs)
+        cursor_stats = await measure(lambda: server.read_tasks(
+            response=Response(), limit=PAGE_SIZE, sort="created_at", cursor=cursor, current_user=user
+        ), runs=args.runs)
+        print(json.dumps({"depth": depth, "skip": skip_stats, "cursor": cursor_stats}))
+    server.client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,77 @@
+"""So sánh throughput serialize một response 1.000 task.
+
+- fastapi: đường mặc định (validate response_model + jsonable_encoder + json.dumps)
+- fastapi_orjson: như trên nhưng render bằng ORJSONResponse
+- trusted: serialization.dump_trusted (model_construct + TypeAdapter.dump_json)
+
+Không cần MongoDB. Chạy từ thư mục backend:
+
+    python -m benchmarks.serialization --rows 1000 --runs 200
+"""
+import argparse
+import asyncio
+import json
+import random
+from datetime import datetime, timedelta
+from typing import List
+
+from bson import ObjectId
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from benchmarks.common import server, measure, new_id, pick
+from serialization import dump_trusted, orjson
+
+
+def generate_docs(count: int, rng: random.Random):
+    now = datetime.utcnow()
+    return [{
+        "_id": ObjectId(),
+        "id": new_id(),
+        "title": f"Công việc {index}",
+        "project_id": new_id(),
+        "description": "Thiết kế banner quảng cáo cho chiến dịch tháng " * 3,
+        "rich_content": "<p>Nội dung chi tiết</p>" * 5,
+        "assigned_to": new_id(),
+        "due_date": now + timedelta(days=rng.randint(0, 30)),
+        "priority": pick(rng, ["low", "medium", "high", "urgent"]),
+        "status": pick(rng, ["todo", "in_progress", "review", "completed"]),
+        "created_at": now,
+        "updated_at": now,
+        "created_by": new_id(),
+        "version": 0,
+        "search": {"title": f"cong viec {index}", "description": "thiet ke banner", "content": "noi dung"},
+    } for index in range(count)]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    docs = generate_docs(args.rows, random.Random(5))
+    trusted_docs = [{key: value for key, value in doc.items() if key != "_id"} for doc in docs]
+    field = create_response_field(name="response", type_=List[server.Task])
+
+    async def fastapi_default(response_class):
+        # Handler cũ dựng model cho từng dòng, FastAPI validate lại theo response_model
+        content = [server.Task(**doc) for doc in docs]
+        return response_class(await serialize_response(field=field, response_content=content)).body
+
+    async def trusted():
+        return dump_trusted(server.Task, trusted_docs)
+
+    results = {"fastapi": await measure(lambda: fastapi_default(JSONResponse), runs=args.runs)}
+    if orjson is not None:
+        results["fastapi_orjson"] = await measure(lambda: fastapi_default(ORJSONResponse), runs=args.runs)
+    results["trusted"] = await measure(trusted, runs=args.runs)
+    for stats in results.values():
+        stats["rows_per_second"] = round(args.rows / stats["p50_ms"] * 1000)
+    print(json.dumps({"rows": args.rows, **results}, indent=2))
+    server.client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
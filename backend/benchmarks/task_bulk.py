@@ -0,0 +1,57 @@
+"""Đo POST /api/tasks/bulk với số thao tác tăng dần để kiểm tra chi phí tuyến tính.
+
+Mỗi vòng: tạo N task, chuyển N task sang completed, phân công lại N task, xóa N task.
+Chạy từ thư mục backend:
+
+    python -m benchmarks.task_bulk --sizes 100 1000 10000
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.common import server, bench_user
+from indexes import ensure_indexes
+
+
+async def timed(user, operations):
+    started = time.perf_counter()
+    result = await server.bulk_tasks(server.TaskBulkRequest(operations=operations), current_user=user)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    return result, {
+        "applied": result["applied"],
+        "failed": result["failed"],
+        "ms": round(elapsed_ms, 1),
+        "us_per_item": round(elapsed_ms * 1000 / len(operations), 1),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1_000, 10_000])
+    args = parser.parse_args()
+
+    db = server.db
+    await db.tasks.drop()
+    await ensure_indexes(db)
+    user = bench_user()
+
+    report = {}
+    for size in args.sizes:
+        created, create_stats = await timed(user, [
+            {"op": "create", "task": {"title": f"Bulk task {index}", "priority": "high"}} for index in range(size)
+        ])
+        ids = [item["id"] for item in created["results"]]
+        _, status_stats = await timed(user, [{"op": "set_status", "id": task_id, "status": "completed"} for task_id in ids])
+        _, reassign_stats = await timed(user, [{"op": "reassign", "id": task_id, "assigned_to": "u2"} for task_id in ids])
+        _, delete_stats = await timed(user, [{"op": "delete", "id": task_id} for task_id in ids])
+        report[size] = {
+            "create": create_stats, "set_status": status_stats,
+            "reassign": reassign_stats, "delete": delete_stats,
+        }
+    print(json.dumps(report, indent=2))
+    server.client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
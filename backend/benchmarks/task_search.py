@@ -0,0 +1,75 @@
+"""So sánh độ trễ tìm kiếm task: $regex (cũ) và text index, trên 500k task.
+
+Chạy từ thư mục backend:
+
+    python -m benchmarks.task_search --tasks 500000 --query "thiết kế"
+"""
+import argparse
+import asyncio
+import json
+import random
+from datetime import datetime
+
+from starlette.responses import Response
+
+from benchmarks.common import server, bench_user, measure, insert_in_batches, new_id, pick
+from indexes import ensure_indexes
+from search import task_search_fields
+
+WORDS = [
+    "thiết", "kế", "banner", "quảng", "cáo", "đề", "xuất", "nội", "dung", "bài", "viết",
+    "chiến", "dịch", "facebook", "báo", "cáo", "tháng", "khách", "hàng", "duyệt", "video",
+    "landing", "page", "sửa", "logo", "đăng", "tải", "hình", "ảnh", "kịch", "bản",
+]
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    return " ".join(pick(rng, WORDS) for _ in range(words))
+
+
+def generate_tasks(count: int, rng: random.Random):
+    now = datetime.utcnow()
+    for _ in range(count):
+        task = {
+            "id": new_id(),
+            "title": sentence(rng, 5).capitalize(),
+            "description": sentence(rng, 20),
+            "rich_content": "".join(f"<p>{sentence(rng, 40)}</p>" for _ in range(rng.randint(1, 20))),
+            "status": pick(rng, ["todo", "in_progress", "review", "completed"]),
+            "priority": pick(rng, ["low", "medium", "high", "urgent"]),
+            "created_at": now,
+            "updated_at": now,
+        }
+        task["search"] = task_search_fields(task)
+        yield task
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=500_000)
+    parser.add_argument("--query", default="thiết kế")
+    parser.add_argument("--status", default=None)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--skip-seed", action="store_true")
+    args = parser.parse_args()
+
+    db = server.db
+    if not args.skip_seed:
+        await db.tasks.drop()
+        await insert_in_batches(db.tasks, generate_tasks(args.tasks, random.Random(7)), batch_size=5_000)
+    await ensure_indexes(db)
+    await server.refresh_task_search_ready()
+    user = bench_user()
+
+    results = {}
+    for mode in ("regex", "text"):
+        results[mode] = await measure(lambda: server.read_tasks(
+            response=Response(), search=args.query, search_mode=mode,
+            status=args.status, current_user=user
+        ), runs=args.runs, warmup=1)
+    print(json.dumps({"tasks": args.tasks, "query": args.query, **results}, indent=2))
+    server.client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,39 @@
+"""Độ trễ sao chép service template theo kích thước cây.
+
+Chạy từ thư mục backend:
+
+    python -m benchmarks.template_clone --shapes 5x5x3 20x15x5 10x10x9
+"""
+import argparse
+import asyncio
+import json
+
+from benchmarks.common import server, bench_user, measure, seed_template_tree
+from benchmarks.template_hierarchy import parse_shape
+from indexes import ensure_indexes
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--shapes", nargs="+", default=["5x5x3", "20x15x5", "10x10x9"])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    db = server.db
+    for name in ("service_templates", "services", "task_templates", "task_detail_components"):
+        await db[name].drop()
+    await ensure_indexes(db)
+    user = bench_user()
+
+    for shape in args.shapes:
+        services, tasks, components = parse_shape(shape)
+        template_id = await seed_template_tree(services, tasks, components)
+        stats = await measure(lambda: server.clone_service_template(template_id, current_user=user),
+                              runs=args.runs, warmup=1)
+        nodes = 1 + services + services * tasks + services * tasks * components
+        print(json.dumps({"shape": shape, "nodes": nodes, **stats}))
+    server.client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,46 @@
+"""Độ trễ xóa cascade một service template theo kích thước cây.
+
+Chạy từ thư mục backend (nên dùng replica set một node để đo cả transaction):
+
+    python -m benchmarks.template_delete --shapes 5x5x3 20x15x5 50x20x10
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.common import server, bench_user, seed_template_tree, summarize
+from benchmarks.template_hierarchy import parse_shape
+from indexes import ensure_indexes
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--shapes", nargs="+", default=["5x5x3", "20x15x5", "50x20x10"])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    db = server.db
+    await ensure_indexes(db)
+    user = bench_user()
+
+    for shape in args.shapes:
+        services, tasks, components = parse_shape(shape)
+        samples = []
+        deleted = None
+        for _ in range(args.runs):
+            template_id = await seed_template_tree(services, tasks, components)
+            started = time.perf_counter()
+            deleted = await server.delete_service_template(template_id, current_user=user)
+            samples.append((time.perf_counter() - started) * 1000)
+        print(json.dumps({
+            "shape": shape,
+            "transactions": server.transactions_supported,
+            "deleted": deleted["deleted"],
+            **summarize(samples),
+        }))
+    server.client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,43 @@
+"""Độ trễ đọc cây template (GET /api/service-templates/{id}/hierarchy) theo kích thước cây.
+
+Đo load_template_hierarchy, tức đường đọc MongoDB khi cache không có sẵn.
+
+Chạy từ thư mục backend:
+
+    python -m benchmarks.template_hierarchy --shapes 5x5x3 20x15x5 50x20x10
+"""
+import argparse
+import asyncio
+import json
+
+from benchmarks.common import server, measure, seed_template_tree
+from indexes import ensure_indexes
+
+
+def parse_shape(shape: str):
+    services, tasks, components = (int(part) for part in shape.split("x"))
+    return services, tasks, components
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--shapes", nargs="+", default=["5x5x3", "20x15x5", "50x20x10"])
+    parser.add_argument("--runs", type=int, default=30)
+    args = parser.parse_args()
+
+    db = server.db
+    for name in ("service_templates", "services", "task_templates", "task_detail_components"):
+        await db[name].drop()
+    await ensure_indexes(db)
+
+    for shape in args.shapes:
+        services, tasks, components = parse_shape(shape)
+        template_id = await seed_template_tree(services, tasks, components)
+        stats = await measure(lambda: server.load_template_hierarchy(template_id), runs=args.runs)
+        nodes = services + services * tasks + services * tasks * components
+        print(json.dumps({"shape": shape, "nodes": nodes, **stats}))
+    server.client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,295 @@
+"""Bộ nhớ đệm trong tiến trình (TTL + LRU), tầng Redis tùy chọn và cache theo version."""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # redis là tùy chọn
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Cache có giới hạn kích thước (LRU) và thời gian sống (TTL) cho mỗi key"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        self._data[key] = (self._clock() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class TieredCache:
+    """TTLCache cục bộ, phía sau là Redis (nếu có) dùng chung giữa các worker uvicorn.
+
+    Giá trị được lưu trên Redis dưới dạng JSON; dùng `dumps`/`loads` để chuyển
+    đổi đối tượng. Nếu không cấu hình redis_url (hoặc thiếu thư viện redis),
+    cache chỉ hoạt động trong tiến trình.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        maxsize: int = 1024,
+        ttl: float = 60.0,
+        redis_url: Optional[str] = None,
+        dumps: Callable[[Any], str] = json.dumps,
+        loads: Callable[[str], Any] = json.loads,
+    ):
+        self.namespace = namespace
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._dumps = dumps
+        self._loads = loads
+        self.redis = None
+        self.redis_hits = 0
+        self.redis_misses = 0
+        if redis_url:
+            if aioredis is None:
+                logger.warning("REDIS_URL is set but the redis package is not installed; using local cache only")
+            else:
+                self.redis = aioredis.from_url(redis_url)
+
+    def _redis_key(self, key: Hashable) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key: Hashable) -> Any:
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if self.redis is None:
+            return None
+        try:
+            raw = await self.redis.get(self._redis_key(key))
+        except Exception as exc:
+            logger.warning("Redis cache read failed: %s", exc)
+            return None
+        if raw is None:
+            self.redis_misses += 1
+            return None
+        self.redis_hits += 1
+        value = self._loads(raw)
+        self.local.set(key, value)
+        return value
+
+    async def set(self, key: Hashable, value: Any):
+        self.local.set(key, value)
+        if self.redis is not None:
+            try:
+                await self.redis.set(self._redis_key(key), self._dumps(value), ex=max(1, int(self.local.ttl)))
+            except Exception as exc:
+                logger.warning("Redis cache write failed: %s", exc)
+
+    async def invalidate(self, key: Hashable):
+        self.local.invalidate(key)
+        if self.redis is not None:
+            try:
+                await self.redis.delete(self._redis_key(key))
+            except Exception as exc:
+                logger.warning("Redis cache invalidation failed: %s", exc)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.local.stats()
+        stats["redis"] = (
+            {"hits": self.redis_hits, "misses": self.redis_misses} if self.redis is not None else None
+        )
+        return stats
+
+
+class LocalPubSub:
+    """Pub/sub trong tiến trình, dùng khi chỉ có một worker (hoặc trong test)"""
+
+    def __init__(self):
+        self._subscribers: Dict[str, List[Callable[[dict], None]]] = {}
+
+    def subscribe(self, channel: str, callback: Callable[[dict], None]):
+        self._subscribers.setdefault(channel, []).append(callback)
+
+    async def publish(self, channel: str, message: dict):
+        for callback in self._subscribers.get(channel, []):
+            callback(message)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+
+class RedisPubSub(LocalPubSub):
+    """Pub/sub qua Redis để mọi worker uvicorn nhận cùng thông điệp.
+
+    Thông điệp do chính tiến trình gửi cũng được gọi callback ngay khi publish,
+    không phải chờ vòng qua Redis.
+    """
+
+    def __init__(self, redis_url: str):
+        super().__init__()
+        self.redis = aioredis.from_url(redis_url)
+        self.origin = uuid.uuid4().hex
+        self._listener: Optional[asyncio.Task] = None
+
+    async def publish(self, channel: str, message: dict):
+        await super().publish(channel, message)
+        try:
+            await self.redis.publish(channel, json.dumps({"origin": self.origin, "message": message}))
+        except Exception as exc:
+            logger.warning("Redis publish on %s failed: %s", channel, exc)
+
+    async def start(self):
+        if self._listener is None and self._subscribers:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+
+    async def _listen(self):
+        pubsub = self.redis.pubsub()
+        await pubsub.subscribe(*self._subscribers.keys())
+        while True:
+            try:
+                raw = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                await pubsub.close()
+                raise
+            except Exception as exc:
+                logger.warning("Redis pubsub read failed: %s", exc)
+                await asyncio.sleep(1.0)
+                continue
+            if raw is None:
+                continue
+            envelope = json.loads(raw["data"])
+            if envelope.get("origin") == self.origin:
+                continue
+            channel = raw["channel"].decode() if isinstance(raw["channel"], bytes) else raw["channel"]
+            for callback in self._subscribers.get(channel, []):
+                callback(envelope["message"])
+
+
+def make_pubsub(redis_url: Optional[str] = None) -> LocalPubSub:
+    if redis_url and aioredis is not None:
+        return RedisPubSub(redis_url)
+    return LocalPubSub()
+
+
+class VersionedCache:
+    """Cache đọc theo scope + version stamp.
+
+    Mỗi scope (ví dụ một service template) có một version stamp lưu trong
+    collection `versions_collection`. Entry được lưu dưới key
+    (scope, version, key) nên khi version đổi, entry cũ tự động không còn được
+    dùng. `bump` ghi version mới rồi phát qua pub/sub để các worker khác cập
+    nhật bản sao version cục bộ. Version cục bộ cũng có TTL ngắn để tự sửa nếu
+    lỡ mất thông điệp.
+    """
+
+    def __init__(
+        self,
+        versions_collection,
+        pubsub: LocalPubSub,
+        channel: str,
+        maxsize: int = 2048,
+        ttl: float = 300.0,
+        version_ttl: float = 30.0,
+    ):
+        self._versions_collection = versions_collection
+        self.pubsub = pubsub
+        self.channel = channel
+        self.entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.versions = TTLCache(maxsize=maxsize, ttl=version_ttl)
+        # Ánh xạ con -> template (service -> template, task template -> service, ...)
+        self.parents = TTLCache(maxsize=maxsize * 4, ttl=ttl)
+        pubsub.subscribe(channel, self._on_message)
+
+    def _on_message(self, message: dict):
+        for scope, version in message.get("versions", {}).items():
+            self.versions.set(scope, version)
+        for key in message.get("forget", []):
+            self.parents.invalidate(tuple(key))
+
+    async def version(self, scope: str) -> str:
+        version = self.versions.get(scope)
+        if version is None:
+            doc = await self._versions_collection.find_one({"_id": scope})
+            version = doc["version"] if doc else "0"
+            self.versions.set(scope, version)
+        return version
+
+    def get(self, scope: str, version: str, key: Hashable, default: Any = None) -> Any:
+        return self.entries.get((scope, version, key), default)
+
+    def put(self, scope: str, version: str, key: Hashable, value: Any):
+        self.entries.set((scope, version, key), value)
+
+    async def bump(self, scopes: Iterable[str], forget: Iterable[tuple] = ()):
+        """Đổi version của các scope (sau khi dữ liệu đã ghi xong)"""
+        versions = {scope: uuid.uuid4().hex[:16] for scope in set(scopes)}
+        forget = [list(key) for key in forget]
+        for scope, version in versions.items():
+            await self._versions_collection.update_one(
+                {"_id": scope}, {"$set": {"version": version}}, upsert=True
+            )
+        await self.pubsub.publish(self.channel, {"versions": versions, "forget": forget})
+
+    async def get_or_load(self, scope: str, key: Hashable, loader: Callable[[], Awaitable[Any]]):
+        """Trả về (version, value), gọi loader khi chưa có trong cache"""
+        version = await self.version(scope)
+        value = self.get(scope, version, key, _MISSING)
+        if value is _MISSING:
+            value = await loader()
+            self.put(scope, version, key, value)
+        return version, value
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": self.entries.stats(), "versions": self.versions.stats(), "parents": self.parents.stats()}
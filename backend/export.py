@@ -0,0 +1,67 @@
+"""Xuất dữ liệu dạng NDJSON/CSV theo luồng.
+
+Dữ liệu đọc thẳng từ Motor cursor (batch lớn) và được ghi ra theo từng khối,
+không đi qua `to_list` hay Pydantic nên bộ nhớ không tăng theo số bản ghi.
+Thứ tự xuất là (updated_at, id) tăng dần: client lưu `updated_at` của dòng
+cuối cùng làm watermark và gọi lại với `since=...` để lấy phần thay đổi.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Dict, Iterable, List
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _json_default(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def ndjson_line(doc: Dict[str, Any]) -> str:
+    return json.dumps(doc, ensure_ascii=False, default=_json_default) + "\n"
+
+
+def csv_value(value: Any) -> Any:
+    """Giá trị một ô CSV: list/dict được ghi dạng JSON, datetime dạng ISO"""
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False, default=_json_default)
+    return value
+
+
+async def stream_export(
+    cursor, fmt: str, fields: List[str], rows_per_chunk: int = 1000
+) -> AsyncIterator[bytes]:
+    """Sinh các khối bytes từ cursor; mỗi khối gồm tối đa rows_per_chunk dòng"""
+    buffer = io.StringIO()
+    writer = None
+    if fmt == "csv":
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+    rows = 0
+    async for doc in cursor:
+        if writer is not None:
+            writer.writerow([csv_value(doc.get(field)) for field in fields])
+        else:
+            buffer.write(ndjson_line(doc))
+        rows += 1
+        if rows % rows_per_chunk == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def export_projection(fields: Iterable[str]) -> Dict[str, int]:
+    """Chỉ lấy các field của model, bỏ _id"""
+    return {"_id": 0, **{field: 1 for field in fields}}
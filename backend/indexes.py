@@ -0,0 +1,186 @@
+"""Khai báo tập trung các index MongoDB cho mọi collection.
+
+`ensure_indexes` tạo index còn thiếu (idempotent, chạy lúc startup hoặc qua
+`python manage.py indexes apply`); `index_drift` so sánh index khai báo với
+index thực tế trên server.
+"""
+import logging
+from typing import Any, Dict, List
+
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Các option được so sánh khi phát hiện độ lệch
+COMPARED_OPTIONS = ("unique", "sparse", "partialFilterExpression", "expireAfterSeconds")
+
+
+def _id_index(collection: str) -> IndexModel:
+    return IndexModel([("id", ASCENDING)], name=f"{collection}_id", unique=True)
+
+
+def _keyset_index(collection: str, field: str) -> IndexModel:
+    """Index (field, id) cho phân trang keyset; pagination.py suy ra các field sort hợp lệ từ đây"""
+    return IndexModel([(field, ASCENDING), ("id", ASCENDING)], name=f"{collection}_{field}_id")
+
+
+INDEX_SPECS: Dict[str, List[IndexModel]] = {
+    "users": [
+        _id_index("users"),
+        IndexModel([("email", ASCENDING)], name="users_email", unique=True),
+        _keyset_index("users", "created_at"),
+    ],
+    "clients": [
+        _id_index("clients"),
+        _keyset_index("clients", "created_at"),
+        _keyset_index("clients", "updated_at"),
+        _keyset_index("clients", "name"),
+    ],
+    "projects": [
+        _id_index("projects"),
+        IndexModel([("client_id", ASCENDING)], name="projects_client_id"),
+        IndexModel([("status", ASCENDING)], name="projects_status"),
+        _keyset_index("projects", "created_at"),
+        _keyset_index("projects", "updated_at"),
+    ],
+    "tasks": [
+        _id_index("tasks"),
+        IndexModel([("project_id", ASCENDING)], name="tasks_project_id"),
+        IndexModel([("assigned_to", ASCENDING)], name="tasks_assigned_to"),
+        IndexModel([("status", ASCENDING), ("priority", ASCENDING)], name="tasks_status_priority"),
+        IndexModel([("priority", ASCENDING)], name="tasks_priority"),
+        IndexModel([("due_date", ASCENDING), ("status", ASCENDING)], name="tasks_due_date_status"),
+        IndexModel(
+            [("status", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)],
+            name="tasks_status_created_at_id",
+        ),
+        _keyset_index("tasks", "created_at"),
+        _keyset_index("tasks", "updated_at"),
+        _keyset_index("tasks", "due_date"),
+        # Field `search` do search.task_search_fields sinh ra (đã bỏ dấu, bỏ HTML)
+        IndexModel(
+            [("search.title", TEXT), ("search.description", TEXT), ("search.content", TEXT)],
+            name="tasks_search_text",
+            weights={"search.title": 10, "search.description": 2, "search.content": 1},
+            default_language="none",
+        ),
+    ],
+    "task_feedbacks": [
+        _id_index("task_feedbacks"),
+        IndexModel([("task_id", ASCENDING), ("created_at", ASCENDING)], name="task_feedbacks_task_id_created_at"),
+    ],
+    "contracts": [
+        _id_index("contracts"),
+        IndexModel([("client_id", ASCENDING)], name="contracts_client_id"),
+        IndexModel([("project_id", ASCENDING)], name="contracts_project_id"),
+        IndexModel([("status", ASCENDING), ("end_date", ASCENDING)], name="contracts_status_end_date"),
+        _keyset_index("contracts", "created_at"),
+        _keyset_index("contracts", "updated_at"),
+        _keyset_index("contracts", "end_date"),
+    ],
+    "invoices": [
+        _id_index("invoices"),
+        IndexModel([("client_id", ASCENDING)], name="invoices_client_id"),
+        IndexModel([("project_id", ASCENDING)], name="invoices_project_id"),
+        IndexModel([("contract_id", ASCENDING)], name="invoices_contract_id"),
+        IndexModel([("status", ASCENDING)], name="invoices_status"),
+        IndexModel([("invoice_number", ASCENDING)], name="invoices_invoice_number", unique=True),
+        _keyset_index("invoices", "created_at"),
+        _keyset_index("invoices", "updated_at"),
+        _keyset_index("invoices", "due_date"),
+    ],
+    "service_templates": [
+        _id_index("service_templates"),
+        IndexModel([("created_at", DESCENDING)], name="service_templates_created_at"),
+        IndexModel([("category", ASCENDING), ("created_at", DESCENDING)], name="service_templates_category_created_at"),
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING)], name="service_templates_status_created_at"),
+    ],
+    "services": [
+        _id_index("services"),
+        IndexModel([("template_id", ASCENDING), ("order_index", ASCENDING)], name="services_template_id_order_index"),
+    ],
+    "task_templates": [
+        _id_index("task_templates"),
+        IndexModel([("service_id", ASCENDING), ("order_index", ASCENDING)], name="task_templates_service_id_order_index"),
+    ],
+    "task_detail_components": [
+        _id_index("task_detail_components"),
+        IndexModel(
+            [("task_template_id", ASCENDING), ("order_index", ASCENDING)],
+            name="task_detail_components_task_template_id_order_index",
+        ),
+    ],
+}
+
+
+def _normalize(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Rút gọn định nghĩa index về dạng so sánh được (key + option quan trọng)"""
+    keys = spec["key"]
+    keys = list(keys.items()) if hasattr(keys, "items") else list(keys)
+    text_fields = [field for field, direction in keys if direction == TEXT]
+    if text_fields:
+        # Server lưu text index dưới dạng key _fts/_ftsx kèm weights đầy đủ
+        if "textIndexVersion" in spec:
+            weights = dict(spec.get("weights") or {})
+        else:
+            weights = {field: 1 for field in text_fields}
+            weights.update(spec.get("weights") or {})
+        return {
+            "key": [("_fts", TEXT), ("_ftsx", 1)],
+            "weights": dict(sorted(weights.items())),
+            "default_language": spec.get("default_language", "english"),
+        }
+    normalized = {"key": [(field, direction) for field, direction in keys]}
+    for option in COMPARED_OPTIONS:
+        if spec.get(option) is not None:
+            normalized[option] = spec[option]
+    return normalized
+
+
+async def ensure_indexes(db, specs: Dict[str, List[IndexModel]] = INDEX_SPECS) -> Dict[str, List[str]]:
+    """Tạo các index khai báo còn thiếu. Index đã tồn tại được bỏ qua.
+
+    Mỗi index được tạo riêng: lỗi của một index (ví dụ dữ liệu cũ trùng với index
+    unique) được ghi log và không chặn các index còn lại, kể cả trên cùng collection.
+    """
+    created: Dict[str, List[str]] = {}
+    for collection, models in specs.items():
+        names = []
+        for model in models:
+            try:
+                names.extend(await db[collection].create_indexes([model]))
+            except OperationFailure as exc:
+                logger.error("Failed to create index %s on %s: %s", model.document["name"], collection, exc)
+        created[collection] = names
+    return created
+
+
+async def index_drift(db, specs: Dict[str, List[IndexModel]] = INDEX_SPECS) -> Dict[str, Dict[str, Any]]:
+    """So sánh index khai báo và index thực tế.
+
+    Trả về theo collection: `missing` (khai báo nhưng chưa có), `extra` (có trên
+    server nhưng không khai báo) và `changed` (cùng tên nhưng khác định nghĩa).
+    Collection không lệch sẽ không xuất hiện trong kết quả.
+    """
+    drift: Dict[str, Dict[str, Any]] = {}
+    existing_collections = set(await db.list_collection_names())
+    for collection, models in specs.items():
+        declared = {model.document["name"]: _normalize(model.document) for model in models}
+        live = {}
+        if collection in existing_collections:
+            info = await db[collection].index_information()
+            live = {name: _normalize(spec) for name, spec in info.items() if name != "_id_"}
+
+        report = {
+            "missing": sorted(set(declared) - set(live)),
+            "extra": sorted(set(live) - set(declared)),
+            "changed": {
+                name: {"declared": declared[name], "live": live[name]}
+                for name in sorted(set(declared) & set(live))
+                if declared[name] != live[name]
+            },
+        }
+        if report["missing"] or report["extra"] or report["changed"]:
+            drift[collection] = report
+    return drift
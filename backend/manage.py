@@ -0,0 +1,157 @@
+"""Các lệnh quản trị chạy ngoài API.
+
+Chạy từ thư mục backend, ví dụ:
+
+    python manage.py reconcile-counters
+    python manage.py indexes apply
+    python manage.py backfill-task-search
+    python manage.py import clients clients.csv
+    python manage.py seed-data --tasks 1000000 --drop
+"""
+import asyncio
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+
+import typer
+from pymongo import MongoClient
+
+import server
+from bulk_import import IMPORT_FORMATS, iter_rows
+from indexes import ensure_indexes, index_drift
+from synthetic import GENERATORS, DatasetConfig, config_summary, seed_dataset
+
+cli = typer.Typer(help="Lệnh quản trị CRM backend")
+indexes_cli = typer.Typer(help="Quản lý index MongoDB khai báo trong indexes.py")
+cli.add_typer(indexes_cli, name="indexes")
+
+
+def run(coro):
+    """Chạy coroutine rồi đóng kết nối MongoDB"""
+    try:
+        return asyncio.run(coro)
+    finally:
+        server.client.close()
+
+
+@cli.command("reconcile-counters")
+def reconcile_counters():
+    """Dựng lại dashboard_counters từ đầu và in ra độ lệch"""
+    report = run(server.reconcile_dashboard_counters())
+    typer.echo(json.dumps(report["drift"], indent=2, default=str))
+    if report["drift"]:
+        typer.echo(f"{len(report['drift'])} counters drifted and were repaired", err=True)
+
+
+@cli.command("backfill-task-search")
+def backfill_task_search(
+    batch_size: int = typer.Option(1000, help="Số task mỗi lệnh bulk_write"),
+    all_tasks: bool = typer.Option(False, "--all", help="Tính lại cả những task đã có field search"),
+):
+    """Sinh lại field `search` (dùng cho text index); server tự backfill task cũ khi khởi động"""
+    updated = run(server.backfill_task_search(batch_size=batch_size, all_tasks=all_tasks))
+    typer.echo(f"Updated {updated} tasks")
+
+
+@cli.command("import")
+def import_file(
+    collection: str = typer.Argument(..., help="clients, projects hoặc tasks"),
+    path: Path = typer.Argument(..., exists=True, dir_okay=False),
+    format: str = typer.Option(None, help="csv hoặc ndjson; mặc định theo đuôi file"),
+    chunk_size: int = typer.Option(server.IMPORT_CHUNK_SIZE, help="Số dòng mỗi lần insert_many"),
+):
+    """Import hàng loạt từ file CSV/NDJSON và in báo cáo lỗi theo từng dòng"""
+    if collection not in server.IMPORT_COLLECTIONS:
+        raise typer.BadParameter(f"must be one of {', '.join(server.IMPORT_COLLECTIONS)}", param_hint="collection")
+    fmt = format or ("ndjson" if path.suffix in (".ndjson", ".jsonl") else "csv")
+    if fmt not in IMPORT_FORMATS:
+        raise typer.BadParameter("must be 'csv' or 'ndjson'", param_hint="--format")
+    with path.open("rb") as binary:
+        report = run(server.import_records(collection, iter_rows(binary, fmt), chunk_size=chunk_size))
+    typer.echo(json.dumps(report, indent=2, default=str))
+    if report["failed"]:
+        raise typer.Exit(code=1)
+
+
+@cli.command("seed-data")
+def seed_data(
+    seed: int = typer.Option(42, help="Cùng seed sinh ra cùng dữ liệu"),
+    users: int = typer.Option(200),
+    clients: int = typer.Option(2_000),
+    projects: int = typer.Option(10_000),
+    tasks: int = typer.Option(1_000_000),
+    feedbacks: int = typer.Option(100_000),
+    contracts: int = typer.Option(5_000),
+    invoices: int = typer.Option(50_000),
+    templates: int = typer.Option(200),
+    services_per_template: int = typer.Option(8),
+    tasks_per_service: int = typer.Option(6),
+    components_per_task: int = typer.Option(4),
+    chunk_size: int = typer.Option(10_000, help="Số document mỗi lệnh insert_many"),
+    workers: int = typer.Option(None, help="Số tiến trình ghi song song; mặc định bằng số CPU"),
+    now: datetime = typer.Option(None, formats=["%Y-%m-%d"], help="Ngày hiện tại của bộ dữ liệu (mặc định cố định)"),
+    drop: bool = typer.Option(False, "--drop", help="Xóa dữ liệu hiện có trong các collection sẽ sinh"),
+    skip_indexes: bool = typer.Option(False, "--skip-indexes", help="Không tạo index sau khi ghi"),
+):
+    """Sinh bộ dữ liệu giả lập lớn (mặc định 1M task) từ các model trong server.py"""
+    config = DatasetConfig(
+        seed=seed, users=users, clients=clients, projects=projects, tasks=tasks, feedbacks=feedbacks,
+        contracts=contracts, invoices=invoices, templates=templates,
+        services_per_template=services_per_template, tasks_per_service=tasks_per_service,
+        components_per_task=components_per_task, chunk_size=chunk_size,
+    )
+    if now is not None:
+        config.now = now
+    db_name = server.db.name
+    sync_client = MongoClient(server.mongo_url)
+    try:
+        existing = [name for name in GENERATORS if sync_client[db_name][name].estimated_document_count()]
+        if existing and not drop:
+            typer.echo(f"Collections already contain data: {', '.join(existing)}. Use --drop to replace them.", err=True)
+            raise typer.Exit(code=1)
+        # Ghi vào collection trống rồi mới tạo index: nhanh hơn cập nhật index theo từng lô
+        for name in list(GENERATORS) + ["dashboard_counters", "counters"]:
+            sync_client[db_name].drop_collection(name)
+    finally:
+        sync_client.close()
+
+    started = time.perf_counter()
+    report = seed_dataset(config, server.mongo_url, db_name, workers=workers, progress=typer.echo)
+    load_seconds = time.perf_counter() - started
+
+    async def finish():
+        if not skip_indexes:
+            await ensure_indexes(server.db)
+        await server.reconcile_dashboard_counters()
+    started = time.perf_counter()
+    run(finish())
+    typer.echo(json.dumps({
+        "config": config_summary(config),
+        "collections": report,
+        "load_seconds": round(load_seconds, 2),
+        "index_and_counter_seconds": round(time.perf_counter() - started, 2),
+    }, indent=2))
+
+
+@indexes_cli.command("apply")
+def indexes_apply():
+    """Tạo các index khai báo còn thiếu (idempotent)"""
+    async def apply():
+        await ensure_indexes(server.db)
+        return await index_drift(server.db)
+    drift = run(apply())
+    typer.echo(json.dumps(drift, indent=2, default=str))
+
+
+@indexes_cli.command("drift")
+def indexes_drift():
+    """Báo cáo độ lệch giữa index khai báo và index thực tế; exit 1 nếu có lệch"""
+    drift = run(index_drift(server.db))
+    typer.echo(json.dumps(drift, indent=2, default=str))
+    if drift:
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,155 @@
+"""Metrics Prometheus: độ trễ theo route, request đang xử lý, thời gian lệnh MongoDB
+theo collection/lệnh và trạng thái connection pool.
+
+- `PrometheusMiddleware`: middleware ASGI thuần (không dùng BaseHTTPMiddleware) để
+  chi phí mỗi request chỉ là vài phép đo thời gian và cập nhật metric.
+- `MongoCommandMetrics` / `MongoPoolMetrics`: listener của pymongo, truyền vào
+  AsyncIOMotorClient(event_listeners=...).
+- `metrics_response`: nội dung cho endpoint /metrics.
+"""
+import time
+from typing import Dict, Tuple
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+from pymongo import monitoring
+from starlette.responses import Response
+
+# Registry riêng để import lại module (test, benchmark) không bị đăng ký trùng
+REGISTRY = CollectorRegistry(auto_describe=True)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Thời gian xử lý request theo route",
+    ["method", "route", "status"], registry=REGISTRY,
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Số request đang xử lý", ["method"], registry=REGISTRY,
+)
+MONGO_COMMAND_SECONDS = Histogram(
+    "mongodb_command_duration_seconds", "Thời gian lệnh MongoDB theo collection và lệnh",
+    ["collection", "command", "outcome"], registry=REGISTRY,
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+MONGO_POOL_CONNECTIONS = Gauge(
+    "mongodb_pool_connections", "Số connection đang mở trong pool", ["address"], registry=REGISTRY,
+)
+MONGO_POOL_CHECKED_OUT = Gauge(
+    "mongodb_pool_checked_out_connections", "Số connection đang được dùng", ["address"], registry=REGISTRY,
+)
+MONGO_POOL_CHECKOUT_FAILURES = Counter(
+    "mongodb_pool_checkout_failures", "Số lần lấy connection thất bại", ["address", "reason"], registry=REGISTRY,
+)
+
+# Route không khớp (404) gộp chung một nhãn để không bùng nổ số series
+UNMATCHED_ROUTE = "unmatched"
+
+
+class PrometheusMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight = HTTP_IN_FLIGHT.labels(method)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            # Router gán scope["route"] khi khớp, dùng path mẫu (/api/tasks/{task_id}) làm nhãn
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                method, getattr(route, "path", UNMATCHED_ROUTE), str(status_code)
+            ).observe(time.perf_counter() - started)
+
+
+def _command_collection(command_name: str, command) -> str:
+    if command_name == "getMore":
+        value = command.get("collection")
+    else:
+        value = command.get(command_name)
+    return value if isinstance(value, str) else ""
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Ghi thời gian mỗi lệnh, nhãn collection lấy từ sự kiện started"""
+
+    def __init__(self):
+        self._pending: Dict[Tuple[int, object], Tuple[str, str]] = {}
+
+    def started(self, event):
+        self._pending[(event.request_id, event.connection_id)] = (
+            _command_collection(event.command_name, event.command), event.command_name
+        )
+
+    def _finish(self, event, outcome: str):
+        collection, command_name = self._pending.pop(
+            (event.request_id, event.connection_id), ("", event.command_name)
+        )
+        MONGO_COMMAND_SECONDS.labels(collection, command_name, outcome).observe(event.duration_micros / 1e6)
+
+    def succeeded(self, event):
+        self._finish(event, "succeeded")
+
+    def failed(self, event):
+        self._finish(event, "failed")
+
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    """Theo dõi số connection mở / đang dùng của từng server"""
+
+    @staticmethod
+    def _address(event) -> str:
+        host, port = event.address
+        return f"{host}:{port}"
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        MONGO_POOL_CONNECTIONS.labels(self._address(event)).set(0)
+        MONGO_POOL_CHECKED_OUT.labels(self._address(event)).set(0)
+
+    def connection_created(self, event):
+        MONGO_POOL_CONNECTIONS.labels(self._address(event)).inc()
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        MONGO_POOL_CONNECTIONS.labels(self._address(event)).dec()
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        MONGO_POOL_CHECKOUT_FAILURES.labels(self._address(event), str(event.reason)).inc()
+
+    def connection_checked_out(self, event):
+        MONGO_POOL_CHECKED_OUT.labels(self._address(event)).inc()
+
+    def connection_checked_in(self, event):
+        MONGO_POOL_CHECKED_OUT.labels(self._address(event)).dec()
+
+
+def metrics_response() -> Response:
+    return Response(content=generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,121 @@
+"""Phân trang keyset (cursor) cho các endpoint danh sách.
+
+Cursor là chuỗi base64 mờ chứa field sắp xếp, chiều sắp xếp và giá trị
+(field, id) của phần tử cuối trang. Chỉ cho phép sắp xếp theo field có index
+(field, id) khai báo trong indexes.INDEX_SPECS nên mỗi trang là một lần
+IXSCAN, chi phí không tăng theo độ sâu trang.
+"""
+import base64
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import json_util
+from fastapi import HTTPException, Response
+
+from indexes import INDEX_SPECS
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def sortable_fields(collection: str) -> List[str]:
+    """Các field có index (field, id) để phân trang keyset"""
+    fields = []
+    for model in INDEX_SPECS.get(collection, []):
+        keys = list(model.document["key"].items())
+        if len(keys) == 2 and keys[1][0] == "id" and keys[0][0] != "id":
+            fields.append(keys[0][0])
+    return fields
+
+
+def parse_sort(collection: str, sort: str) -> Tuple[str, int]:
+    """'created_at' -> tăng dần, '-created_at' -> giảm dần"""
+    direction = -1 if sort.startswith("-") else 1
+    field = sort.lstrip("-+")
+    allowed = sortable_fields(collection)
+    if field not in allowed:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid sort field '{field}'. Allowed: {', '.join(allowed)}",
+        )
+    return field, direction
+
+
+def encode_cursor(field: str, direction: int, doc: Dict[str, Any]) -> str:
+    payload = json_util.dumps({"f": field, "d": direction, "v": doc.get(field), "id": doc["id"]})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json_util.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        if payload["d"] not in (1, -1) or not isinstance(payload["id"], str):
+            raise ValueError("bad cursor")
+        return payload
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_filter(field: str, direction: int, value: Any, last_id: str) -> Dict[str, Any]:
+    """Điều kiện lấy các phần tử đứng sau (value, last_id) theo thứ tự (field, id).
+
+    MongoDB xếp null trước mọi giá trị khi tăng dần, nên null được xử lý riêng.
+    """
+    id_op = "$gt" if direction == 1 else "$lt"
+    if value is None:
+        after_null_group = {field: None, "id": {id_op: last_id}}
+        if direction == 1:
+            return {"$or": [after_null_group, {field: {"$ne": None}}]}
+        return after_null_group
+
+    value_op = "$gt" if direction == 1 else "$lt"
+    conditions = [
+        {field: {value_op: value}},
+        {field: value, "id": {id_op: last_id}},
+    ]
+    if direction == -1:
+        conditions.append({field: None})
+    return {"$or": conditions}
+
+
+async def paginate(
+    collection,
+    collection_name: str,
+    filter_query: Dict[str, Any],
+    skip: int,
+    limit: int,
+    sort: Optional[str] = None,
+    cursor: Optional[str] = None,
+    projection: Optional[Dict[str, Any]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Trả về (documents, next_cursor).
+
+    Không có sort/cursor thì giữ nguyên hành vi skip/limit cũ và next_cursor là None.
+    """
+    if not sort and not cursor:
+        docs = await collection.find(filter_query, projection).skip(skip).limit(limit).to_list(length=limit)
+        return docs, None
+
+    query = filter_query
+    if cursor:
+        state = decode_cursor(cursor)
+        field, direction = parse_sort(collection_name, ("-" if state["d"] == -1 else "") + state["f"])
+        if sort and parse_sort(collection_name, sort) != (field, direction):
+            raise HTTPException(status_code=400, detail="Cursor does not match sort")
+        keyset = keyset_filter(field, direction, state["v"], state["id"])
+        query = {"$and": [filter_query, keyset]} if filter_query else keyset
+    else:
+        field, direction = parse_sort(collection_name, sort)
+
+    docs = await (
+        collection.find(query, projection)
+        .sort([(field, direction), ("id", direction)])
+        .limit(limit)
+        .to_list(length=limit)
+    )
+    next_cursor = encode_cursor(field, direction, docs[-1]) if limit and len(docs) == limit else None
+    return docs, next_cursor
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
@@ -0,0 +1,60 @@
+"""Chuẩn hóa văn bản cho tìm kiếm full-text task.
+
+MongoDB text index không hỗ trợ tiếng Việt (không stemming) và không coi "đ"
+là biến thể của "d", nên mỗi task lưu thêm field `search` chứa tiêu đề và nội
+dung đã bỏ dấu, bỏ thẻ HTML, viết thường (mỗi field nguồn một field con để
+có thể cập nhật riêng lẻ). Text index được đặt trên field này
+và chuỗi tìm kiếm cũng được chuẩn hóa giống hệt trước khi truy vấn.
+"""
+import html
+import re
+import unicodedata
+from typing import Any, Dict, Optional
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def fold_text(value: Optional[str]) -> str:
+    """Bỏ dấu tiếng Việt và viết thường: 'Đề xuất' -> 'de xuat'"""
+    if not value:
+        return ""
+    decomposed = unicodedata.normalize("NFD", value)
+    stripped = "".join(ch for ch in decomposed if unicodedata.category(ch) != "Mn")
+    stripped = stripped.replace("đ", "d").replace("Đ", "D")
+    return _SPACE_RE.sub(" ", stripped).strip().lower()
+
+
+def strip_html(value: Optional[str]) -> str:
+    if not value:
+        return ""
+    return html.unescape(_TAG_RE.sub(" ", value))
+
+
+# Field nguồn của task -> field con trong `search`
+SEARCH_SOURCE_FIELDS = {"title": "title", "description": "description", "rich_content": "content"}
+
+
+def _search_value(field: str, value: Optional[str]) -> str:
+    return fold_text(strip_html(value) if field == "rich_content" else value)
+
+
+def task_search_fields(task: Dict[str, Any]) -> Dict[str, str]:
+    """Giá trị đầy đủ của field `search` cho một task"""
+    return {
+        target: _search_value(source, task.get(source))
+        for source, target in SEARCH_SOURCE_FIELDS.items()
+    }
+
+
+def task_search_updates(changes: Dict[str, Any]) -> Dict[str, str]:
+    """Các field con `search.*` cần $set khi chỉ một phần task thay đổi"""
+    return {
+        f"search.{target}": _search_value(source, changes[source])
+        for source, target in SEARCH_SOURCE_FIELDS.items()
+        if source in changes
+    }
+
+
+def text_search_query(search: str) -> Dict[str, Any]:
+    return {"$text": {"$search": fold_text(search)}}
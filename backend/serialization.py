@@ -0,0 +1,48 @@
+"""Đường serialize nhanh cho dữ liệu đọc từ chính các collection của hệ thống.
+
+Document trong MongoDB đã được validate lúc ghi nên khi đọc không cần validate
+lại: `trusted_response` dựng model bằng `model_construct` (không validate) rồi
+dump thẳng ra JSON bằng TypeAdapter (pydantic-core), trả về Response để FastAPI
+không validate `response_model` thêm lần nữa. Chỉ các field của model được ghi
+ra nên field nội bộ (hashed_password, search, ...) không bị lộ.
+"""
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Type
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import BaseModel, TypeAdapter
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # orjson là tùy chọn
+    orjson = None
+
+# Response class mặc định của app: orjson nếu có cài
+DefaultJSONResponse = ORJSONResponse if orjson is not None else JSONResponse
+
+# Projection cho các truy vấn đọc: không lấy _id (ObjectId không serialize được)
+TRUSTED_PROJECTION: Dict[str, int] = {"_id": 0}
+
+# Header của response gốc không được chép sang (do Response mới tự tính)
+_SKIPPED_HEADERS = {"content-length", "content-type"}
+
+
+@lru_cache(maxsize=None)
+def list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+
+def dump_trusted(model: Type[BaseModel], docs: Iterable[Dict[str, Any]]) -> bytes:
+    """JSON của danh sách document theo schema của model, không validate"""
+    return list_adapter(model).dump_json([model.model_construct(**doc) for doc in docs], warnings=False)
+
+
+def trusted_response(
+    model: Type[BaseModel], docs: Iterable[Dict[str, Any]], response: Optional[Response] = None
+) -> Response:
+    """Response JSON cho danh sách document; giữ các header đã đặt trên `response` (X-Next-Cursor, ETag)"""
+    headers = None
+    if response is not None:
+        headers = {key: value for key, value in response.headers.items() if key not in _SKIPPED_HEADERS}
+    return Response(content=dump_trusted(model, docs), media_type="application/json", headers=headers)
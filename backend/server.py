@@ -1,19 +1,36 @@
-from fastapi import FastAPI, APIRouter, Depends, HTTPException, status, Body, File, UploadFile
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, status, Body, File, UploadFile, Request, Response
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional, Dict, Any, Union
+from pydantic import BaseModel, Field, EmailStr, ValidationError
+from typing import List, Optional, Dict, Any, Union, Tuple, get_args
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import DeleteOne, InsertOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
 from datetime import datetime, timedelta
+from starlette.concurrency import run_in_threadpool
 from starlette.middleware.cors import CORSMiddleware
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from dotenv import load_dotenv
 import os
 import uuid
+import asyncio
 import logging
+import re
 import shutil
+import time
 from pathlib import Path
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import StreamingResponse
+from concurrent.futures import ThreadPoolExecutor
+from cache import TieredCache, TTLCache, VersionedCache, make_pubsub
+from indexes import ensure_indexes
+from pagination import paginate, set_next_cursor, NEXT_CURSOR_HEADER
+from search import task_search_fields, task_search_updates, text_search_query
+from export import EXPORT_FORMATS, export_projection, stream_export
+from bulk_import import IMPORT_FORMATS, chunked, iter_rows
+from serialization import DefaultJSONResponse, TRUSTED_PROJECTION, dump_trusted, trusted_response
+from metrics import MongoCommandMetrics, MongoPoolMetrics, PrometheusMiddleware, metrics_response
+from slow_queries import SLOW_QUERIES_COLLECTION, RouteContextMiddleware, SlowQueryLog
 
 # Thiết lập cơ bản
 ROOT_DIR = Path(__file__).parent
@@ -31,13 +48,55 @@ SECRET_KEY = "09d25e094faa6ca2556c818166b7a9563b93f7099f6f0f4caa6cf63b88e8d3e7"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Cache user cho get_current_user (REDIS_URL để chia sẻ giữa các worker)
+USER_CACHE_TTL_SECONDS = float(os.environ.get("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_MAXSIZE = int(os.environ.get("USER_CACHE_MAXSIZE", "1024"))
+REDIS_URL = os.environ.get("REDIS_URL")
+
+# Thời gian nhớ kết quả kiểm tra tham chiếu (client/project/contract tồn tại)
+REFERENCE_CACHE_TTL_SECONDS = float(os.environ.get("REFERENCE_CACHE_TTL_SECONDS", "10"))
+
+# Tự tạo index khai báo trong indexes.py khi khởi động
+AUTO_CREATE_INDEXES = os.environ.get("AUTO_CREATE_INDEXES", "true").lower() in ("1", "true", "yes")
+
+# bcrypt chạy trên thread pool riêng, giới hạn số lượt băm đồng thời
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_CONCURRENCY = int(os.environ.get("PASSWORD_HASH_MAX_CONCURRENCY", str(PASSWORD_HASH_WORKERS)))
+
+# Số thao tác tối đa cho một lần gọi POST /api/tasks/bulk
+TASK_BULK_MAX_OPERATIONS = int(os.environ.get("TASK_BULK_MAX_OPERATIONS", "10000"))
+
+# Số document mỗi batch khi stream export từ MongoDB
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", "2000"))
+
+# Import hàng loạt: số dòng mỗi lần validate + insert_many, số lỗi tối đa trả về
+IMPORT_CHUNK_SIZE = int(os.environ.get("IMPORT_CHUNK_SIZE", "2000"))
+IMPORT_MAX_ERRORS = int(os.environ.get("IMPORT_MAX_ERRORS", "1000"))
+
+# Bật /metrics, đo độ trễ route và lệnh MongoDB
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Ghi log lệnh MongoDB chậm hơn ngưỡng (ms, 0 = tắt) vào capped collection slow_queries
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "100"))
+SLOW_QUERY_RATE_SECONDS = float(os.environ.get("SLOW_QUERY_RATE_SECONDS", "60"))
+SLOW_QUERY_LOG_MB = int(os.environ.get("SLOW_QUERY_LOG_MB", "16"))
+
+slow_query_log = SlowQueryLog(
+    threshold_ms=SLOW_QUERY_MS,
+    rate_limit_seconds=SLOW_QUERY_RATE_SECONDS,
+    capped_size_bytes=SLOW_QUERY_LOG_MB * 1024 * 1024,
+)
+
 # Kết nối MongoDB
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(
+    mongo_url,
+    event_listeners=[slow_query_log] + ([MongoCommandMetrics(), MongoPoolMetrics()] if METRICS_ENABLED else [])
+)
 db = client[os.environ['DB_NAME']]
 
 # Khởi tạo ứng dụng
-app = FastAPI()
+app = FastAPI(default_response_class=DefaultJSONResponse)
 api_router = APIRouter(prefix="/api")
 
 # Cấu hình bảo mật
@@ -51,8 +110,18 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+app.add_middleware(RouteContextMiddleware)
+
+if METRICS_ENABLED:
+    app.add_middleware(PrometheusMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return metrics_response()
+
 # Mô hình dữ liệu
 class UserBase(BaseModel):
     email: EmailStr
@@ -96,11 +165,29 @@ class ClientBase(BaseModel):
 class ClientCreate(ClientBase):
     pass
 
+class ClientUpdate(BaseModel):
+    name: Optional[str] = None
+    company: Optional[str] = None
+    industry: Optional[str] = None
+    size: Optional[str] = None
+    website: Optional[str] = None
+    phone: Optional[str] = None
+    contact_name: Optional[str] = None
+    contact_email: Optional[EmailStr] = None
+    contact_phone: Optional[str] = None
+    notes: Optional[str] = None
+    address: Optional[str] = None
+    tags: Optional[List[str]] = None
+    avatar_url: Optional[str] = None
+    archived: Optional[bool] = None
+    version: Optional[int] = None  # Optimistic concurrency: chỉ cập nhật nếu khớp version hiện tại
+
 class Client(ClientBase):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     created_by: Optional[str] = None
+    version: int = 0
 
 class ProjectBase(BaseModel):
     name: str
@@ -114,11 +201,22 @@ class ProjectBase(BaseModel):
 class ProjectCreate(ProjectBase):
     pass
 
+class ProjectUpdate(BaseModel):
+    name: Optional[str] = None
+    client_id: Optional[str] = None
+    description: Optional[str] = None
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+    budget: Optional[float] = None
+    status: Optional[str] = None
+    version: Optional[int] = None
+
 class Project(ProjectBase):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     created_by: Optional[str] = None
+    version: int = 0
 
 class TaskBase(BaseModel):
     title: str
@@ -134,12 +232,36 @@ class TaskBase(BaseModel):
 class TaskCreate(TaskBase):
     pass
 
+class TaskBulkOperation(BaseModel):
+    op: str  # create, set_status, reassign, delete
+    id: Optional[str] = None  # task id (set_status, reassign, delete)
+    task: Optional[TaskCreate] = None  # create
+    status: Optional[str] = None  # set_status
+    assigned_to: Optional[str] = None  # reassign; None = bỏ phân công
+
+class TaskBulkRequest(BaseModel):
+    operations: List[TaskBulkOperation]
+
+class TaskUpdate(BaseModel):
+    title: Optional[str] = None
+    project_id: Optional[str] = None
+    description: Optional[str] = None
+    rich_content: Optional[str] = None
+    assigned_to: Optional[str] = None
+    due_date: Optional[datetime] = None
+    priority: Optional[str] = None
+    status: Optional[str] = None
+    task_type: Optional[str] = None
+    version: Optional[int] = None
+
 class Task(TaskBase):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     created_by: Optional[str] = None
     completion_date: Optional[datetime] = None
+    components: List[Dict[str, Any]] = []  # Thành phần chi tiết sao từ task template (apply-template)
+    version: int = 0
 
 # Task Feedback Models
 class TaskFeedbackBase(BaseModel):
@@ -169,12 +291,24 @@ class ContractBase(BaseModel):
 class ContractCreate(ContractBase):
     pass
 
+class ContractUpdate(BaseModel):
+    client_id: Optional[str] = None
+    project_id: Optional[str] = None
+    title: Optional[str] = None
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+    value: Optional[float] = None
+    status: Optional[str] = None
+    terms: Optional[str] = None
+    version: Optional[int] = None
+
 class Contract(ContractBase):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     created_by: Optional[str] = None
     document_url: Optional[str] = None
+    version: int = 0
 
 class InvoiceBase(BaseModel):
     client_id: str
@@ -189,6 +323,17 @@ class InvoiceBase(BaseModel):
 class InvoiceCreate(InvoiceBase):
     pass
 
+class InvoiceUpdate(BaseModel):
+    client_id: Optional[str] = None
+    project_id: Optional[str] = None
+    contract_id: Optional[str] = None
+    title: Optional[str] = None
+    amount: Optional[float] = None
+    due_date: Optional[datetime] = None
+    status: Optional[str] = None
+    notes: Optional[str] = None
+    version: Optional[int] = None
+
 class Invoice(InvoiceBase):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     invoice_number: str
@@ -196,6 +341,7 @@ class Invoice(InvoiceBase):
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     created_by: Optional[str] = None
     paid_date: Optional[datetime] = None
+    version: int = 0
 
 # Hàm tiện ích
 def verify_password(plain_password, hashed_password):
@@ -204,16 +350,89 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+class PasswordHashPool:
+    """Chạy bcrypt ngoài event loop với số lượt đồng thời có giới hạn"""
+    
+    def __init__(self, workers: int, max_concurrency: int):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.max_waiting_seen = 0
+    
+    async def run(self, func, *args):
+        self.waiting += 1
+        self.max_waiting_seen = max(self.max_waiting_seen, self.waiting)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self._semaphore.release()
+    
+    def stats(self) -> Dict[str, int]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "queue_depth": self.waiting,
+            "running": self.running,
+            "completed": self.completed,
+            "max_queue_depth": self.max_waiting_seen,
+        }
+    
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+password_hash_pool = PasswordHashPool(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_CONCURRENCY)
+
+async def verify_password_async(plain_password, hashed_password):
+    return await password_hash_pool.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    return await password_hash_pool.run(get_password_hash, password)
+
 async def get_user(email: str):
     user_dict = await db.users.find_one({"email": email})
     if user_dict:
         return UserInDB(**user_dict)
 
+# Cache user theo token subject (email), tránh một lần find_one mỗi request.
+# Chỉ lưu User (không có hashed_password) vì cache có thể nằm trên Redis dùng chung;
+# authenticate_user đọc hash trực tiếp qua get_user.
+user_cache = TieredCache(
+    "user",
+    maxsize=USER_CACHE_MAXSIZE,
+    ttl=USER_CACHE_TTL_SECONDS,
+    redis_url=REDIS_URL,
+    dumps=lambda user: user.model_dump_json(),
+    loads=User.model_validate_json,
+)
+
+async def get_cached_user(email: str) -> Optional[User]:
+    user = await user_cache.get(email)
+    if user is None:
+        user_dict = await db.users.find_one({"email": email}, {"_id": 0, "hashed_password": 0})
+        if user_dict is not None:
+            user = User(**user_dict)
+            await user_cache.set(email, user)
+    return user
+
+async def invalidate_user(email: str):
+    """Gọi mỗi khi dữ liệu user thay đổi"""
+    await user_cache.invalidate(email)
+
 async def authenticate_user(email: str, password: str):
     user = await get_user(email)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         return False
     return user
 
@@ -241,7 +460,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         token_data = TokenData(email=email)
     except JWTError:
         raise credentials_exception
-    user = await get_user(email=token_data.email)
+    user = await get_cached_user(email=token_data.email)
     if user is None:
         raise credentials_exception
     return user
@@ -251,6 +470,351 @@ async def get_current_active_user(current_user: User = Depends(get_current_user)
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
+# Bộ đếm dashboard (dashboard_counters)
+# Một document duy nhất được cập nhật bằng $inc ở mọi đường create/update/delete
+# để dashboard và thống kê task đọc trong O(1) thay vì quét collection.
+DASHBOARD_COUNTERS_ID = "global"
+
+def _counter_key(value) -> str:
+    """Chuẩn hóa giá trị status/priority thành tên field hợp lệ trong MongoDB"""
+    return str(value).replace(".", "_").replace("$", "_")
+
+def _merge_deltas(*deltas: Dict[str, float]) -> Dict[str, float]:
+    merged: Dict[str, float] = {}
+    for delta in deltas:
+        for key, value in delta.items():
+            merged[key] = merged.get(key, 0) + value
+    return {key: value for key, value in merged.items() if value}
+
+def project_counter_delta(project: dict, sign: int = 1) -> Dict[str, float]:
+    return {f"projects.status.{_counter_key(project.get('status'))}": sign}
+
+def task_counter_delta(task: dict, sign: int = 1) -> Dict[str, float]:
+    return {
+        f"tasks.status.{_counter_key(task.get('status'))}": sign,
+        f"tasks.priority.{_counter_key(task.get('priority'))}": sign,
+    }
+
+def invoice_counter_delta(invoice: dict, sign: int = 1) -> Dict[str, float]:
+    invoice_status = _counter_key(invoice.get("status"))
+    return {
+        f"invoices.count.{invoice_status}": sign,
+        f"invoices.amount.{invoice_status}": sign * (invoice.get("amount") or 0),
+    }
+
+async def bump_dashboard_counters(*deltas: Dict[str, float]):
+    """Cập nhật nguyên tử các bộ đếm dashboard bằng một lệnh $inc.
+
+    Không upsert: khi chưa có document (database cũ, hoặc vừa bị xóa) thì bỏ qua,
+    lần đọc tiếp theo get_dashboard_counters sẽ dựng bộ đếm đầy đủ từ dữ liệu thật.
+    """
+    increments = _merge_deltas(*deltas)
+    if increments:
+        await db.dashboard_counters.update_one(
+            {"_id": DASHBOARD_COUNTERS_ID}, {"$inc": increments}
+        )
+
+async def _group_by(collection, field: str = "status", sum_field: Optional[str] = None):
+    """Đếm (và cộng tổng nếu có sum_field) theo field trong một lần aggregate"""
+    group = {"_id": f"${field}", "count": {"$sum": 1}}
+    if sum_field:
+        group["total"] = {"$sum": f"${sum_field}"}
+    rows = await collection.aggregate([{"$group": group}]).to_list(length=None)
+    return {_counter_key(row["_id"]): row for row in rows}
+
+async def compute_dashboard_counters() -> dict:
+    """Tính lại toàn bộ bộ đếm dashboard từ dữ liệu thật"""
+    client_count, projects, task_status, task_priority, invoices = await asyncio.gather(
+        db.clients.count_documents({}),
+        _group_by(db.projects),
+        _group_by(db.tasks),
+        _group_by(db.tasks, field="priority"),
+        _group_by(db.invoices, sum_field="amount"),
+    )
+    return {
+        "clients": client_count,
+        "projects": {"status": {k: v["count"] for k, v in projects.items()}},
+        "tasks": {
+            "status": {k: v["count"] for k, v in task_status.items()},
+            "priority": {k: v["count"] for k, v in task_priority.items()},
+        },
+        "invoices": {
+            "count": {k: v["count"] for k, v in invoices.items()},
+            "amount": {k: v["total"] for k, v in invoices.items()},
+        },
+    }
+
+# Field của document bộ đếm không phải là bộ đếm
+COUNTER_METADATA_FIELDS = {"_id", "reconciled_at"}
+
+def _flatten_counters(doc: dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in doc.items():
+        if not prefix and key in COUNTER_METADATA_FIELDS:
+            continue
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten_counters(value, f"{path}."))
+        else:
+            flat[path] = value
+    return flat
+
+async def reconcile_dashboard_counters() -> dict:
+    """Dựng lại bộ đếm từ đầu và báo cáo độ lệch so với giá trị đang lưu"""
+    stored = await db.dashboard_counters.find_one({"_id": DASHBOARD_COUNTERS_ID}) or {}
+    actual = await compute_dashboard_counters()
+    
+    stored_flat = _flatten_counters(stored)
+    actual_flat = _flatten_counters(actual)
+    drift = {}
+    for key in sorted(set(stored_flat) | set(actual_flat)):
+        stored_value = stored_flat.get(key, 0)
+        actual_value = actual_flat.get(key, 0)
+        if stored_value != actual_value:
+            drift[key] = {"stored": stored_value, "actual": actual_value}
+    
+    await db.dashboard_counters.replace_one(
+        {"_id": DASHBOARD_COUNTERS_ID},
+        {**actual, "reconciled_at": datetime.utcnow()},
+        upsert=True
+    )
+    logger.info("Dashboard counters reconciled, %d drifted keys", len(drift))
+    return {"drift": drift, "counters": actual}
+
+async def get_dashboard_counters() -> dict:
+    counters = await db.dashboard_counters.find_one({"_id": DASHBOARD_COUNTERS_ID})
+    if counters is None:
+        # Lần đầu chạy trên dữ liệu có sẵn: dựng bộ đếm từ đầu
+        counters = (await reconcile_dashboard_counters())["counters"]
+    return counters
+
+# Transaction MongoDB (cần replica set, kể cả replica set một node khi dev/test)
+ILLEGAL_OPERATION = 20
+transactions_supported: Optional[bool] = None
+
+async def run_in_transaction(callback):
+    """Chạy callback(session) trong một transaction.
+
+    Trên mongod standalone (không hỗ trợ transaction) callback được chạy với
+    session=None và một cảnh báo được ghi log một lần.
+    """
+    global transactions_supported
+    if transactions_supported is not False:
+        try:
+            async with await client.start_session() as session:
+                result = await session.with_transaction(callback)
+            transactions_supported = True
+            return result
+        except OperationFailure as exc:
+            if exc.code != ILLEGAL_OPERATION or transactions_supported:
+                raise
+            transactions_supported = False
+            logger.warning("MongoDB does not support transactions (standalone server); running without them")
+    return await callback(None)
+
+# Kiểm tra toàn vẹn tham chiếu (client/project/contract) cho các endpoint create/update
+# Chỉ nhớ kết quả tồn tại (positive) trong thời gian ngắn; xóa/sửa thì forget_reference
+reference_cache = TTLCache(maxsize=4096, ttl=REFERENCE_CACHE_TTL_SECONDS)
+
+# collection -> (field cần lấy để kiểm tra tính nhất quán, thông báo 404)
+REFERENCE_SPECS = {
+    "clients": ((), "Client not found"),
+    "projects": (("client_id",), "Project not found"),
+    "contracts": (("client_id", "project_id"), "Contract not found"),
+}
+
+async def _lookup_reference(collection: str, ref_id: str) -> Optional[dict]:
+    key = (collection, ref_id)
+    cached = reference_cache.get(key)
+    if cached is not None:
+        return cached
+    fields = REFERENCE_SPECS[collection][0]
+    doc = await db[collection].find_one({"id": ref_id}, {"_id": 1, **{field: 1 for field in fields}})
+    if doc is not None:
+        reference_cache.set(key, doc)
+    return doc
+
+def forget_reference(collection: str, ref_id: str):
+    reference_cache.invalidate((collection, ref_id))
+
+async def validate_references(
+    client_id: Optional[str] = None,
+    project_id: Optional[str] = None,
+    contract_id: Optional[str] = None,
+):
+    """Kiểm tra song song các id được tham chiếu và tính nhất quán giữa chúng
+    (project thuộc client, contract thuộc client/project)"""
+    requested = [
+        (collection, ref_id)
+        for collection, ref_id in (("clients", client_id), ("projects", project_id), ("contracts", contract_id))
+        if ref_id
+    ]
+    docs = await asyncio.gather(*(_lookup_reference(collection, ref_id) for collection, ref_id in requested))
+    found = {}
+    for (collection, _), doc in zip(requested, docs):
+        if doc is None:
+            raise HTTPException(status_code=404, detail=REFERENCE_SPECS[collection][1])
+        found[collection] = doc
+    
+    project = found.get("projects")
+    contract = found.get("contracts")
+    if project and client_id and project.get("client_id") != client_id:
+        raise HTTPException(status_code=400, detail="Project does not belong to client")
+    if contract and client_id and contract.get("client_id") != client_id:
+        raise HTTPException(status_code=400, detail="Contract does not belong to client")
+    if contract and project_id and contract.get("project_id") and contract["project_id"] != project_id:
+        raise HTTPException(status_code=400, detail="Contract does not belong to project")
+
+async def validate_patched_references(
+    collection, entity_id: str, changes: Dict[str, Any], fields: Tuple[str, ...], not_found_detail: str
+) -> Dict[str, Any]:
+    """PATCH đổi tham chiếu: kiểm tra tập id sau khi ghép với giá trị đang lưu
+    (ví dụ project_id mới phải thuộc client_id đang lưu).
+
+    Trả về guard cho patch_document: giá trị đang lưu của các field không đổi, để
+    lệnh update chỉ áp dụng nếu chúng chưa bị request khác sửa trong lúc kiểm tra.
+    """
+    if not any(field in changes for field in fields):
+        return {}
+    stored = await collection.find_one({"id": entity_id}, {"_id": 0, **{field: 1 for field in fields}})
+    if stored is None:
+        raise HTTPException(status_code=404, detail=not_found_detail)
+    await validate_references(**{field: changes.get(field, stored.get(field)) for field in fields})
+    return {field: stored.get(field) for field in fields if field not in changes}
+
+# Dãy số tăng nguyên tử trong collection counters, mỗi (prefix, YYYYMM) một document
+async def _max_existing_sequence(prefix: str) -> int:
+    """Số thứ tự lớn nhất đã dùng với prefix (dữ liệu cũ trước khi có counters)"""
+    pipeline = [
+        {"$match": {"invoice_number": {"$regex": f"^{re.escape(prefix)}"}}},
+        {"$project": {"seq": {"$convert": {
+            "input": {"$substrCP": [
+                "$invoice_number", len(prefix), {"$subtract": [{"$strLenCP": "$invoice_number"}, len(prefix)]}
+            ]},
+            "to": "int", "onError": 0, "onNull": 0
+        }}}},
+        {"$group": {"_id": None, "max": {"$max": "$seq"}}}
+    ]
+    rows = await db.invoices.aggregate(pipeline).to_list(length=1)
+    return rows[0]["max"] if rows and rows[0]["max"] else 0
+
+# Dãy đã chắc chắn có document trong counters (theo tiến trình) và khóa để mỗi dãy chỉ seed một lần
+_ready_sequences = set()
+_sequence_locks: Dict[str, asyncio.Lock] = {}
+
+async def _ensure_sequence(counter_id: str, seed=None):
+    """Tạo document của dãy nếu chưa có; request đồng thời chờ nhau thay vì cùng seed"""
+    lock = _sequence_locks.setdefault(counter_id, asyncio.Lock())
+    async with lock:
+        if counter_id not in _ready_sequences:
+            if await db.counters.find_one({"_id": counter_id}, {"_id": 1}) is None:
+                start = await seed() if seed else 0
+                try:
+                    await db.counters.insert_one({"_id": counter_id, "seq": start})
+                except DuplicateKeyError:
+                    pass  # Tiến trình khác đã tạo dãy trước
+            _ready_sequences.add(counter_id)
+    _sequence_locks.pop(counter_id, None)
+
+async def next_sequence(counter_id: str, seed=None) -> int:
+    """Lấy số tiếp theo của dãy counter_id bằng một lệnh $inc nguyên tử.
+
+    Lần đầu dùng một dãy, seed() (nếu có) trả về giá trị khởi điểm.
+    """
+    if counter_id not in _ready_sequences:
+        await _ensure_sequence(counter_id, seed)
+    counter = await db.counters.find_one_and_update(
+        {"_id": counter_id}, {"$inc": {"seq": 1}}, return_document=ReturnDocument.AFTER
+    )
+    if counter is None:
+        # Document của dãy bị xóa sau khi đã tạo: tạo lại
+        _ready_sequences.discard(counter_id)
+        return await next_sequence(counter_id, seed)
+    return counter["seq"]
+
+async def next_invoice_number(prefix: str = "INV") -> str:
+    number_prefix = f"{prefix}-{datetime.utcnow().strftime('%Y%m')}-"
+    seq = await next_sequence(
+        f"invoice_number:{number_prefix}", seed=lambda: _max_existing_sequence(number_prefix)
+    )
+    return f"{number_prefix}{seq:04d}"
+
+# Cập nhật từng phần (PATCH) trong một round trip
+def patch_changes(patch: BaseModel, base_model) -> Dict[str, Any]:
+    """Lấy các field client thực sự gửi lên; từ chối null cho field không cho phép null"""
+    changes = patch.dict(exclude_unset=True)
+    changes.pop("version", None)
+    for field, value in changes.items():
+        annotation = base_model.model_fields[field].annotation
+        if value is None and type(None) not in get_args(annotation):
+            raise HTTPException(status_code=422, detail=f"Field '{field}' cannot be null")
+    if not changes:
+        raise HTTPException(status_code=400, detail="No fields to update")
+    return changes
+
+def patch_stage(
+    changes: Dict[str, Any],
+    now: datetime,
+    date_on_status: Optional[Tuple[str, str]] = None,
+    derived: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Stage $set của pipeline update: field thay đổi, updated_at, version + 1 và date_on_status"""
+    stage = {field: {"$literal": value} for field, value in changes.items()}
+    stage.update({field: {"$literal": value} for field, value in (derived or {}).items()})
+    stage["updated_at"] = {"$literal": now}
+    stage["version"] = {"$add": [{"$ifNull": ["$version", 0]}, 1]}
+    if date_on_status and changes.get("status") == date_on_status[0]:
+        target_status, date_field = date_on_status
+        stage[date_field] = {"$cond": [
+            {"$ne": ["$status", target_status]}, {"$literal": now}, f"${date_field}"
+        ]}
+    return stage
+
+async def patch_document(
+    collection,
+    entity_id: str,
+    changes: Dict[str, Any],
+    expected_version: Optional[int],
+    not_found_detail: str,
+    date_on_status: Optional[Tuple[str, str]] = None,
+    derived: Optional[Dict[str, Any]] = None,
+    guard: Optional[Dict[str, Any]] = None,
+) -> Tuple[dict, dict]:
+    """$set chỉ các field thay đổi bằng một find_one_and_update dạng pipeline.
+
+    - date_on_status=(status, field): ghi field = now khi status chuyển sang giá trị đó
+      (ví dụ completion_date, paid_date), tính ngay trong cùng lệnh update.
+    - derived: field phụ chỉ ghi vào DB (ví dụ search.*), không trả về.
+    - expected_version: nếu có, chỉ cập nhật khi version khớp, ngược lại 409.
+    - guard: điều kiện thêm trên giá trị đang lưu (xem validate_patched_references),
+      không khớp thì 409.
+
+    Lệnh update trả về document TRƯỚC khi cập nhật (để tính delta bộ đếm dashboard);
+    document sau cập nhật được suy ra từ chính các giá trị đã $set.
+    Trả về (before, after).
+    """
+    now = datetime.utcnow()
+    stage = patch_stage(changes, now, date_on_status, derived)
+    
+    query: Dict[str, Any] = {"id": entity_id}
+    if expected_version is not None:
+        query["version"] = expected_version if expected_version else {"$in": [0, None]}
+    query.update(guard or {})
+    
+    before = await collection.find_one_and_update(
+        query, [{"$set": stage}], return_document=ReturnDocument.BEFORE
+    )
+    if before is None:
+        conditional = expected_version is not None or guard
+        if conditional and await collection.count_documents({"id": entity_id}, limit=1):
+            raise HTTPException(status_code=409, detail="Version conflict")
+        raise HTTPException(status_code=404, detail=not_found_detail)
+    
+    after = {**before, **changes, "updated_at": now, "version": before.get("version", 0) + 1}
+    if date_on_status and changes.get("status") == date_on_status[0] and before.get("status") != date_on_status[0]:
+        after[date_on_status[1]] = now
+    return before, after
+
 # Routes
 @api_router.post("/token", response_model=Token)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
@@ -274,24 +838,61 @@ async def create_user(user: UserCreate):
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     user_data = user.dict()
     del user_data["password"]
     user_in_db = UserInDB(**user_data, hashed_password=hashed_password)
     
     result = await db.users.insert_one(user_in_db.dict())
+    await invalidate_user(user_in_db.email)
     return user_in_db
 
 @api_router.get("/users/me/", response_model=User)
 async def read_users_me(current_user: User = Depends(get_current_active_user)):
     return current_user
 
+@api_router.get("/users/cache-stats")
+async def read_user_cache_stats(current_user: User = Depends(get_current_active_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    return user_cache.stats()
+
+@api_router.get("/users/hash-pool-stats")
+async def read_password_hash_pool_stats(current_user: User = Depends(get_current_active_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    return password_hash_pool.stats()
+
+@api_router.get("/slow-queries")
+async def read_slow_queries(
+    limit: int = 50,
+    collection: Optional[str] = None,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Các lệnh MongoDB chậm gần nhất (mới nhất trước) kèm thống kê của bộ ghi log"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    query = {"collection": collection} if collection else {}
+    entries = await db[SLOW_QUERIES_COLLECTION].find(query, TRUSTED_PROJECTION) \
+        .sort("$natural", -1).limit(limit).to_list(length=limit)
+    return {"stats": slow_query_log.stats(), "entries": entries}
+
 @api_router.get("/users/", response_model=List[User])
-async def read_users(skip: int = 0, limit: int = 100, current_user: User = Depends(get_current_active_user)):
+async def read_users(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    sort: Optional[str] = None,
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_active_user)
+):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not enough permissions")
-    users = await db.users.find().skip(skip).limit(limit).to_list(length=limit)
-    return users
+    users, next_cursor = await paginate(
+        db.users, "users", {}, skip, limit, sort, cursor, projection=TRUSTED_PROJECTION
+    )
+    set_next_cursor(response, next_cursor)
+    return trusted_response(User, users, response)
 
 # Client routes
 @api_router.post("/clients/", response_model=Client)
@@ -299,12 +900,23 @@ async def create_client(client: ClientCreate, current_user: User = Depends(get_c
     client_data = client.dict()
     client_obj = Client(**client_data, created_by=current_user.id)
     result = await db.clients.insert_one(client_obj.dict())
+    await bump_dashboard_counters({"clients": 1})
     return client_obj
 
 @api_router.get("/clients/", response_model=List[Client])
-async def read_clients(skip: int = 0, limit: int = 100, current_user: User = Depends(get_current_active_user)):
-    clients = await db.clients.find().skip(skip).limit(limit).to_list(length=limit)
-    return clients
+async def read_clients(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    sort: Optional[str] = None,
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_active_user)
+):
+    clients, next_cursor = await paginate(
+        db.clients, "clients", {}, skip, limit, sort, cursor, projection=TRUSTED_PROJECTION
+    )
+    set_next_cursor(response, next_cursor)
+    return trusted_response(Client, clients, response)
 
 @api_router.get("/clients/{client_id}", response_model=Client)
 async def read_client(client_id: str, current_user: User = Depends(get_current_active_user)):
@@ -320,43 +932,60 @@ async def update_client(client_id: str, client: ClientCreate, current_user: User
         raise HTTPException(status_code=404, detail="Client not found")
     
     client_data = client.dict()
-    updated_client = {**db_client, **client_data, "updated_at": datetime.utcnow()}
+    updated_client = {**db_client, **client_data, "updated_at": datetime.utcnow(), "version": db_client.get("version", 0) + 1}
     
     await db.clients.update_one({"id": client_id}, {"$set": updated_client})
     return updated_client
 
+@api_router.patch("/clients/{client_id}", response_model=Client)
+async def patch_client(client_id: str, client: ClientUpdate, current_user: User = Depends(get_current_active_user)):
+    changes = patch_changes(client, ClientBase)
+    _, updated_client = await patch_document(db.clients, client_id, changes, client.version, "Client not found")
+    return updated_client
+
 @api_router.delete("/clients/{client_id}")
 async def delete_client(client_id: str, current_user: User = Depends(get_current_active_user)):
     if current_user.role not in ["admin", "account"]:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
     result = await db.clients.delete_one({"id": client_id})
+    forget_reference("clients", client_id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Client not found")
+    await bump_dashboard_counters({"clients": -1})
     return {"detail": "Client deleted successfully"}
 
 # Project routes
 @api_router.post("/projects/", response_model=Project)
 async def create_project(project: ProjectCreate, current_user: User = Depends(get_current_active_user)):
     # Kiểm tra client tồn tại
-    client = await db.clients.find_one({"id": project.client_id})
-    if not client:
-        raise HTTPException(status_code=404, detail="Client not found")
+    await validate_references(client_id=project.client_id)
     
     project_data = project.dict()
     project_obj = Project(**project_data, created_by=current_user.id)
     result = await db.projects.insert_one(project_obj.dict())
+    await bump_dashboard_counters(project_counter_delta(project_data))
     return project_obj
 
 @api_router.get("/projects/", response_model=List[Project])
-async def read_projects(skip: int = 0, limit: int = 100, current_user: User = Depends(get_current_active_user)):
-    projects = await db.projects.find().skip(skip).limit(limit).to_list(length=limit)
-    return projects
+async def read_projects(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    sort: Optional[str] = None,
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_active_user)
+):
+    projects, next_cursor = await paginate(
+        db.projects, "projects", {}, skip, limit, sort, cursor, projection=TRUSTED_PROJECTION
+    )
+    set_next_cursor(response, next_cursor)
+    return trusted_response(Project, projects, response)
 
 @api_router.get("/projects/client/{client_id}", response_model=List[Project])
 async def read_client_projects(client_id: str, current_user: User = Depends(get_current_active_user)):
-    projects = await db.projects.find({"client_id": client_id}).to_list(length=100)
-    return projects
+    projects = await db.projects.find({"client_id": client_id}, TRUSTED_PROJECTION).to_list(length=100)
+    return trusted_response(Project, projects)
 
 @api_router.get("/projects/{project_id}", response_model=Project)
 async def read_project(project_id: str, current_user: User = Depends(get_current_active_user)):
@@ -367,14 +996,35 @@ async def read_project(project_id: str, current_user: User = Depends(get_current
 
 @api_router.put("/projects/{project_id}", response_model=Project)
 async def update_project(project_id: str, project: ProjectCreate, current_user: User = Depends(get_current_active_user)):
-    db_project = await db.projects.find_one({"id": project_id})
+    db_project, _ = await asyncio.gather(
+        db.projects.find_one({"id": project_id}),
+        validate_references(client_id=project.client_id)
+    )
     if db_project is None:
         raise HTTPException(status_code=404, detail="Project not found")
     
     project_data = project.dict()
-    updated_project = {**db_project, **project_data, "updated_at": datetime.utcnow()}
+    updated_project = {**db_project, **project_data, "updated_at": datetime.utcnow(), "version": db_project.get("version", 0) + 1}
     
     await db.projects.update_one({"id": project_id}, {"$set": updated_project})
+    # Xóa cache sau khi ghi: xóa trước thì request đồng thời có thể nạp lại giá trị cũ
+    forget_reference("projects", project_id)
+    await bump_dashboard_counters(
+        project_counter_delta(db_project, -1), project_counter_delta(updated_project)
+    )
+    return updated_project
+
+@api_router.patch("/projects/{project_id}", response_model=Project)
+async def patch_project(project_id: str, project: ProjectUpdate, current_user: User = Depends(get_current_active_user)):
+    changes = patch_changes(project, ProjectBase)
+    await validate_references(client_id=changes.get("client_id"))
+    db_project, updated_project = await patch_document(
+        db.projects, project_id, changes, project.version, "Project not found"
+    )
+    forget_reference("projects", project_id)
+    await bump_dashboard_counters(
+        project_counter_delta(db_project, -1), project_counter_delta(updated_project)
+    )
     return updated_project
 
 @api_router.delete("/projects/{project_id}")
@@ -382,36 +1032,212 @@ async def delete_project(project_id: str, current_user: User = Depends(get_curre
     if current_user.role not in ["admin", "account"]:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    result = await db.projects.delete_one({"id": project_id})
-    if result.deleted_count == 0:
+    db_project = await db.projects.find_one_and_delete({"id": project_id})
+    forget_reference("projects", project_id)
+    if db_project is None:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    # Xóa các task liên quan
+    # Xóa các task liên quan, trừ bộ đếm theo nhóm status/priority của chúng
+    task_groups = await db.tasks.aggregate([
+        {"$match": {"project_id": project_id}},
+        {"$group": {"_id": {"status": "$status", "priority": "$priority"}, "count": {"$sum": 1}}}
+    ]).to_list(length=None)
     await db.tasks.delete_many({"project_id": project_id})
     
+    await bump_dashboard_counters(
+        project_counter_delta(db_project, -1),
+        *[task_counter_delta(group["_id"], -group["count"]) for group in task_groups]
+    )
+    
     return {"detail": "Project deleted successfully"}
 
 # Task routes
+def new_task_document(task_data: dict, created_by: Optional[str]) -> Tuple[Task, dict]:
+    """Task mới và document để insert (kèm field `search`); dùng chung cho tạo lẻ và tạo hàng loạt"""
+    task_obj = Task(**task_data, created_by=created_by)
+    return task_obj, {**task_obj.dict(), "search": task_search_fields(task_data)}
+
 @api_router.post("/tasks/", response_model=Task)
 async def create_task(task: TaskCreate, current_user: User = Depends(get_current_active_user)):
     # Kiểm tra project tồn tại (nếu có project_id)
-    if task.project_id:
-        project = await db.projects.find_one({"id": task.project_id})
-        if not project:
-            raise HTTPException(status_code=404, detail="Project not found")
+    await validate_references(project_id=task.project_id)
     
     task_data = task.dict()
-    task_obj = Task(**task_data, created_by=current_user.id)
-    result = await db.tasks.insert_one(task_obj.dict())
+    task_obj, document = new_task_document(task_data, current_user.id)
+    result = await db.tasks.insert_one(document)
+    await bump_dashboard_counters(task_counter_delta(task_data))
     return task_obj
 
+TASK_BULK_OPS = ("create", "set_status", "reassign", "delete")
+
+def _bulk_operation_error(operation: TaskBulkOperation) -> Optional[str]:
+    if operation.op not in TASK_BULK_OPS:
+        return f"op must be one of {', '.join(TASK_BULK_OPS)}"
+    if operation.op == "create":
+        return None if operation.task else "task is required for create"
+    if not operation.id:
+        return f"id is required for {operation.op}"
+    if operation.op == "set_status" and not operation.status:
+        return "status is required for set_status"
+    return None
+
+@api_router.post("/tasks/bulk")
+async def bulk_tasks(request: TaskBulkRequest, current_user: User = Depends(get_current_active_user)):
+    """Tạo / đổi trạng thái / phân công lại / xóa nhiều task bằng một lệnh bulk_write.
+
+    Trả về kết quả theo từng thao tác (cùng thứ tự với request).
+    """
+    operations = request.operations
+    if len(operations) > TASK_BULK_MAX_OPERATIONS:
+        raise HTTPException(
+            status_code=400, detail=f"At most {TASK_BULK_MAX_OPERATIONS} operations per request"
+        )
+    
+    results: List[Dict[str, Any]] = [
+        {"index": index, "op": operation.op, "id": operation.id, "ok": False}
+        for index, operation in enumerate(operations)
+    ]
+    errors: Dict[int, str] = {}
+    seen_ids = set()
+    for index, operation in enumerate(operations):
+        error = _bulk_operation_error(operation)
+        # Mỗi task chỉ được xuất hiện một lần để kết quả không phụ thuộc thứ tự ghi
+        if error is None and operation.id:
+            if operation.id in seen_ids:
+                error = "Duplicate task id in request"
+            seen_ids.add(operation.id)
+        if error:
+            errors[index] = error
+    
+    # Trạng thái hiện tại của các task được sửa/xóa và các project được tham chiếu: mỗi loại một $in
+    existing_ids = [op.id for index, op in enumerate(operations) if op.op != "create" and index not in errors]
+    project_ids = list({
+        op.task.project_id for index, op in enumerate(operations)
+        if op.op == "create" and index not in errors and op.task.project_id
+    })
+    current_docs, known_projects = await asyncio.gather(
+        db.tasks.find(
+            {"id": {"$in": existing_ids}}, {"_id": 0, "id": 1, "status": 1, "priority": 1}
+        ).to_list(length=None),
+        db.projects.distinct("id", {"id": {"$in": project_ids}})
+    )
+    current = {doc["id"]: doc for doc in current_docs}
+    known_projects = set(known_projects)
+    
+    now = datetime.utcnow()
+    writes, write_indexes, deltas = [], [], {}
+    for index, operation in enumerate(operations):
+        if index in errors:
+            continue
+        if operation.op == "create":
+            task_data = operation.task.dict()
+            if task_data["project_id"] and task_data["project_id"] not in known_projects:
+                errors[index] = "Project not found"
+                continue
+            task_obj, document = new_task_document(task_data, current_user.id)
+            writes.append(InsertOne(document))
+            results[index]["id"] = task_obj.id
+            deltas[index] = [task_counter_delta(task_data)]
+            write_indexes.append(index)
+            continue
+        
+        db_task = current.get(operation.id)
+        if db_task is None:
+            errors[index] = "Task not found"
+            continue
+        if operation.op == "delete":
+            writes.append(DeleteOne({"id": operation.id}))
+            deltas[index] = [task_counter_delta(db_task, -1)]
+        elif operation.op == "set_status":
+            stage = patch_stage({"status": operation.status}, now, ("completed", "completion_date"))
+            writes.append(UpdateOne({"id": operation.id}, [{"$set": stage}]))
+            deltas[index] = [
+                task_counter_delta(db_task, -1), task_counter_delta({**db_task, "status": operation.status})
+            ]
+        else:
+            stage = patch_stage({"assigned_to": operation.assigned_to}, now)
+            writes.append(UpdateOne({"id": operation.id}, [{"$set": stage}]))
+        write_indexes.append(index)
+    
+    if writes:
+        try:
+            await db.tasks.bulk_write(writes, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                errors[write_indexes[error["index"]]] = error.get("errmsg", "Write failed")
+    
+    applied = [index for index in write_indexes if index not in errors]
+    deleted_ids = [operations[index].id for index in applied if operations[index].op == "delete"]
+    follow_ups = [bump_dashboard_counters(*(delta for index in applied for delta in deltas.get(index, [])))]
+    if deleted_ids:
+        # Xóa feedback của các task đã xóa
+        follow_ups.append(db.task_feedbacks.delete_many({"task_id": {"$in": deleted_ids}}))
+    await asyncio.gather(*follow_ups)
+    
+    for index in applied:
+        results[index]["ok"] = True
+    for index, error in errors.items():
+        results[index]["error"] = error
+    return {"applied": len(applied), "failed": len(errors), "results": results}
+
+# Tìm kiếm text index trên field `search` chỉ dùng được khi index tồn tại và mọi task
+# đã có field này (task cũ được backfill lúc startup); trước đó search_mode=text
+# chuyển về regex. Khi chưa sẵn sàng, trạng thái được kiểm tra lại tối đa mỗi phút.
+TASK_SEARCH_INDEX = "tasks_search_text"
+TASK_SEARCH_RECHECK_SECONDS = 60
+INDEX_NOT_FOUND = 27
+task_search_state = {"ready": False, "checked_at": None}
+
+async def refresh_task_search_ready() -> bool:
+    ready = TASK_SEARCH_INDEX in await db.tasks.index_information()
+    if ready:
+        ready = await db.tasks.find_one({"search": {"$exists": False}}, {"_id": 1}) is None
+    task_search_state.update(ready=ready, checked_at=time.monotonic())
+    return ready
+
+async def task_text_search_ready() -> bool:
+    checked_at = task_search_state["checked_at"]
+    if not task_search_state["ready"] and (
+        checked_at is None or time.monotonic() - checked_at > TASK_SEARCH_RECHECK_SECONDS
+    ):
+        return await refresh_task_search_ready()
+    return task_search_state["ready"]
+
+async def backfill_task_search(batch_size: int = 1000, all_tasks: bool = False) -> int:
+    """Sinh field `search` cho các task chưa có (hoặc cho mọi task nếu all_tasks)"""
+    query = {} if all_tasks else {"search": {"$exists": False}}
+    projection = {"id": 1, "title": 1, "description": 1, "rich_content": 1}
+    updated = 0
+    batch = []
+    async for task in db.tasks.find(query, projection).batch_size(batch_size):
+        batch.append(UpdateOne({"_id": task["_id"]}, {"$set": {"search": task_search_fields(task)}}))
+        if len(batch) >= batch_size:
+            updated += (await db.tasks.bulk_write(batch, ordered=False)).modified_count
+            batch = []
+    if batch:
+        updated += (await db.tasks.bulk_write(batch, ordered=False)).modified_count
+    return updated
+
+def regex_search_query(search: str) -> Dict[str, Any]:
+    """Tìm chuỗi con, không phân biệt hoa thường (hành vi tìm kiếm gốc)"""
+    pattern = re.escape(search)
+    return {"$or": [
+        {"title": {"$regex": pattern, "$options": "i"}},
+        {"description": {"$regex": pattern, "$options": "i"}},
+        {"rich_content": {"$regex": pattern, "$options": "i"}}
+    ]}
+
 @api_router.get("/tasks/", response_model=List[Task])
 async def read_tasks(
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
     status: Optional[str] = None,
     priority: Optional[str] = None,
     search: Optional[str] = None,
+    search_mode: str = "regex",
+    sort: Optional[str] = None,
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_active_user)
 ):
     filter_query = {}
@@ -420,15 +1246,31 @@ async def read_tasks(
         filter_query["status"] = status
     if priority:
         filter_query["priority"] = priority
+    if search and search_mode not in ("text", "regex"):
+        raise HTTPException(status_code=400, detail="search_mode must be 'text' or 'regex'")
+    if search and search_mode == "text" and await task_text_search_ready():
+        # Tìm kiếm qua text index, không dấu, xếp theo độ liên quan
+        if sort or cursor:
+            raise HTTPException(status_code=400, detail="sort/cursor are not supported with text search")
+        score = {"score": {"$meta": "textScore"}}
+        try:
+            tasks = await db.tasks.find(
+                {**filter_query, **text_search_query(search)}, {**TRUSTED_PROJECTION, **score}
+            ).sort([("score", score["score"])]).skip(skip).limit(limit).to_list(length=limit)
+            return trusted_response(Task, tasks)
+        except OperationFailure as exc:
+            if exc.code != INDEX_NOT_FOUND:
+                raise
+            # Text index bị xóa sau lần kiểm tra trước: dùng regex
+            task_search_state.update(ready=False, checked_at=time.monotonic())
     if search:
-        filter_query["$or"] = [
-            {"title": {"$regex": search, "$options": "i"}},
-            {"description": {"$regex": search, "$options": "i"}},
-            {"rich_content": {"$regex": search, "$options": "i"}}
-        ]
+        filter_query.update(regex_search_query(search))
     
-    tasks = await db.tasks.find(filter_query).skip(skip).limit(limit).to_list(length=limit)
-    return tasks
+    tasks, next_cursor = await paginate(
+        db.tasks, "tasks", filter_query, skip, limit, sort, cursor, projection=TRUSTED_PROJECTION
+    )
+    set_next_cursor(response, next_cursor)
+    return trusted_response(Task, tasks, response)
 
 @api_router.get("/tasks/stats")
 async def get_task_stats(current_user: User = Depends(get_current_active_user)):
@@ -438,43 +1280,41 @@ async def get_task_stats(current_user: User = Depends(get_current_active_user)):
     today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
     tomorrow = today + timedelta(days=1)
     
-    # Đếm theo trạng thái
-    urgent_count = await db.tasks.count_documents({"priority": "urgent"})
-    todo_count = await db.tasks.count_documents({"status": "todo"})
-    in_progress_count = await db.tasks.count_documents({"status": "in_progress"})
-    
-    # Đếm deadline hôm nay
-    due_today_count = await db.tasks.count_documents({
-        "due_date": {"$gte": today, "$lt": tomorrow},
-        "status": {"$ne": "completed"}
-    })
-    
-    # Đếm quá hạn
-    overdue_count = await db.tasks.count_documents({
-        "due_date": {"$lt": today},
-        "status": {"$ne": "completed"}
-    })
+    # Đếm theo trạng thái/độ ưu tiên: đọc từ dashboard_counters
+    # Đếm deadline hôm nay và quá hạn phụ thuộc thời điểm nên vẫn truy vấn
+    counters, due_today_count, overdue_count = await asyncio.gather(
+        get_dashboard_counters(),
+        db.tasks.count_documents({
+            "due_date": {"$gte": today, "$lt": tomorrow},
+            "status": {"$ne": "completed"}
+        }),
+        db.tasks.count_documents({
+            "due_date": {"$lt": today},
+            "status": {"$ne": "completed"}
+        })
+    )
+    task_counters = counters.get("tasks", {})
     
     return {
-        "urgent": urgent_count,
-        "todo": todo_count,
-        "in_progress": in_progress_count,
+        "urgent": task_counters.get("priority", {}).get("urgent", 0),
+        "todo": task_counters.get("status", {}).get("todo", 0),
+        "in_progress": task_counters.get("status", {}).get("in_progress", 0),
         "due_today": due_today_count,
         "overdue": overdue_count
     }
 
 @api_router.get("/tasks/project/{project_id}", response_model=List[Task])
 async def read_project_tasks(project_id: str, current_user: User = Depends(get_current_active_user)):
-    tasks = await db.tasks.find({"project_id": project_id}).to_list(length=100)
-    return tasks
+    tasks = await db.tasks.find({"project_id": project_id}, TRUSTED_PROJECTION).to_list(length=100)
+    return trusted_response(Task, tasks)
 
 @api_router.get("/tasks/assigned/{user_id}", response_model=List[Task])
 async def read_assigned_tasks(user_id: str, current_user: User = Depends(get_current_active_user)):
     if current_user.id != user_id and current_user.role not in ["admin", "account"]:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    tasks = await db.tasks.find({"assigned_to": user_id}).to_list(length=100)
-    return tasks
+    tasks = await db.tasks.find({"assigned_to": user_id}, TRUSTED_PROJECTION).to_list(length=100)
+    return trusted_response(Task, tasks)
 
 @api_router.get("/tasks/{task_id}", response_model=Task)
 async def read_task(task_id: str, current_user: User = Depends(get_current_active_user)):
@@ -485,18 +1325,36 @@ async def read_task(task_id: str, current_user: User = Depends(get_current_activ
 
 @api_router.put("/tasks/{task_id}", response_model=Task)
 async def update_task(task_id: str, task: TaskCreate, current_user: User = Depends(get_current_active_user)):
-    db_task = await db.tasks.find_one({"id": task_id})
+    db_task, _ = await asyncio.gather(
+        db.tasks.find_one({"id": task_id}),
+        validate_references(project_id=task.project_id)
+    )
     if db_task is None:
         raise HTTPException(status_code=404, detail="Task not found")
     
     task_data = task.dict()
-    updated_task = {**db_task, **task_data, "updated_at": datetime.utcnow()}
+    updated_task = {**db_task, **task_data, "updated_at": datetime.utcnow(), "version": db_task.get("version", 0) + 1}
+    updated_task["search"] = task_search_fields(updated_task)
     
     # Nếu đang chuyển trạng thái sang completed, cập nhật completion_date
     if task.status == "completed" and db_task.get("status") != "completed":
         updated_task["completion_date"] = datetime.utcnow()
     
     await db.tasks.update_one({"id": task_id}, {"$set": updated_task})
+    await bump_dashboard_counters(task_counter_delta(db_task, -1), task_counter_delta(updated_task))
+    return updated_task
+
+@api_router.patch("/tasks/{task_id}", response_model=Task)
+async def patch_task(task_id: str, task: TaskUpdate, current_user: User = Depends(get_current_active_user)):
+    changes = patch_changes(task, TaskBase)
+    await validate_references(project_id=changes.get("project_id"))
+    # Chuyển sang completed thì ghi completion_date trong cùng lệnh update
+    db_task, updated_task = await patch_document(
+        db.tasks, task_id, changes, task.version, "Task not found",
+        date_on_status=("completed", "completion_date"),
+        derived=task_search_updates(changes)
+    )
+    await bump_dashboard_counters(task_counter_delta(db_task, -1), task_counter_delta(updated_task))
     return updated_task
 
 @api_router.delete("/tasks/{task_id}")
@@ -504,9 +1362,10 @@ async def delete_task(task_id: str, current_user: User = Depends(get_current_act
     # Xóa task feedback trước
     await db.task_feedbacks.delete_many({"task_id": task_id})
     
-    result = await db.tasks.delete_one({"id": task_id})
-    if result.deleted_count == 0:
+    db_task = await db.tasks.find_one_and_delete({"id": task_id})
+    if db_task is None:
         raise HTTPException(status_code=404, detail="Task not found")
+    await bump_dashboard_counters(task_counter_delta(db_task, -1))
     return {"detail": "Task deleted successfully"}
 
 # Task Feedback routes
@@ -535,8 +1394,9 @@ async def get_task_feedback(
     task_id: str, 
     current_user: User = Depends(get_current_active_user)
 ):
-    feedback = await db.task_feedbacks.find({"task_id": task_id}).sort("created_at", 1).to_list(length=100)
-    return feedback
+    feedback = await db.task_feedbacks.find({"task_id": task_id}, TRUSTED_PROJECTION) \
+        .sort("created_at", 1).to_list(length=100)
+    return trusted_response(TaskFeedback, feedback)
 
 @api_router.delete("/feedback/{feedback_id}")
 async def delete_task_feedback(feedback_id: str, current_user: User = Depends(get_current_active_user)):
@@ -556,16 +1416,8 @@ async def delete_task_feedback(feedback_id: str, current_user: User = Depends(ge
 # Contract routes
 @api_router.post("/contracts/", response_model=Contract)
 async def create_contract(contract: ContractCreate, current_user: User = Depends(get_current_active_user)):
-    # Kiểm tra client tồn tại
-    client = await db.clients.find_one({"id": contract.client_id})
-    if not client:
-        raise HTTPException(status_code=404, detail="Client not found")
-    
-    # Kiểm tra project tồn tại (nếu có)
-    if contract.project_id:
-        project = await db.projects.find_one({"id": contract.project_id})
-        if not project:
-            raise HTTPException(status_code=404, detail="Project not found")
+    # Kiểm tra client và project (nếu có) tồn tại, project thuộc client
+    await validate_references(client_id=contract.client_id, project_id=contract.project_id)
     
     contract_data = contract.dict()
     contract_obj = Contract(**contract_data, created_by=current_user.id)
@@ -573,14 +1425,24 @@ async def create_contract(contract: ContractCreate, current_user: User = Depends
     return contract_obj
 
 @api_router.get("/contracts/", response_model=List[Contract])
-async def read_contracts(skip: int = 0, limit: int = 100, current_user: User = Depends(get_current_active_user)):
-    contracts = await db.contracts.find().skip(skip).limit(limit).to_list(length=limit)
-    return contracts
+async def read_contracts(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    sort: Optional[str] = None,
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_active_user)
+):
+    contracts, next_cursor = await paginate(
+        db.contracts, "contracts", {}, skip, limit, sort, cursor, projection=TRUSTED_PROJECTION
+    )
+    set_next_cursor(response, next_cursor)
+    return trusted_response(Contract, contracts, response)
 
 @api_router.get("/contracts/client/{client_id}", response_model=List[Contract])
 async def read_client_contracts(client_id: str, current_user: User = Depends(get_current_active_user)):
-    contracts = await db.contracts.find({"client_id": client_id}).to_list(length=100)
-    return contracts
+    contracts = await db.contracts.find({"client_id": client_id}, TRUSTED_PROJECTION).to_list(length=100)
+    return trusted_response(Contract, contracts)
 
 @api_router.get("/contracts/{contract_id}", response_model=Contract)
 async def read_contract(contract_id: str, current_user: User = Depends(get_current_active_user)):
@@ -591,14 +1453,31 @@ async def read_contract(contract_id: str, current_user: User = Depends(get_curre
 
 @api_router.put("/contracts/{contract_id}", response_model=Contract)
 async def update_contract(contract_id: str, contract: ContractCreate, current_user: User = Depends(get_current_active_user)):
-    db_contract = await db.contracts.find_one({"id": contract_id})
+    db_contract, _ = await asyncio.gather(
+        db.contracts.find_one({"id": contract_id}),
+        validate_references(client_id=contract.client_id, project_id=contract.project_id)
+    )
     if db_contract is None:
         raise HTTPException(status_code=404, detail="Contract not found")
     
     contract_data = contract.dict()
-    updated_contract = {**db_contract, **contract_data, "updated_at": datetime.utcnow()}
+    updated_contract = {**db_contract, **contract_data, "updated_at": datetime.utcnow(), "version": db_contract.get("version", 0) + 1}
     
     await db.contracts.update_one({"id": contract_id}, {"$set": updated_contract})
+    # Xóa cache sau khi ghi: xóa trước thì request đồng thời có thể nạp lại giá trị cũ
+    forget_reference("contracts", contract_id)
+    return updated_contract
+
+@api_router.patch("/contracts/{contract_id}", response_model=Contract)
+async def patch_contract(contract_id: str, contract: ContractUpdate, current_user: User = Depends(get_current_active_user)):
+    changes = patch_changes(contract, ContractBase)
+    guard = await validate_patched_references(
+        db.contracts, contract_id, changes, ("client_id", "project_id"), "Contract not found"
+    )
+    _, updated_contract = await patch_document(
+        db.contracts, contract_id, changes, contract.version, "Contract not found", guard=guard
+    )
+    forget_reference("contracts", contract_id)
     return updated_contract
 
 @api_router.delete("/contracts/{contract_id}")
@@ -607,6 +1486,7 @@ async def delete_contract(contract_id: str, current_user: User = Depends(get_cur
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
     result = await db.contracts.delete_one({"id": contract_id})
+    forget_reference("contracts", contract_id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Contract not found")
     return {"detail": "Contract deleted successfully"}
@@ -614,41 +1494,39 @@ async def delete_contract(contract_id: str, current_user: User = Depends(get_cur
 # Invoice routes
 @api_router.post("/invoices/", response_model=Invoice)
 async def create_invoice(invoice: InvoiceCreate, current_user: User = Depends(get_current_active_user)):
-    # Kiểm tra client tồn tại
-    client = await db.clients.find_one({"id": invoice.client_id})
-    if not client:
-        raise HTTPException(status_code=404, detail="Client not found")
-    
-    # Kiểm tra project tồn tại (nếu có)
-    if invoice.project_id:
-        project = await db.projects.find_one({"id": invoice.project_id})
-        if not project:
-            raise HTTPException(status_code=404, detail="Project not found")
-    
-    # Kiểm tra contract tồn tại (nếu có)
-    if invoice.contract_id:
-        contract = await db.contracts.find_one({"id": invoice.contract_id})
-        if not contract:
-            raise HTTPException(status_code=404, detail="Contract not found")
+    # Kiểm tra client, project, contract (nếu có) tồn tại và nhất quán với nhau
+    await validate_references(
+        client_id=invoice.client_id, project_id=invoice.project_id, contract_id=invoice.contract_id
+    )
     
     # Tạo số hóa đơn duy nhất (theo định dạng: INV-YYYYMM-XXXX)
-    invoice_count = await db.invoices.count_documents({})
-    invoice_number = f"INV-{datetime.utcnow().strftime('%Y%m')}-{invoice_count + 1:04d}"
+    invoice_number = await next_invoice_number()
     
     invoice_data = invoice.dict()
     invoice_obj = Invoice(**invoice_data, invoice_number=invoice_number, created_by=current_user.id)
     result = await db.invoices.insert_one(invoice_obj.dict())
+    await bump_dashboard_counters(invoice_counter_delta(invoice_data))
     return invoice_obj
 
 @api_router.get("/invoices/", response_model=List[Invoice])
-async def read_invoices(skip: int = 0, limit: int = 100, current_user: User = Depends(get_current_active_user)):
-    invoices = await db.invoices.find().skip(skip).limit(limit).to_list(length=limit)
-    return invoices
+async def read_invoices(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    sort: Optional[str] = None,
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_active_user)
+):
+    invoices, next_cursor = await paginate(
+        db.invoices, "invoices", {}, skip, limit, sort, cursor, projection=TRUSTED_PROJECTION
+    )
+    set_next_cursor(response, next_cursor)
+    return trusted_response(Invoice, invoices, response)
 
 @api_router.get("/invoices/client/{client_id}", response_model=List[Invoice])
 async def read_client_invoices(client_id: str, current_user: User = Depends(get_current_active_user)):
-    invoices = await db.invoices.find({"client_id": client_id}).to_list(length=100)
-    return invoices
+    invoices = await db.invoices.find({"client_id": client_id}, TRUSTED_PROJECTION).to_list(length=100)
+    return trusted_response(Invoice, invoices)
 
 @api_router.get("/invoices/{invoice_id}", response_model=Invoice)
 async def read_invoice(invoice_id: str, current_user: User = Depends(get_current_active_user)):
@@ -659,18 +1537,42 @@ async def read_invoice(invoice_id: str, current_user: User = Depends(get_current
 
 @api_router.put("/invoices/{invoice_id}", response_model=Invoice)
 async def update_invoice(invoice_id: str, invoice: InvoiceCreate, current_user: User = Depends(get_current_active_user)):
-    db_invoice = await db.invoices.find_one({"id": invoice_id})
+    db_invoice, _ = await asyncio.gather(
+        db.invoices.find_one({"id": invoice_id}),
+        validate_references(
+            client_id=invoice.client_id, project_id=invoice.project_id, contract_id=invoice.contract_id
+        )
+    )
     if db_invoice is None:
         raise HTTPException(status_code=404, detail="Invoice not found")
     
     invoice_data = invoice.dict()
-    updated_invoice = {**db_invoice, **invoice_data, "updated_at": datetime.utcnow()}
+    updated_invoice = {**db_invoice, **invoice_data, "updated_at": datetime.utcnow(), "version": db_invoice.get("version", 0) + 1}
     
     # Nếu đang chuyển trạng thái sang paid, cập nhật paid_date
     if invoice.status == "paid" and db_invoice.get("status") != "paid":
         updated_invoice["paid_date"] = datetime.utcnow()
     
     await db.invoices.update_one({"id": invoice_id}, {"$set": updated_invoice})
+    await bump_dashboard_counters(
+        invoice_counter_delta(db_invoice, -1), invoice_counter_delta(updated_invoice)
+    )
+    return updated_invoice
+
+@api_router.patch("/invoices/{invoice_id}", response_model=Invoice)
+async def patch_invoice(invoice_id: str, invoice: InvoiceUpdate, current_user: User = Depends(get_current_active_user)):
+    changes = patch_changes(invoice, InvoiceBase)
+    guard = await validate_patched_references(
+        db.invoices, invoice_id, changes, ("client_id", "project_id", "contract_id"), "Invoice not found"
+    )
+    # Chuyển sang paid thì ghi paid_date trong cùng lệnh update
+    db_invoice, updated_invoice = await patch_document(
+        db.invoices, invoice_id, changes, invoice.version, "Invoice not found",
+        date_on_status=("paid", "paid_date"), guard=guard
+    )
+    await bump_dashboard_counters(
+        invoice_counter_delta(db_invoice, -1), invoice_counter_delta(updated_invoice)
+    )
     return updated_invoice
 
 @api_router.delete("/invoices/{invoice_id}")
@@ -678,88 +1580,222 @@ async def delete_invoice(invoice_id: str, current_user: User = Depends(get_curre
     if current_user.role not in ["admin", "account"]:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    result = await db.invoices.delete_one({"id": invoice_id})
-    if result.deleted_count == 0:
+    db_invoice = await db.invoices.find_one_and_delete({"id": invoice_id})
+    if db_invoice is None:
         raise HTTPException(status_code=404, detail="Invoice not found")
+    await bump_dashboard_counters(invoice_counter_delta(db_invoice, -1))
     return {"detail": "Invoice deleted successfully"}
 
+# Export
+# collection -> (model, các filter query được hỗ trợ)
+EXPORT_COLLECTIONS = {
+    "clients": (Client, ()),
+    "tasks": (Task, ("status", "priority", "project_id", "assigned_to")),
+    "contracts": (Contract, ("status", "client_id", "project_id")),
+    "invoices": (Invoice, ("status", "client_id", "project_id", "contract_id")),
+}
+
+@api_router.get("/export/{collection}")
+async def export_collection(
+    collection: str,
+    request: Request,
+    format: str = "ndjson",
+    since: Optional[datetime] = None,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Stream toàn bộ collection dạng NDJSON/CSV theo thứ tự (updated_at, id)"""
+    if collection not in EXPORT_COLLECTIONS:
+        raise HTTPException(status_code=404, detail="Unknown export collection")
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'csv'")
+    
+    model, filter_fields = EXPORT_COLLECTIONS[collection]
+    filter_query = {
+        field: request.query_params[field]
+        for field in filter_fields
+        if request.query_params.get(field)
+    }
+    if since is not None:
+        filter_query["updated_at"] = {"$gt": since}
+    
+    fields = list(model.model_fields)
+    cursor = db[collection].find(filter_query, export_projection(fields)) \
+        .sort([("updated_at", 1), ("id", 1)]).batch_size(EXPORT_BATCH_SIZE)
+    timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+    return StreamingResponse(
+        stream_export(cursor, format, fields),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{collection}-{timestamp}.{format}"'}
+    )
+
+# Import
+# collection -> (model create, model lưu, field khóa ngoại, collection được tham chiếu)
+IMPORT_COLLECTIONS = {
+    "clients": (ClientCreate, Client, None, None),
+    "projects": (ProjectCreate, Project, "client_id", "clients"),
+    "tasks": (TaskCreate, Task, "project_id", "projects"),
+}
+
+def _import_document(collection: str, model, data: dict, row: dict, created_by: Optional[str]) -> dict:
+    extra = {"created_by": created_by}
+    # Giữ id gốc nếu file có (vd. file export) để các file sau tham chiếu được
+    if isinstance(row.get("id"), str) and row["id"]:
+        extra["id"] = row["id"]
+    document = model(**data, **extra).dict()
+    if collection == "tasks":
+        document["search"] = task_search_fields(data)
+    return document
+
+async def import_records(collection: str, rows, created_by: Optional[str] = None,
+                         chunk_size: int = IMPORT_CHUNK_SIZE) -> Dict[str, Any]:
+    """Validate và ghi các dòng theo chunk; trả về số dòng đã ghi và lỗi theo từng dòng.
+
+    rows là iterable (số dòng, dữ liệu, lỗi đọc) do bulk_import.iter_rows sinh ra.
+    """
+    create_model, model, fk_field, fk_collection = IMPORT_COLLECTIONS[collection]
+    report = {"inserted": 0, "failed": 0, "errors": []}
+    
+    def fail(row_number: int, errors):
+        report["failed"] += 1
+        if len(report["errors"]) < IMPORT_MAX_ERRORS:
+            report["errors"].append({"row": row_number, "errors": errors})
+    
+    # Đọc/parse file là I/O đồng bộ: lấy từng chunk trên thread pool để không chặn event loop
+    chunks = chunked(rows, chunk_size)
+    while True:
+        chunk = await run_in_threadpool(next, chunks, None)
+        if chunk is None:
+            break
+        valid = []
+        for row_number, row, parse_error in chunk:
+            if parse_error:
+                fail(row_number, [parse_error])
+                continue
+            try:
+                data = create_model(**row).dict()
+            except ValidationError as e:
+                fail(row_number, [
+                    f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+                ])
+                continue
+            valid.append((row_number, row, data))
+        
+        # Kiểm tra khóa ngoại của cả chunk bằng một truy vấn $in
+        if fk_field:
+            referenced = {data[fk_field] for _, _, data in valid if data.get(fk_field)}
+            existing = set()
+            if referenced:
+                existing = set(await db[fk_collection].distinct("id", {"id": {"$in": list(referenced)}}))
+            checked = []
+            for row_number, row, data in valid:
+                if data.get(fk_field) and data[fk_field] not in existing:
+                    fail(row_number, [f"{fk_field}: {fk_collection[:-1].capitalize()} not found"])
+                else:
+                    checked.append((row_number, row, data))
+            valid = checked
+        
+        if not valid:
+            continue
+        documents = [_import_document(collection, model, data, row, created_by) for _, row, data in valid]
+        failed_indexes = set()
+        try:
+            await db[collection].insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                failed_indexes.add(error["index"])
+                message = "Duplicate id" if error.get("code") == 11000 else error.get("errmsg", "Write failed")
+                fail(valid[error["index"]][0], [message])
+        
+        inserted = [data for index, (_, _, data) in enumerate(valid) if index not in failed_indexes]
+        report["inserted"] += len(inserted)
+        if collection == "clients":
+            await bump_dashboard_counters({"clients": len(inserted)})
+        elif collection == "projects":
+            await bump_dashboard_counters(*(project_counter_delta(data) for data in inserted))
+        else:
+            await bump_dashboard_counters(*(task_counter_delta(data) for data in inserted))
+    
+    report["errors"].sort(key=lambda error: error["row"])
+    return report
+
+@api_router.post("/import/{collection}")
+async def import_collection(
+    collection: str,
+    file: UploadFile = File(...),
+    format: str = "csv",
+    current_user: User = Depends(get_current_active_user)
+):
+    """Import hàng loạt clients/projects/tasks từ file CSV hoặc NDJSON"""
+    if collection not in IMPORT_COLLECTIONS:
+        raise HTTPException(status_code=404, detail="Unknown import collection")
+    if format not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="format must be 'csv' or 'ndjson'")
+    
+    return await import_records(collection, iter_rows(file.file, format), created_by=current_user.id)
+
 # Dashboard Data
+PROJECT_STATUSES = ["planning", "in_progress", "on_hold", "completed", "cancelled"]
+TASK_STATUSES = ["to_do", "in_progress", "review", "completed"]
+INVOICE_STATUSES = ["draft", "sent", "paid", "overdue", "cancelled"]
+
+# Danh sách task sắp đến hạn trên dashboard: bỏ field nội bộ `search` và nội dung dài
+UPCOMING_TASK_PROJECTION = {"_id": 0, "search": 0, "rich_content": 0}
+
+async def _task_dashboard_queries(user_id: str, today: datetime, next_week: datetime):
+    """Các số liệu task phụ thuộc user/thời gian; mỗi truy vấn dùng index riêng
+    (tasks_assigned_to, tasks_due_date_status) thay vì một $facet quét cả collection"""
+    return await asyncio.gather(
+        db.tasks.count_documents({"assigned_to": user_id}),
+        db.tasks.find(
+            {"due_date": {"$gte": today, "$lte": next_week}, "status": {"$ne": "completed"}},
+            UPCOMING_TASK_PROJECTION
+        ).limit(10).to_list(length=10)
+    )
+
 @api_router.get("/dashboard", response_model=Dict[str, Any])
 async def get_dashboard_data(current_user: User = Depends(get_current_active_user)):
-    # Số lượng khách hàng
-    client_count = await db.clients.count_documents({})
-    
-    # Số lượng dự án theo trạng thái
-    projects_by_status = {
-        "planning": await db.projects.count_documents({"status": "planning"}),
-        "in_progress": await db.projects.count_documents({"status": "in_progress"}),
-        "on_hold": await db.projects.count_documents({"status": "on_hold"}),
-        "completed": await db.projects.count_documents({"status": "completed"}),
-        "cancelled": await db.projects.count_documents({"status": "cancelled"})
-    }
-    
-    # Số lượng task theo trạng thái
-    tasks_by_status = {
-        "to_do": await db.tasks.count_documents({"status": "to_do"}),
-        "in_progress": await db.tasks.count_documents({"status": "in_progress"}),
-        "review": await db.tasks.count_documents({"status": "review"}),
-        "completed": await db.tasks.count_documents({"status": "completed"})
-    }
-    
-    # Số lượng task được gán cho người dùng hiện tại
-    user_tasks = await db.tasks.count_documents({"assigned_to": current_user.id})
-    
-    # Số lượng hóa đơn theo trạng thái
-    invoices_by_status = {
-        "draft": await db.invoices.count_documents({"status": "draft"}),
-        "sent": await db.invoices.count_documents({"status": "sent"}),
-        "paid": await db.invoices.count_documents({"status": "paid"}),
-        "overdue": await db.invoices.count_documents({"status": "overdue"}),
-        "cancelled": await db.invoices.count_documents({"status": "cancelled"})
-    }
-    
-    # Tổng số tiền hóa đơn đã thanh toán
-    paid_invoices = await db.invoices.find({"status": "paid"}).to_list(length=1000)
-    total_paid = sum(invoice["amount"] for invoice in paid_invoices)
-    
-    # Tổng số tiền hóa đơn đang chờ thanh toán
-    pending_invoices = await db.invoices.find({"status": "sent"}).to_list(length=1000)
-    total_pending = sum(invoice["amount"] for invoice in pending_invoices)
-    
-    # Tổng số tiền hóa đơn quá hạn
-    overdue_invoices = await db.invoices.find({"status": "overdue"}).to_list(length=1000)
-    total_overdue = sum(invoice["amount"] for invoice in overdue_invoices)
-    
-    # Các task gần đến hạn (trong vòng 7 ngày)
     today = datetime.utcnow()
     next_week = today + timedelta(days=7)
-    upcoming_tasks = await db.tasks.find({
-        "due_date": {"$gte": today, "$lte": next_week},
-        "status": {"$ne": "completed"}
-    }).to_list(length=10)
-    
-    # Các hợp đồng sắp hết hạn (trong vòng 30 ngày)
     next_month = today + timedelta(days=30)
-    expiring_contracts = await db.contracts.find({
-        "end_date": {"$gte": today, "$lte": next_month},
-        "status": "active"
-    }).to_list(length=10)
+    
+    # Số liệu tổng hợp đọc từ dashboard_counters; phần còn lại chạy song song
+    counters, (user_tasks, upcoming_tasks), expiring_contracts = await asyncio.gather(
+        get_dashboard_counters(),
+        _task_dashboard_queries(current_user.id, today, next_week),
+        # Các hợp đồng sắp hết hạn (trong vòng 30 ngày)
+        db.contracts.find(
+            {"end_date": {"$gte": today, "$lte": next_month}, "status": "active"},
+            {"_id": 0}
+        ).to_list(length=10)
+    )
+    
+    projects = counters.get("projects", {}).get("status", {})
+    tasks = counters.get("tasks", {}).get("status", {})
+    invoice_counts = counters.get("invoices", {}).get("count", {})
+    invoice_amounts = counters.get("invoices", {}).get("amount", {})
     
     return {
-        "client_count": client_count,
-        "projects_by_status": projects_by_status,
-        "tasks_by_status": tasks_by_status,
+        "client_count": counters.get("clients", 0),
+        "projects_by_status": {s: projects.get(s, 0) for s in PROJECT_STATUSES},
+        "tasks_by_status": {s: tasks.get(s, 0) for s in TASK_STATUSES},
         "user_tasks": user_tasks,
-        "invoices_by_status": invoices_by_status,
+        "invoices_by_status": {s: invoice_counts.get(s, 0) for s in INVOICE_STATUSES},
         "financial": {
-            "total_paid": total_paid,
-            "total_pending": total_pending,
-            "total_overdue": total_overdue
+            "total_paid": invoice_amounts.get("paid", 0),
+            "total_pending": invoice_amounts.get("sent", 0),
+            "total_overdue": invoice_amounts.get("overdue", 0)
         },
         "upcoming_tasks": upcoming_tasks,
         "expiring_contracts": expiring_contracts
     }
 
+@api_router.post("/dashboard/reconcile")
+async def reconcile_dashboard(current_user: User = Depends(get_current_active_user)):
+    """Dựng lại dashboard_counters từ dữ liệu thật và trả về độ lệch"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    return await reconcile_dashboard_counters()
+
 # Endpoint để tạo user admin ban đầu
 @api_router.post("/setup")
 async def setup_initial_admin():
@@ -776,12 +1812,13 @@ async def setup_initial_admin():
         password="admin123"
     )
     
-    hashed_password = get_password_hash(admin_user.password)
+    hashed_password = await get_password_hash_async(admin_user.password)
     admin_data = admin_user.dict()
     del admin_data["password"]
     admin_in_db = UserInDB(**admin_data, hashed_password=hashed_password)
     
     await db.users.insert_one(admin_in_db.dict())
+    await invalidate_user(admin_in_db.email)
     
     return {"message": "Initial admin user created", "email": "admin@example.com", "password": "admin123"}
 
@@ -886,48 +1923,241 @@ class TaskDetailComponent(TaskDetailComponentBase):
 
 # Service Template API Endpoints
 
+# Cache đọc cho hệ thống service template: mỗi template một version stamp,
+# mọi endpoint ghi đều bump version; các worker khác nhận version mới qua pub/sub
+TEMPLATE_LIST_SCOPE = "service_templates"
+template_cache = VersionedCache(
+    db.cache_versions,
+    make_pubsub(REDIS_URL),
+    channel="service-template-cache",
+    maxsize=int(os.environ.get("TEMPLATE_CACHE_MAXSIZE", "2048")),
+    ttl=float(os.environ.get("TEMPLATE_CACHE_TTL_SECONDS", "300")),
+)
+
+def template_scope(template_id: str) -> str:
+    return f"service_template:{template_id}"
+
+async def template_id_for_service(service_id: str) -> Optional[str]:
+    key = ("service", service_id)
+    template_id = template_cache.parents.get(key)
+    if template_id is None:
+        service = await db.services.find_one({"id": service_id}, {"_id": 0, "template_id": 1})
+        if service is None:
+            return None
+        template_id = service["template_id"]
+        template_cache.parents.set(key, template_id)
+    return template_id
+
+async def template_id_for_task_template(task_template_id: str) -> Optional[str]:
+    key = ("task_template", task_template_id)
+    service_id = template_cache.parents.get(key)
+    if service_id is None:
+        task = await db.task_templates.find_one({"id": task_template_id}, {"_id": 0, "service_id": 1})
+        if task is None:
+            return None
+        service_id = task["service_id"]
+        template_cache.parents.set(key, service_id)
+    return await template_id_for_service(service_id)
+
+async def bump_template_cache(*template_ids: Optional[str], list_changed: bool = False, forget=()):
+    """Gọi sau mỗi lần ghi vào hệ thống service template"""
+    scopes = [template_scope(template_id) for template_id in template_ids if template_id]
+    if list_changed:
+        scopes.append(TEMPLATE_LIST_SCOPE)
+    if scopes:
+        await template_cache.bump(scopes, forget)
+
+async def serve_template_cached(request: Request, response: Response, scope: str, key, loader, model=None):
+    """Phục vụ từ cache theo version; trả 304 nếu If-None-Match khớp ETag.
+
+    Có model (danh sách) thì cache luôn JSON đã serialize, cache hit không phải dump lại.
+    """
+    version = await template_cache.version(scope)
+    etag = f'W/"{version}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    value = template_cache.get(scope, version, key)
+    if value is None:
+        value = await loader()
+        if model is not None:
+            value = dump_trusted(model, value)
+        template_cache.put(scope, version, key, value)
+    if model is not None:
+        return Response(content=value, media_type="application/json", headers={"ETag": etag})
+    return value
+
+# Sắp xếp thứ tự (order_index) cho services, task templates và components.
+# order_index cách nhau ORDER_INDEX_GAP để di chuyển một phần tử chỉ ghi một document;
+# khi hết khoảng trống giữa hai phần tử thì đánh số lại cả nhóm anh em.
+ORDER_INDEX_GAP = 1024
+
+# collection -> field cha
+ORDERED_COLLECTIONS = {
+    "services": "template_id",
+    "task_templates": "service_id",
+    "task_detail_components": "task_template_id",
+}
+
+class ComponentReorderItem(BaseModel):
+    id: str
+    order_index: int
+
+class ReorderMove(BaseModel):
+    id: str
+    after_id: Optional[str] = None  # None: đưa lên đầu
+
+class ReorderRequest(BaseModel):
+    parent_id: Optional[str] = None
+    items: List[ComponentReorderItem] = []  # Gán order_index cho nhiều phần tử
+    move: Optional[ReorderMove] = None  # Hoặc di chuyển một phần tử ra sau after_id
+
+async def _template_id_for_parent(collection_name: str, parent_id: str) -> Optional[str]:
+    if collection_name == "services":
+        return parent_id
+    if collection_name == "task_templates":
+        return await template_id_for_service(parent_id)
+    return await template_id_for_task_template(parent_id)
+
+async def _validate_same_parent(collection, parent_field: str, ids: List[str], parent_id: Optional[str]) -> str:
+    """Mọi id phải tồn tại và cùng một cha (một lần aggregate)"""
+    groups = await collection.aggregate([
+        {"$match": {"id": {"$in": ids}}},
+        {"$group": {"_id": f"${parent_field}", "count": {"$sum": 1}}}
+    ]).to_list(length=None)
+    if sum(group["count"] for group in groups) != len(set(ids)):
+        raise HTTPException(status_code=404, detail="Some items were not found")
+    if len(groups) != 1 or (parent_id is not None and groups[0]["_id"] != parent_id):
+        raise HTTPException(status_code=400, detail="All items must belong to the same parent")
+    return groups[0]["_id"]
+
+async def _rebalance_siblings(collection, parent_field: str, parent_id: str, move: ReorderMove, now: datetime):
+    """Đánh số lại cả nhóm anh em theo bội số ORDER_INDEX_GAP với phần tử đã di chuyển"""
+    siblings = await collection.find(
+        {parent_field: parent_id}, {"_id": 0, "id": 1, "order_index": 1}
+    ).sort([("order_index", 1), ("id", 1)]).to_list(length=None)
+    ordered = [sibling for sibling in siblings if sibling["id"] != move.id]
+    # after_id không còn trong nhóm (bị xóa đồng thời): đưa xuống cuối
+    position = 0 if move.after_id is None else next(
+        (index + 1 for index, sibling in enumerate(ordered) if sibling["id"] == move.after_id), len(ordered)
+    )
+    ordered.insert(position, {"id": move.id, "order_index": None})
+    operations = [
+        UpdateOne({"id": sibling["id"]}, {"$set": {"order_index": (index + 1) * ORDER_INDEX_GAP, "updated_at": now}})
+        for index, sibling in enumerate(ordered)
+        if sibling["order_index"] != (index + 1) * ORDER_INDEX_GAP
+    ]
+    if operations:
+        await collection.bulk_write(operations, ordered=False)
+
+async def _move_item(collection, parent_field: str, parent_id: str, move: ReorderMove, now: datetime):
+    """Đặt phần tử vào giữa after_id và phần tử kế tiếp; thường chỉ ghi một document"""
+    anchor = None
+    if move.after_id is not None:
+        anchor = await collection.find_one({"id": move.after_id}, {"_id": 0, "order_index": 1})
+    lower = anchor["order_index"] if anchor else None
+    
+    next_query = {parent_field: parent_id, "id": {"$nin": [move.id, move.after_id]}}
+    if lower is not None:
+        next_query["order_index"] = {"$gte": lower}
+    following = await collection.find(next_query, {"_id": 0, "order_index": 1}) \
+        .sort([("order_index", 1), ("id", 1)]).limit(1).to_list(length=1)
+    upper = following[0]["order_index"] if following else None
+    
+    if lower is None and upper is None:
+        new_index = ORDER_INDEX_GAP
+    elif lower is None:
+        new_index = upper - ORDER_INDEX_GAP
+    elif upper is None:
+        new_index = lower + ORDER_INDEX_GAP
+    else:
+        new_index = (lower + upper) // 2
+    
+    if lower is not None and upper is not None and not lower < new_index < upper:
+        await _rebalance_siblings(collection, parent_field, parent_id, move, now)
+    else:
+        await collection.update_one({"id": move.id}, {"$set": {"order_index": new_index, "updated_at": now}})
+
+async def reorder_items(collection_name: str, request: ReorderRequest):
+    """Sắp xếp lại một nhóm anh em: kiểm tra cùng cha rồi ghi bằng một bulk_write"""
+    collection = db[collection_name]
+    parent_field = ORDERED_COLLECTIONS[collection_name]
+    # Di chuyển một phần tử ra sau chính nó: giữ nguyên vị trí
+    move = request.move if request.move and request.move.after_id != request.move.id else None
+    ids = [item.id for item in request.items]
+    if move:
+        ids += [move.id] + ([move.after_id] if move.after_id else [])
+    if not ids:
+        return
+    
+    parent_id = await _validate_same_parent(collection, parent_field, ids, request.parent_id)
+    now = datetime.utcnow()
+    
+    if request.items:
+        await collection.bulk_write([
+            UpdateOne({"id": item.id}, {"$set": {"order_index": item.order_index, "updated_at": now}})
+            for item in request.items
+        ], ordered=False)
+    if move:
+        await _move_item(collection, parent_field, parent_id, move, now)
+    
+    await bump_template_cache(await _template_id_for_parent(collection_name, parent_id))
+
 # Categories API (must be before parameterized routes)
 @api_router.get("/service-templates/categories")
-async def get_service_categories(current_user: User = Depends(get_current_user)):
+async def get_service_categories(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user)
+):
     """Lấy danh sách categories từ database"""
-    pipeline = [
-        {"$group": {"_id": "$category", "count": {"$sum": 1}}},
-        {"$match": {"_id": {"$ne": None}}},
-        {"$sort": {"count": -1}}
-    ]
-    
-    categories_cursor = db.service_templates.aggregate(pipeline)
-    categories = await categories_cursor.to_list(length=None)
+    async def load():
+        pipeline = [
+            {"$group": {"_id": "$category", "count": {"$sum": 1}}},
+            {"$match": {"_id": {"$ne": None}}},
+            {"$sort": {"count": -1}}
+        ]
+        
+        categories_cursor = db.service_templates.aggregate(pipeline)
+        categories = await categories_cursor.to_list(length=None)
+        
+        return [{"name": cat["_id"], "count": cat["count"]} for cat in categories]
     
-    return [{"name": cat["_id"], "count": cat["count"]} for cat in categories]
+    return await serve_template_cached(request, response, TEMPLATE_LIST_SCOPE, ("categories",), load)
 
 # Service Templates CRUD
 @api_router.get("/service-templates", response_model=List[ServiceTemplate])
 async def get_service_templates(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
     search: Optional[str] = None,
     category: Optional[str] = None,
     status: Optional[str] = None
 ):
     """Lấy danh sách mẫu dịch vụ với tìm kiếm và lọc"""
-    query = {}
-    
-    if search:
-        query["$or"] = [
-            {"name": {"$regex": search, "$options": "i"}},
-            {"description": {"$regex": search, "$options": "i"}}
-        ]
-    
-    if category:
-        query["category"] = category
+    async def load():
+        query = {}
         
-    if status:
-        query["status"] = status
-    
-    templates_cursor = db.service_templates.find(query).sort("created_at", -1)
-    templates = await templates_cursor.to_list(length=None)
+        if search:
+            query["$or"] = [
+                {"name": {"$regex": search, "$options": "i"}},
+                {"description": {"$regex": search, "$options": "i"}}
+            ]
+        
+        if category:
+            query["category"] = category
+            
+        if status:
+            query["status"] = status
+        
+        templates_cursor = db.service_templates.find(query, {"_id": 0}).sort("created_at", -1)
+        return await templates_cursor.to_list(length=None)
     
-    return [ServiceTemplate(**template) for template in templates]
+    return await serve_template_cached(
+        request, response, TEMPLATE_LIST_SCOPE, ("list", search, category, status), load,
+        model=ServiceTemplate
+    )
 
 @api_router.post("/service-templates", response_model=ServiceTemplate)
 async def create_service_template(
@@ -939,19 +2169,25 @@ async def create_service_template(
     
     result = await db.service_templates.insert_one(new_template.dict())
     if result.inserted_id:
+        await bump_template_cache(list_changed=True)
         return new_template
     raise HTTPException(status_code=400, detail="Failed to create service template")
 
 @api_router.get("/service-templates/{template_id}", response_model=ServiceTemplate)
 async def get_service_template(
     template_id: str,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user)
 ):
     """Lấy thông tin chi tiết mẫu dịch vụ"""
-    template = await db.service_templates.find_one({"id": template_id})
-    if not template:
-        raise HTTPException(status_code=404, detail="Service template not found")
-    return ServiceTemplate(**template)
+    async def load():
+        template = await db.service_templates.find_one({"id": template_id}, {"_id": 0})
+        if not template:
+            raise HTTPException(status_code=404, detail="Service template not found")
+        return template
+    
+    return await serve_template_cached(request, response, template_scope(template_id), ("template",), load)
 
 @api_router.put("/service-templates/{template_id}", response_model=ServiceTemplate)
 async def update_service_template(
@@ -971,40 +2207,50 @@ async def update_service_template(
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Service template not found")
     
+    await bump_template_cache(template_id, list_changed=True)
     updated_template = await db.service_templates.find_one({"id": template_id})
     return ServiceTemplate(**updated_template)
 
+async def cascade_delete_services(service_ids: List[str], session=None) -> Dict[str, int]:
+    """Xóa services cùng task templates và components con bằng một số lệnh $in cố định"""
+    task_template_ids = await db.task_templates.distinct(
+        "id", {"service_id": {"$in": service_ids}}, session=session
+    ) if service_ids else []
+    components = await db.task_detail_components.delete_many(
+        {"task_template_id": {"$in": task_template_ids}}, session=session
+    ) if task_template_ids else None
+    task_templates = await db.task_templates.delete_many(
+        {"service_id": {"$in": service_ids}}, session=session
+    ) if service_ids else None
+    services = await db.services.delete_many(
+        {"id": {"$in": service_ids}}, session=session
+    ) if service_ids else None
+    return {
+        "services": services.deleted_count if services else 0,
+        "task_templates": task_templates.deleted_count if task_templates else 0,
+        "task_detail_components": components.deleted_count if components else 0,
+    }
+
 @api_router.delete("/service-templates/{template_id}")
 async def delete_service_template(
     template_id: str,
     current_user: User = Depends(get_current_user)
 ):
     """Xóa mẫu dịch vụ và tất cả dữ liệu liên quan"""
-    # Xóa tất cả task detail components trước
-    services_cursor = db.services.find({"template_id": template_id})
-    services = await services_cursor.to_list(length=None)
-    
-    for service in services:
-        # Xóa task detail components
-        tasks_cursor = db.task_templates.find({"service_id": service["id"]})
-        tasks = await tasks_cursor.to_list(length=None)
-        
-        for task in tasks:
-            await db.task_detail_components.delete_many({"task_template_id": task["id"]})
+    async def cascade(session):
+        template = await db.service_templates.find_one({"id": template_id}, {"_id": 1}, session=session)
+        if not template:
+            raise HTTPException(status_code=404, detail="Service template not found")
         
-        # Xóa task templates
-        await db.task_templates.delete_many({"service_id": service["id"]})
-    
-    # Xóa services
-    await db.services.delete_many({"template_id": template_id})
-    
-    # Xóa template
-    result = await db.service_templates.delete_one({"id": template_id})
+        # Xóa từ dưới lên: components -> task templates -> services -> template
+        service_ids = await db.services.distinct("id", {"template_id": template_id}, session=session)
+        deleted = await cascade_delete_services(service_ids, session)
+        result = await db.service_templates.delete_one({"id": template_id}, session=session)
+        return {"service_templates": result.deleted_count, **deleted}
     
-    if result.deleted_count == 0:
-        raise HTTPException(status_code=404, detail="Service template not found")
-    
-    return {"message": "Service template deleted successfully"}
+    deleted = await run_in_transaction(cascade)
+    await bump_template_cache(template_id, list_changed=True)
+    return {"message": "Service template deleted successfully", "deleted": deleted}
 
 @api_router.post("/service-templates/{template_id}/clone", response_model=ServiceTemplate)
 async def clone_service_template(
@@ -1012,10 +2258,8 @@ async def clone_service_template(
     current_user: User = Depends(get_current_user)
 ):
     """Sao chép mẫu dịch vụ"""
-    # Lấy template gốc
-    original_template = await db.service_templates.find_one({"id": template_id})
-    if not original_template:
-        raise HTTPException(status_code=404, detail="Service template not found")
+    # Đọc toàn bộ cây gốc với số truy vấn cố định
+    original_template = await load_template_hierarchy(template_id)
     
     # Tạo template mới
     new_template = ServiceTemplate(
@@ -1028,39 +2272,27 @@ async def clone_service_template(
         created_by=current_user.id
     )
     
-    result = await db.service_templates.insert_one(new_template.dict())
-    if not result.inserted_id:
-        raise HTTPException(status_code=400, detail="Failed to clone template")
-    
-    # Copy services
-    services_cursor = db.services.find({"template_id": template_id})
-    services = await services_cursor.to_list(length=None)
-    
-    service_id_mapping = {}
+    # Dựng toàn bộ cây mới trong bộ nhớ; ánh xạ id cũ -> id mới cho services
+    # để nối lại dependencies theo id (tên service có thể trùng nhau)
+    services = original_template["services"]
+    service_id_mapping = {service["id"]: str(uuid.uuid4()) for service in services}
     
+    new_services, new_tasks, new_components = [], [], []
     for service in services:
-        old_service_id = service["id"]
-        new_service = Service(
+        new_services.append(Service(
+            id=service_id_mapping[service["id"]],
             template_id=new_template.id,
             name=service["name"],
             description=service.get("description"),
             order_index=service.get("order_index", 0),
             estimated_hours=service.get("estimated_hours"),
             required_skills=service.get("required_skills", []),
-            dependencies=[]  # Will update later
-        )
+            dependencies=[service_id_mapping.get(dep_id, dep_id) for dep_id in service.get("dependencies", [])]
+        ).dict())
         
-        await db.services.insert_one(new_service.dict())
-        service_id_mapping[old_service_id] = new_service.id
-        
-        # Copy task templates
-        tasks_cursor = db.task_templates.find({"service_id": old_service_id})
-        tasks = await tasks_cursor.to_list(length=None)
-        
-        for task in tasks:
-            old_task_id = task["id"]
+        for task in service["tasks"]:
             new_task = TaskTemplate(
-                service_id=new_service.id,
+                service_id=service_id_mapping[service["id"]],
                 name=task["name"],
                 description=task.get("description"),
                 order_index=task.get("order_index", 0),
@@ -1069,45 +2301,49 @@ async def clone_service_template(
                 task_type=task.get("task_type"),
                 required_deliverables=task.get("required_deliverables", [])
             )
+            new_tasks.append(new_task.dict())
             
-            await db.task_templates.insert_one(new_task.dict())
-            
-            # Copy task detail components
-            components_cursor = db.task_detail_components.find({"task_template_id": old_task_id})
-            components = await components_cursor.to_list(length=None)
-            
-            for component in components:
-                new_component = TaskDetailComponent(
+            for component in task["components"]:
+                new_components.append(TaskDetailComponent(
                     task_template_id=new_task.id,
                     component_type=component["component_type"],
                     component_data=component.get("component_data", {}),
                     order_index=component.get("order_index", 0),
                     required=component.get("required", False)
-                )
-                
-                await db.task_detail_components.insert_one(new_component.dict())
-    
-    # Update dependencies with new service IDs
-    for service in services:
-        if service.get("dependencies"):
-            new_dependencies = [service_id_mapping.get(dep_id, dep_id) for dep_id in service["dependencies"]]
-            await db.services.update_one(
-                {"template_id": new_template.id, "name": service["name"]},
-                {"$set": {"dependencies": new_dependencies}}
-            )
-    
+                ).dict())
+    
+    # Ghi theo thứ tự cha -> con, mỗi cấp một insert_many, trong một transaction
+    async def insert_tree(session):
+        await db.service_templates.insert_one(new_template.dict(), session=session)
+        for collection, docs in (
+            (db.services, new_services),
+            (db.task_templates, new_tasks),
+            (db.task_detail_components, new_components),
+        ):
+            if docs:
+                await collection.insert_many(docs, ordered=True, session=session)
+    
+    await run_in_transaction(insert_tree)
+    
+    await bump_template_cache(new_template.id, list_changed=True)
     return new_template
 
 # Services CRUD
 @api_router.get("/service-templates/{template_id}/services", response_model=List[Service])
 async def get_services_by_template(
     template_id: str,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user)
 ):
     """Lấy danh sách dịch vụ theo template"""
-    services_cursor = db.services.find({"template_id": template_id}).sort("order_index", 1)
-    services = await services_cursor.to_list(length=None)
-    return [Service(**service) for service in services]
+    async def load():
+        services_cursor = db.services.find({"template_id": template_id}, {"_id": 0}).sort("order_index", 1)
+        return await services_cursor.to_list(length=None)
+    
+    return await serve_template_cached(
+        request, response, template_scope(template_id), ("services",), load, model=Service
+    )
 
 @api_router.post("/services", response_model=Service)
 async def create_service(
@@ -1119,9 +2355,19 @@ async def create_service(
     
     result = await db.services.insert_one(new_service.dict())
     if result.inserted_id:
+        await bump_template_cache(new_service.template_id)
         return new_service
     raise HTTPException(status_code=400, detail="Failed to create service")
 
+@api_router.put("/services/reorder")
+async def reorder_services(
+    request: ReorderRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """Sắp xếp lại thứ tự các services trong template"""
+    await reorder_items("services", request)
+    return {"message": "Services reordered successfully"}
+
 @api_router.put("/services/{service_id}", response_model=Service)
 async def update_service(
     service_id: str,
@@ -1132,16 +2378,20 @@ async def update_service(
     update_data = service_update.dict()
     update_data["updated_at"] = datetime.utcnow()
     
-    result = await db.services.update_one(
+    db_service = await db.services.find_one_and_update(
         {"id": service_id},
-        {"$set": update_data}
+        {"$set": update_data},
+        return_document=ReturnDocument.BEFORE
     )
     
-    if result.modified_count == 0:
+    if db_service is None:
         raise HTTPException(status_code=404, detail="Service not found")
     
-    updated_service = await db.services.find_one({"id": service_id})
-    return Service(**updated_service)
+    # Service có thể chuyển sang template khác: bump cả template cũ và mới
+    await bump_template_cache(
+        db_service["template_id"], update_data["template_id"], forget=[("service", service_id)]
+    )
+    return Service(**{**db_service, **update_data})
 
 @api_router.delete("/services/{service_id}")
 async def delete_service(
@@ -1149,34 +2399,37 @@ async def delete_service(
     current_user: User = Depends(get_current_user)
 ):
     """Xóa dịch vụ và tất cả task templates liên quan"""
-    # Xóa task detail components trước
-    tasks_cursor = db.task_templates.find({"service_id": service_id})
-    tasks = await tasks_cursor.to_list(length=None)
-    
-    for task in tasks:
-        await db.task_detail_components.delete_many({"task_template_id": task["id"]})
-    
-    # Xóa task templates
-    await db.task_templates.delete_many({"service_id": service_id})
-    
-    # Xóa service
-    result = await db.services.delete_one({"id": service_id})
+    template_id = await template_id_for_service(service_id)
+    if template_id is None:
+        raise HTTPException(status_code=404, detail="Service not found")
     
-    if result.deleted_count == 0:
+    deleted = await run_in_transaction(lambda session: cascade_delete_services([service_id], session))
+    if deleted["services"] == 0:
         raise HTTPException(status_code=404, detail="Service not found")
     
-    return {"message": "Service deleted successfully"}
+    await bump_template_cache(template_id, forget=[("service", service_id)])
+    return {"message": "Service deleted successfully", "deleted": deleted}
 
 # Task Templates CRUD
 @api_router.get("/services/{service_id}/tasks", response_model=List[TaskTemplate])
 async def get_task_templates_by_service(
     service_id: str,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user)
 ):
     """Lấy danh sách task templates theo service"""
-    tasks_cursor = db.task_templates.find({"service_id": service_id}).sort("order_index", 1)
-    tasks = await tasks_cursor.to_list(length=None)
-    return [TaskTemplate(**task) for task in tasks]
+    async def load():
+        tasks_cursor = db.task_templates.find({"service_id": service_id}, {"_id": 0}).sort("order_index", 1)
+        return await tasks_cursor.to_list(length=None)
+    
+    template_id = await template_id_for_service(service_id)
+    if template_id is None:
+        return trusted_response(TaskTemplate, await load())
+    return await serve_template_cached(
+        request, response, template_scope(template_id), ("task_templates", service_id), load,
+        model=TaskTemplate
+    )
 
 @api_router.post("/task-templates", response_model=TaskTemplate)
 async def create_task_template(
@@ -1188,9 +2441,19 @@ async def create_task_template(
     
     result = await db.task_templates.insert_one(new_task.dict())
     if result.inserted_id:
+        await bump_template_cache(await template_id_for_service(new_task.service_id))
         return new_task
     raise HTTPException(status_code=400, detail="Failed to create task template")
 
+@api_router.put("/task-templates/reorder")
+async def reorder_task_templates(
+    request: ReorderRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """Sắp xếp lại thứ tự các task templates trong service"""
+    await reorder_items("task_templates", request)
+    return {"message": "Task templates reordered successfully"}
+
 @api_router.put("/task-templates/{task_id}", response_model=TaskTemplate)
 async def update_task_template(
     task_id: str,
@@ -1201,16 +2464,21 @@ async def update_task_template(
     update_data = task_update.dict()
     update_data["updated_at"] = datetime.utcnow()
     
-    result = await db.task_templates.update_one(
+    db_task = await db.task_templates.find_one_and_update(
         {"id": task_id},
-        {"$set": update_data}
+        {"$set": update_data},
+        return_document=ReturnDocument.BEFORE
     )
     
-    if result.modified_count == 0:
+    if db_task is None:
         raise HTTPException(status_code=404, detail="Task template not found")
     
-    updated_task = await db.task_templates.find_one({"id": task_id})
-    return TaskTemplate(**updated_task)
+    await bump_template_cache(
+        await template_id_for_service(db_task["service_id"]),
+        await template_id_for_service(update_data["service_id"]),
+        forget=[("task_template", task_id)]
+    )
+    return TaskTemplate(**{**db_task, **update_data})
 
 @api_router.delete("/task-templates/{task_id}")
 async def delete_task_template(
@@ -1218,6 +2486,8 @@ async def delete_task_template(
     current_user: User = Depends(get_current_user)
 ):
     """Xóa task template và tất cả components liên quan"""
+    template_id = await template_id_for_task_template(task_id)
+    
     # Xóa task detail components trước
     await db.task_detail_components.delete_many({"task_template_id": task_id})
     
@@ -1227,18 +2497,31 @@ async def delete_task_template(
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Task template not found")
     
+    await bump_template_cache(template_id, forget=[("task_template", task_id)])
     return {"message": "Task template deleted successfully"}
 
 # Task Detail Components CRUD
 @api_router.get("/task-templates/{task_id}/components", response_model=List[TaskDetailComponent])
 async def get_task_detail_components(
     task_id: str,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user)
 ):
     """Lấy danh sách components theo task template"""
-    components_cursor = db.task_detail_components.find({"task_template_id": task_id}).sort("order_index", 1)
-    components = await components_cursor.to_list(length=None)
-    return [TaskDetailComponent(**component) for component in components]
+    async def load():
+        components_cursor = db.task_detail_components.find(
+            {"task_template_id": task_id}, {"_id": 0}
+        ).sort("order_index", 1)
+        return await components_cursor.to_list(length=None)
+    
+    template_id = await template_id_for_task_template(task_id)
+    if template_id is None:
+        return trusted_response(TaskDetailComponent, await load())
+    return await serve_template_cached(
+        request, response, template_scope(template_id), ("components", task_id), load,
+        model=TaskDetailComponent
+    )
 
 @api_router.post("/task-detail-components", response_model=TaskDetailComponent)
 async def create_task_detail_component(
@@ -1250,28 +2533,17 @@ async def create_task_detail_component(
     
     result = await db.task_detail_components.insert_one(new_component.dict())
     if result.inserted_id:
+        await bump_template_cache(await template_id_for_task_template(new_component.task_template_id))
         return new_component
     raise HTTPException(status_code=400, detail="Failed to create task detail component")
 
-class ComponentReorderItem(BaseModel):
-    id: str
-    order_index: int
-
-class ComponentReorderRequest(BaseModel):
-    items: List[ComponentReorderItem]
-
 @api_router.put("/task-detail-components/reorder")
 async def reorder_task_detail_components(
-    request: ComponentReorderRequest,
+    request: ReorderRequest,
     current_user: User = Depends(get_current_user)
 ):
     """Sắp xếp lại thứ tự các components"""
-    for item in request.items:
-        await db.task_detail_components.update_one(
-            {"id": item.id},
-            {"$set": {"order_index": item.order_index, "updated_at": datetime.utcnow()}}
-        )
-    
+    await reorder_items("task_detail_components", request)
     return {"message": "Components reordered successfully"}
 
 @api_router.put("/task-detail-components/{component_id}", response_model=TaskDetailComponent)
@@ -1284,16 +2556,20 @@ async def update_task_detail_component(
     update_data = component_update.dict()
     update_data["updated_at"] = datetime.utcnow()
     
-    result = await db.task_detail_components.update_one(
+    db_component = await db.task_detail_components.find_one_and_update(
         {"id": component_id},
-        {"$set": update_data}
+        {"$set": update_data},
+        return_document=ReturnDocument.BEFORE
     )
     
-    if result.modified_count == 0:
+    if db_component is None:
         raise HTTPException(status_code=404, detail="Task detail component not found")
     
-    updated_component = await db.task_detail_components.find_one({"id": component_id})
-    return TaskDetailComponent(**updated_component)
+    await bump_template_cache(
+        await template_id_for_task_template(db_component["task_template_id"]),
+        await template_id_for_task_template(update_data["task_template_id"])
+    )
+    return TaskDetailComponent(**{**db_component, **update_data})
 
 @api_router.delete("/task-detail-components/{component_id}")
 async def delete_task_detail_component(
@@ -1301,65 +2577,211 @@ async def delete_task_detail_component(
     current_user: User = Depends(get_current_user)
 ):
     """Xóa task detail component"""
-    result = await db.task_detail_components.delete_one({"id": component_id})
+    db_component = await db.task_detail_components.find_one_and_delete({"id": component_id})
     
-    if result.deleted_count == 0:
+    if db_component is None:
         raise HTTPException(status_code=404, detail="Task detail component not found")
     
+    await bump_template_cache(await template_id_for_task_template(db_component["task_template_id"]))
+    
     return {"message": "Task detail component deleted successfully"}
 
 # Template Hierarchy API
 @api_router.get("/service-templates/{template_id}/hierarchy")
 async def get_template_hierarchy(
     template_id: str,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user)
 ):
     """Lấy cấu trúc phân cấp đầy đủ của template"""
-    # Lấy template
-    template = await db.service_templates.find_one({"id": template_id})
+    return await serve_template_cached(
+        request, response, template_scope(template_id), ("hierarchy",),
+        lambda: load_template_hierarchy(template_id)
+    )
+
+async def load_template_hierarchy(template_id: str) -> dict:
+    """Đọc cây template -> services -> task templates -> components từ MongoDB"""
+    # Số truy vấn cố định (không phụ thuộc kích thước cây): template + services song song,
+    # sau đó task templates và components bằng $in rồi ghép lại trong bộ nhớ
+    template, services = await asyncio.gather(
+        db.service_templates.find_one({"id": template_id}, {"_id": 0}),
+        db.services.find({"template_id": template_id}, {"_id": 0}).sort("order_index", 1).to_list(length=None)
+    )
     if not template:
         raise HTTPException(status_code=404, detail="Service template not found")
     
-    # Remove MongoDB _id field to avoid serialization issues
-    if "_id" in template:
-        del template["_id"]
+    service_ids = [service["id"] for service in services]
+    tasks = await db.task_templates.find(
+        {"service_id": {"$in": service_ids}}, {"_id": 0}
+    ).sort("order_index", 1).to_list(length=None) if service_ids else []
+    
+    task_ids = [task["id"] for task in tasks]
+    components = await db.task_detail_components.find(
+        {"task_template_id": {"$in": task_ids}}, {"_id": 0}
+    ).sort("order_index", 1).to_list(length=None) if task_ids else []
     
-    # Lấy services
-    services_cursor = db.services.find({"template_id": template_id}).sort("order_index", 1)
-    services = await services_cursor.to_list(length=None)
+    # Ghép components vào task, task vào service (giữ thứ tự order_index)
+    components_by_task: Dict[str, List[dict]] = {task_id: [] for task_id in task_ids}
+    for component in components:
+        components_by_task[component["task_template_id"]].append(component)
+    
+    tasks_by_service: Dict[str, List[dict]] = {service_id: [] for service_id in service_ids}
+    for task in tasks:
+        task["components"] = components_by_task[task["id"]]
+        tasks_by_service[task["service_id"]].append(task)
     
-    # Lấy tasks và components cho mỗi service
     for service in services:
-        # Remove MongoDB _id field
-        if "_id" in service:
-            del service["_id"]
-            
-        # Lấy tasks
-        tasks_cursor = db.task_templates.find({"service_id": service["id"]}).sort("order_index", 1)
-        tasks = await tasks_cursor.to_list(length=None)
-        
-        # Lấy components cho mỗi task
-        for task in tasks:
-            # Remove MongoDB _id field
-            if "_id" in task:
-                del task["_id"]
-                
-            components_cursor = db.task_detail_components.find({"task_template_id": task["id"]}).sort("order_index", 1)
-            components = await components_cursor.to_list(length=None)
-            
-            # Remove MongoDB _id fields from components
-            for component in components:
-                if "_id" in component:
-                    del component["_id"]
-            
-            task["components"] = components
-        
-        service["tasks"] = tasks
+        service["tasks"] = tasks_by_service[service["id"]]
     
     template["services"] = services
     
     return template
 
+# Áp dụng service template vào project: sinh task thật hàng loạt
+WORK_HOURS_PER_DAY = 8
+TEMPLATE_TASK_NAMESPACE = uuid.UUID("6f1c7d1e-3b7a-4c55-9a53-4a3c3f0d9b21")
+
+class ApplyTemplateRequest(BaseModel):
+    template_id: str
+    start_date: Optional[datetime] = None  # Mặc định: start_date của project hoặc hiện tại
+    assigned_to: Optional[str] = None
+    # Cùng key -> cùng id task, nên gọi lại (retry) không tạo trùng.
+    # Muốn áp dụng cùng template thêm lần nữa thì truyền key khác.
+    idempotency_key: str = ""
+
+def order_services_by_dependencies(services: List[dict]) -> List[dict]:
+    """Sắp xếp topo theo dependencies (giữ order_index khi không ràng buộc)"""
+    by_id = {service["id"]: service for service in services}
+    ordered, state = [], {}
+    
+    def visit(service):
+        if state.get(service["id"]) == "done":
+            return
+        if state.get(service["id"]) == "visiting":
+            raise HTTPException(status_code=400, detail="Service dependencies contain a cycle")
+        state[service["id"]] = "visiting"
+        for dep_id in service.get("dependencies", []):
+            if dep_id in by_id:
+                visit(by_id[dep_id])
+        state[service["id"]] = "done"
+        ordered.append(service)
+    
+    for service in services:
+        visit(service)
+    return ordered
+
+def schedule_template_tasks(hierarchy: dict, start: datetime) -> List[Tuple[dict, dict, datetime]]:
+    """Tính due_date cho từng task template.
+
+    Service bắt đầu khi mọi service nó phụ thuộc đã xong (không phụ thuộc thì
+    bắt đầu từ start); task trong service chạy tuần tự theo order_index. Thời
+    lượng task là estimated_hours của task, nếu thiếu thì chia đều
+    estimated_hours của service, quy đổi WORK_HOURS_PER_DAY giờ mỗi ngày.
+    """
+    service_end: Dict[str, datetime] = {}
+    scheduled = []
+    for service in order_services_by_dependencies(hierarchy["services"]):
+        cursor = max(
+            [service_end[dep_id] for dep_id in service.get("dependencies", []) if dep_id in service_end],
+            default=start
+        )
+        tasks = service["tasks"]
+        fallback_hours = (service.get("estimated_hours") or 0) / len(tasks) if tasks else 0
+        for task in tasks:
+            hours = task.get("estimated_hours") or fallback_hours
+            cursor = cursor + timedelta(days=hours / WORK_HOURS_PER_DAY)
+            scheduled.append((service, task, cursor))
+        service_end[service["id"]] = cursor
+    return scheduled
+
+def task_components_from_template(task_template: dict) -> List[dict]:
+    """Sao các task detail component của task template sang task (giữ order_index)"""
+    return [
+        {
+            "template_component_id": component["id"],
+            "component_type": component["component_type"],
+            "component_data": component.get("component_data", {}),
+            "order_index": component.get("order_index", 0),
+            "required": component.get("required", False),
+        }
+        for component in task_template.get("components", [])
+    ]
+
+@api_router.post("/projects/{project_id}/apply-template")
+async def apply_template_to_project(
+    project_id: str,
+    request: ApplyTemplateRequest,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Sinh task cho project từ service template (một lần insert_many)"""
+    project, (_, hierarchy) = await asyncio.gather(
+        db.projects.find_one({"id": project_id}, {"_id": 0, "id": 1, "start_date": 1}),
+        template_cache.get_or_load(
+            template_scope(request.template_id), ("hierarchy",),
+            lambda: load_template_hierarchy(request.template_id)
+        )
+    )
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    start = request.start_date or project.get("start_date") or datetime.utcnow()
+    task_docs = []
+    for service, task_template, due_date in schedule_template_tasks(hierarchy, start):
+        task_id = uuid.uuid5(
+            TEMPLATE_TASK_NAMESPACE,
+            f"{project_id}:{request.template_id}:{request.idempotency_key}:{task_template['id']}"
+        )
+        task = Task(
+            id=str(task_id),
+            title=task_template["name"],
+            project_id=project_id,
+            description=task_template.get("description"),
+            assigned_to=request.assigned_to,
+            due_date=due_date,
+            priority=task_template.get("priority", "medium"),
+            task_type=task_template.get("task_type"),
+            components=task_components_from_template(task_template),
+            created_by=current_user.id
+        ).dict()
+        task["search"] = task_search_fields(task)
+        task["template_id"] = request.template_id
+        task["task_template_id"] = task_template["id"]
+        task_docs.append(task)
+    
+    # Task đã tồn tại (lần gọi trước) bị bỏ qua nhờ unique index trên tasks.id
+    skipped = set()
+    if task_docs:
+        try:
+            await db.tasks.insert_many(task_docs, ordered=False)
+        except BulkWriteError as exc:
+            errors = exc.details.get("writeErrors", [])
+            if any(error["code"] != 11000 for error in errors):
+                raise
+            skipped = {error["index"] for error in errors}
+    
+    created = [task for index, task in enumerate(task_docs) if index not in skipped]
+    await bump_dashboard_counters(*[task_counter_delta(task) for task in created])
+    
+    if skipped:
+        # Gọi lại (retry): trả về task đã lưu ở lần đầu, không phải due_date/created_at vừa tính lại
+        stored = await db.tasks.find(
+            {"id": {"$in": [task_docs[index]["id"] for index in skipped]}}, {"_id": 0}
+        ).to_list(length=None)
+        stored_by_id = {task["id"]: task for task in stored}
+        task_docs = [
+            stored_by_id.get(task["id"], task) if index in skipped else task
+            for index, task in enumerate(task_docs)
+        ]
+    
+    return {
+        "project_id": project_id,
+        "template_id": request.template_id,
+        "created": len(created),
+        "skipped": len(skipped),
+        "tasks": [Task(**task) for task in task_docs]
+    }
+
 # Include router
 app.include_router(api_router)
 
@@ -1369,7 +2791,46 @@ os.makedirs("public/uploads", exist_ok=True)
 # Mount thư mục public để phục vụ file tĩnh
 app.mount("/public", StaticFiles(directory="public"), name="public")
 
+# Task nền chạy từ startup (giữ tham chiếu để không bị thu hồi giữa chừng)
+background_tasks = set()
+
+# Startup event
+@app.on_event("startup")
+async def create_indexes_on_startup():
+    if AUTO_CREATE_INDEXES:
+        created = await ensure_indexes(db)
+        logger.info("Indexes ensured on %d collections", len(created))
+
+@app.on_event("startup")
+async def backfill_task_search_on_startup():
+    """Migration: sinh field `search` cho task cũ, chạy nền để không chặn startup"""
+    async def migrate():
+        try:
+            updated = await backfill_task_search()
+            if updated:
+                logger.info("Backfilled search fields on %d tasks", updated)
+            await refresh_task_search_ready()
+        except Exception:
+            logger.exception("Task search backfill failed; text search falls back to regex")
+    
+    task = asyncio.create_task(migrate())
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+@app.on_event("startup")
+async def start_template_cache_pubsub():
+    await template_cache.pubsub.start()
+
+@app.on_event("startup")
+async def start_slow_query_log():
+    await slow_query_log.start(db)
+
 # Shutdown event
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    for task in background_tasks:
+        task.cancel()
+    await template_cache.pubsub.stop()
+    slow_query_log.stop()
     client.close()
+    password_hash_pool.shutdown()
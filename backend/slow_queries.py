@@ -0,0 +1,232 @@
+"""Ghi log lệnh MongoDB chậm kèm explain("executionStats").
+
+`SlowQueryLog` là CommandListener của pymongo: lệnh nào chạy lâu hơn ngưỡng được
+ghi vào capped collection `slow_queries` với hình dạng truy vấn (đã che giá trị),
+route đang xử lý và tóm tắt explain (stage của plan, số key/document đã duyệt so
+với số document trả về). Mỗi hình dạng truy vấn chỉ được ghi tối đa một lần trong
+`rate_limit_seconds`.
+
+Listener được gọi trên thread của Motor nên việc explain và ghi log được đẩy về
+event loop qua call_soon_threadsafe. Motor chạy lệnh với bản sao contextvars của
+coroutine gọi nó, vì vậy `current_scope` (do `RouteContextMiddleware` đặt) cho
+biết route gốc.
+"""
+import asyncio
+import contextvars
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from pymongo import monitoring
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERIES_COLLECTION = "slow_queries"
+
+# Lệnh có thể explain
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"}
+# Giữ nguyên giá trị (không che) cho các key mô tả cấu trúc chứ không phải dữ liệu
+LITERAL_KEYS = {"sort", "projection", "hint", "$sort", "$project"}
+# Field do driver/session thêm vào, bỏ khi chạy explain
+SESSION_FIELDS = {"lsid", "txnNumber", "autocommit", "startTransaction", "$clusterTime", "$db",
+                  "$readPreference", "readConcern", "writeConcern", "apiVersion"}
+# Field không thuộc về hình dạng truy vấn
+DRIVER_FIELDS = SESSION_FIELDS | {"cursor", "batchSize"}
+
+current_scope: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("current_scope", default=None)
+
+
+class RouteContextMiddleware:
+    """Lưu scope ASGI của request hiện tại để listener biết lệnh đến từ route nào"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = current_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_scope.reset(token)
+
+
+def current_route() -> Optional[str]:
+    scope = current_scope.get()
+    if scope is None:
+        return None
+    route = scope.get("route")
+    return f"{scope['method']} {getattr(route, 'path', scope['path'])}"
+
+
+def redact(value: Any, key: Optional[str] = None) -> Any:
+    """Giữ tên field và toán tử, thay mọi giá trị bằng '?'"""
+    if key in LITERAL_KEYS:
+        return value
+    if isinstance(value, dict):
+        return {k: redact(v, k) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        if value and all(isinstance(item, dict) for item in value):
+            return [redact(item) for item in value]
+        return ["?"] if value else []
+    return "?"
+
+
+def query_shape(command_name: str, command: Dict[str, Any]) -> Dict[str, Any]:
+    target = command.get(command_name)
+    # Giá trị của lệnh là tên collection (find, update, ...) hoặc id cursor (getMore)
+    shape = {command_name: target if isinstance(target, str) else "?"}
+    for key, value in command.items():
+        if key != command_name and key not in DRIVER_FIELDS:
+            shape[key] = redact(value, key)
+    return shape
+
+
+def _find_key(value: Any, key: str) -> Optional[Any]:
+    """Tìm key đầu tiên trong cây explain (find và aggregate có cấu trúc khác nhau)"""
+    if isinstance(value, dict):
+        if key in value:
+            return value[key]
+        children = value.values()
+    elif isinstance(value, list):
+        children = value
+    else:
+        return None
+    for child in children:
+        found = _find_key(child, key)
+        if found is not None:
+            return found
+    return None
+
+
+def _plan_stages(plan: Any) -> list:
+    stages = []
+    while isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0] or plan.get("queryPlan")
+    return stages
+
+
+def explain_summary(explain: Dict[str, Any]) -> Dict[str, Any]:
+    stats = _find_key(explain, "executionStats") or {}
+    return {
+        "stages": _plan_stages(_find_key(explain, "winningPlan")),
+        "n_returned": stats.get("nReturned"),
+        "keys_examined": stats.get("totalKeysExamined"),
+        "docs_examined": stats.get("totalDocsExamined"),
+        "execution_ms": stats.get("executionTimeMillis"),
+    }
+
+
+class SlowQueryLog(monitoring.CommandListener):
+    def __init__(self, threshold_ms: float = 100, rate_limit_seconds: float = 60,
+                 capped_size_bytes: int = 16 * 1024 * 1024, clock=time.monotonic):
+        self.threshold_ms = threshold_ms
+        self.rate_limit_seconds = rate_limit_seconds
+        self.capped_size_bytes = capped_size_bytes
+        self._clock = clock
+        self._db = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Dict[Tuple[int, object], Tuple[str, Dict[str, Any], Optional[str]]] = {}
+        self._last_logged: Dict[str, float] = {}
+        self._tasks = set()
+        self.logged = 0
+        self.suppressed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._db is not None and self.threshold_ms > 0
+
+    async def start(self, db):
+        """Tạo capped collection (nếu chưa có) và bắt đầu ghi log"""
+        try:
+            await db.create_collection(
+                SLOW_QUERIES_COLLECTION, capped=True, size=self.capped_size_bytes
+            )
+        except CollectionInvalid:
+            pass
+        self._db = db
+        self._loop = asyncio.get_running_loop()
+
+    def stop(self):
+        self._db = None
+
+    def started(self, event):
+        if not self.enabled or event.database_name != self._db.name:
+            return
+        collection = event.command.get(event.command_name)
+        if collection == SLOW_QUERIES_COLLECTION or event.command_name == "explain":
+            return
+        self._pending[(event.request_id, event.connection_id)] = (
+            event.command_name, event.command, current_route()
+        )
+
+    def failed(self, event):
+        self._pending.pop((event.request_id, event.connection_id), None)
+
+    def succeeded(self, event):
+        pending = self._pending.pop((event.request_id, event.connection_id), None)
+        if pending is None or not self.enabled:
+            return
+        duration_ms = event.duration_micros / 1000
+        if duration_ms < self.threshold_ms:
+            return
+        command_name, command, route = pending
+        # Lưu hình dạng dạng chuỗi JSON: tên field có thể chứa '$' hoặc '.'
+        shape = json.dumps(query_shape(command_name, command), sort_keys=True, default=str)
+        shape_hash = hashlib.sha1(shape.encode()).hexdigest()
+        now = self._clock()
+        last = self._last_logged.get(shape_hash)
+        if last is not None and now - last < self.rate_limit_seconds:
+            self.suppressed += 1
+            return
+        self._last_logged[shape_hash] = now
+        entry = {
+            "ts": datetime.utcnow(),
+            "duration_ms": round(duration_ms, 3),
+            "command": command_name,
+            "collection": command.get(command_name) if isinstance(command.get(command_name), str) else None,
+            "shape": shape,
+            "shape_hash": shape_hash,
+            "route": route,
+        }
+        explain_command = None
+        if command_name in EXPLAINABLE_COMMANDS:
+            explain_command = {key: value for key, value in command.items() if key not in SESSION_FIELDS}
+        self._loop.call_soon_threadsafe(self._schedule, entry, explain_command)
+
+    def _schedule(self, entry, explain_command):
+        task = self._loop.create_task(self._record(entry, explain_command))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _record(self, entry, explain_command):
+        db = self._db
+        if db is None:
+            return
+        if explain_command is not None:
+            try:
+                explain = await db.command({"explain": explain_command, "verbosity": "executionStats"})
+                entry["explain"] = explain_summary(explain)
+            except PyMongoError as e:
+                entry["explain"] = {"error": str(e)}
+        try:
+            await db[SLOW_QUERIES_COLLECTION].insert_one(entry)
+            self.logged += 1
+        except PyMongoError:
+            logger.exception("Could not write slow query log entry")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "threshold_ms": self.threshold_ms,
+            "logged": self.logged,
+            "suppressed": self.suppressed,
+            "shapes": len(self._last_logged),
+        }
@@ -0,0 +1,361 @@
+"""Sinh dữ liệu giả lập quy mô lớn với phân bố gần với thực tế.
+
+Dữ liệu dựng từ chính các model trong server.py (User, Client, Project, Task,
+TaskFeedback, Contract, Invoice, ServiceTemplate, Service, TaskTemplate,
+TaskDetailComponent) và hoàn toàn xác định theo `seed`:
+
+- id là uuid5 của (seed, loại, số thứ tự) nên khóa ngoại được tính trực tiếp,
+  không cần giữ danh sách id giữa các tiến trình;
+- mỗi chunk có Random riêng seed theo (seed, loại, vị trí bắt đầu), nên kết quả
+  không phụ thuộc số tiến trình hay thứ tự chạy.
+
+Mỗi chunk được sinh và ghi bằng insert_many(ordered=False) trong một tiến trình
+con (pymongo đồng bộ), các chunk chạy song song. Document được dựng bằng
+`model_construct` cho nhanh; document đầu tiên của mỗi chunk được validate đầy đủ
+bằng model để phát hiện sai lệch schema.
+"""
+import os
+import random
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pymongo import MongoClient
+
+import server
+from search import fold_text, task_search_fields
+
+NAMESPACE = uuid.UUID("6f1c1f0e-3f55-4a9e-9a57-3b0c2d7f5a10")
+
+# Mật khẩu chung của các user giả lập
+SYNTHETIC_PASSWORD = "synthetic"
+
+TASK_STATUSES = (["todo", "in_progress", "review", "completed"], [35, 25, 10, 30])
+TASK_PRIORITIES = (["low", "medium", "high", "urgent"], [20, 50, 22, 8])
+PROJECT_STATUSES = (["planning", "in_progress", "on_hold", "completed", "cancelled"], [15, 45, 10, 25, 5])
+INVOICE_STATUSES = (["draft", "sent", "paid", "overdue", "cancelled"], [10, 25, 50, 10, 5])
+CONTRACT_STATUSES = (["draft", "sent", "signed", "active", "expired", "terminated"], [5, 5, 10, 50, 25, 5])
+USER_ROLES = (["admin", "account", "creative", "staff"], [2, 15, 40, 43])
+INDUSTRIES = ["Bán lẻ", "F&B", "Giáo dục", "Bất động sản", "Công nghệ", "Mỹ phẩm", "Du lịch", "Tài chính"]
+TEMPLATE_CATEGORIES = ["SEO", "Quảng cáo", "Social media", "Nội dung", "Thiết kế", "Website"]
+COMPONENT_TYPES = ["text", "checklist", "file_upload", "approval"]
+# Số tháng gần nhất có hóa đơn
+INVOICE_MONTHS = 24
+
+WORDS = (
+    "thiết kế banner quảng cáo đề xuất nội dung bài viết chiến dịch facebook báo cáo tháng "
+    "khách hàng duyệt video landing page sửa logo đăng tải hình ảnh kịch bản tối ưu seo "
+    "từ khóa ngân sách lịch đăng bài tiktok livestream sản phẩm mới khuyến mãi thương hiệu"
+).split()
+
+# Tiêu đề, mô tả, đoạn nội dung sinh sẵn kèm bản đã chuẩn hóa cho field `search`
+_POOL_RNG = random.Random(20240601)
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+TITLES = [_sentence(_POOL_RNG, _POOL_RNG.randint(3, 8)).capitalize() for _ in range(500)]
+DESCRIPTIONS = [_sentence(_POOL_RNG, _POOL_RNG.randint(10, 40)) for _ in range(500)]
+PARAGRAPHS = [_sentence(_POOL_RNG, _POOL_RNG.randint(20, 80)) for _ in range(300)]
+FOLDED_TITLES = [fold_text(value) for value in TITLES]
+FOLDED_DESCRIPTIONS = [fold_text(value) for value in DESCRIPTIONS]
+FOLDED_PARAGRAPHS = [fold_text(value) for value in PARAGRAPHS]
+
+
+@dataclass
+class DatasetConfig:
+    seed: int = 42
+    users: int = 200
+    clients: int = 2_000
+    projects: int = 10_000
+    tasks: int = 1_000_000
+    feedbacks: int = 100_000
+    contracts: int = 5_000
+    invoices: int = 50_000
+    templates: int = 200
+    services_per_template: int = 8
+    tasks_per_service: int = 6
+    components_per_task: int = 4
+    chunk_size: int = 10_000
+    hashed_password: str = ""
+    # Ngày "hiện tại" của bộ dữ liệu; cố định để kết quả xác định
+    now: datetime = datetime(2025, 1, 1)
+
+
+def entity_id(config: DatasetConfig, kind: str, index: int) -> str:
+    return str(uuid.uuid5(NAMESPACE, f"{config.seed}:{kind}:{index}"))
+
+
+def _weighted(rng: random.Random, choices) -> str:
+    values, weights = choices
+    return rng.choices(values, weights)[0]
+
+
+def _skewed_index(rng: random.Random, count: int, power: float = 2.0) -> int:
+    """Chỉ số lệch về phía đầu danh sách: số ít user/project/client chiếm phần lớn công việc"""
+    return min(count - 1, int(count * rng.random() ** power))
+
+
+def project_client_index(config: DatasetConfig, project: int) -> int:
+    """Client của project tính lại được từ chỉ số project (dùng cho contract/invoice)"""
+    return _skewed_index(random.Random(f"{config.seed}:project_client:{project}"), config.clients)
+
+
+def _rich_content(rng: random.Random):
+    """rich_content có độ dài lognormal; khoảng 30% task không có nội dung"""
+    if rng.random() < 0.3:
+        return None, ""
+    count = max(1, min(60, int(rng.lognormvariate(1.2, 0.8))))
+    picks = [rng.randrange(len(PARAGRAPHS)) for _ in range(count)]
+    html = "".join(f"<p>{PARAGRAPHS[index]}</p>" for index in picks)
+    return html, " ".join(FOLDED_PARAGRAPHS[index] for index in picks)
+
+
+def _created_at(rng: random.Random, config: DatasetConfig, max_days: int = 730) -> datetime:
+    return config.now - timedelta(days=rng.random() * max_days)
+
+
+def build_users(rng, config, index):
+    return server.UserInDB.model_construct(
+        id=entity_id(config, "user", index), email=f"user{index}@crm-synthetic.com",
+        full_name=f"Nhân viên {index}", role="admin" if index == 0 else _weighted(rng, USER_ROLES),
+        created_at=_created_at(rng, config), is_active=rng.random() > 0.05,
+        hashed_password=config.hashed_password,
+    )
+
+
+def build_clients(rng, config, index):
+    created = _created_at(rng, config)
+    return server.Client.model_construct(
+        id=entity_id(config, "client", index), name=f"Khách hàng {index}", company=f"Công ty {index}",
+        industry=rng.choice(INDUSTRIES), size=rng.choice(["small", "medium", "large"]),
+        contact_name=f"Liên hệ {index}", contact_email=f"contact{index}@crm-synthetic.com",
+        tags=rng.sample(["vip", "retainer", "new", "b2b", "b2c"], rng.randint(0, 2)),
+        archived=rng.random() < 0.1, created_at=created, updated_at=created,
+        created_by=entity_id(config, "user", _skewed_index(rng, config.users)), version=0,
+    )
+
+
+def build_projects(rng, config, index):
+    start = _created_at(rng, config)
+    return server.Project.model_construct(
+        id=entity_id(config, "project", index), name=f"Dự án {index}",
+        client_id=entity_id(config, "client", project_client_index(config, index)),
+        description=rng.choice(DESCRIPTIONS), start_date=start,
+        end_date=start + timedelta(days=rng.randint(30, 365)), budget=round(rng.lognormvariate(17, 1), -3),
+        status=_weighted(rng, PROJECT_STATUSES), created_at=start, updated_at=start,
+        created_by=entity_id(config, "user", _skewed_index(rng, config.users)), version=0,
+    )
+
+
+def build_tasks(rng, config, index):
+    created = _created_at(rng, config, max_days=365)
+    status = _weighted(rng, TASK_STATUSES)
+    title, description = rng.randrange(len(TITLES)), rng.randrange(len(DESCRIPTIONS))
+    rich_content, folded_content = _rich_content(rng)
+    # Hạn chót phân bố quanh thời điểm tạo + vài tuần; task chưa xong có thể quá hạn
+    due_date = created + timedelta(days=rng.lognormvariate(2.5, 0.8)) if rng.random() < 0.85 else None
+    task = server.Task.model_construct(
+        id=entity_id(config, "task", index), title=TITLES[title],
+        project_id=entity_id(config, "project", _skewed_index(rng, config.projects)) if rng.random() < 0.95 else None,
+        description=DESCRIPTIONS[description], rich_content=rich_content,
+        assigned_to=entity_id(config, "user", _skewed_index(rng, config.users)) if rng.random() < 0.9 else None,
+        due_date=due_date, priority=_weighted(rng, TASK_PRIORITIES), status=status,
+        task_type=rng.choice(["design", "content", "ads", "seo", None]),
+        created_at=created, updated_at=created + timedelta(days=rng.random() * 10),
+        created_by=entity_id(config, "user", _skewed_index(rng, config.users)),
+        completion_date=created + timedelta(days=rng.random() * 30) if status == "completed" else None,
+        version=0,
+    )
+    document = task.model_dump()
+    document["search"] = {
+        "title": FOLDED_TITLES[title], "description": FOLDED_DESCRIPTIONS[description], "content": folded_content,
+    }
+    return document
+
+
+def build_feedbacks(rng, config, index):
+    return server.TaskFeedback.model_construct(
+        id=entity_id(config, "feedback", index),
+        task_id=entity_id(config, "task", _skewed_index(rng, config.tasks, power=1.5)),
+        message=rng.choice(DESCRIPTIONS), feedback_type=rng.choice(["comment", "comment", "approval", "file"]),
+        created_at=_created_at(rng, config, max_days=365),
+        created_by=entity_id(config, "user", _skewed_index(rng, config.users)), user_name=f"Nhân viên {index % 50}",
+    )
+
+
+def build_contracts(rng, config, index):
+    start = _created_at(rng, config)
+    project = _skewed_index(rng, config.projects)
+    return server.Contract.model_construct(
+        id=entity_id(config, "contract", index),
+        client_id=entity_id(config, "client", project_client_index(config, project)),
+        project_id=entity_id(config, "project", project),
+        title=f"Hợp đồng {index}", start_date=start, end_date=start + timedelta(days=rng.choice([90, 180, 365])),
+        value=round(rng.lognormvariate(18, 1), -3), status=_weighted(rng, CONTRACT_STATUSES),
+        created_at=start, updated_at=start, version=0,
+    )
+
+
+def _month_start(value: datetime) -> datetime:
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def invoice_month(config: DatasetConfig, bucket: int) -> Tuple[datetime, datetime]:
+    """Khoảng thời gian của tháng thứ `bucket` tính lùi từ config.now (0 là tháng gần nhất)"""
+    start = _month_start(config.now - timedelta(microseconds=1))
+    for _ in range(bucket):
+        start = _month_start(start - timedelta(days=1))
+    return start, min(_month_start(start + timedelta(days=32)), config.now)
+
+
+def build_invoices(rng, config, index):
+    # Hóa đơn chia đều vào INVOICE_MONTHS tháng gần nhất; trong mỗi tháng số thứ tự
+    # tăng dần theo thời gian như dãy INV-YYYYMM-XXXX do next_invoice_number sinh ra
+    months = max(1, min(INVOICE_MONTHS, config.invoices))
+    bucket, position = index % months, index // months
+    in_month = config.invoices // months + (1 if bucket < config.invoices % months else 0)
+    month_start, month_end = invoice_month(config, bucket)
+    created = month_start + (month_end - month_start) * ((position + rng.random()) / in_month)
+    status = _weighted(rng, INVOICE_STATUSES)
+    project = _skewed_index(rng, config.projects)
+    return server.Invoice.model_construct(
+        id=entity_id(config, "invoice", index),
+        client_id=entity_id(config, "client", project_client_index(config, project)),
+        project_id=entity_id(config, "project", project),
+        invoice_number=f"INV-{month_start:%Y%m}-{position + 1:04d}", title=f"Hóa đơn {index}",
+        amount=round(rng.lognormvariate(16, 1), -3), due_date=created + timedelta(days=30), status=status,
+        paid_date=created + timedelta(days=rng.randint(1, 45)) if status == "paid" else None,
+        created_at=created, updated_at=created, version=0,
+    )
+
+
+def build_templates(rng, config, index):
+    created = _created_at(rng, config)
+    return server.ServiceTemplate.model_construct(
+        id=entity_id(config, "template", index), name=f"Gói dịch vụ {index}",
+        description=rng.choice(DESCRIPTIONS), category=rng.choice(TEMPLATE_CATEGORIES),
+        status="active" if rng.random() < 0.85 else "inactive", estimated_duration=rng.randint(7, 120),
+        base_price=round(rng.lognormvariate(17, 0.7), -3),
+        created_by=entity_id(config, "user", 0), created_at=created, updated_at=created,
+    )
+
+
+def build_services(rng, config, index):
+    template, position = divmod(index, config.services_per_template)
+    # Phụ thuộc vào service đứng trước trong cùng template (chuỗi công việc)
+    dependencies = [entity_id(config, "service", index - 1)] if position and rng.random() < 0.4 else []
+    return server.Service.model_construct(
+        id=entity_id(config, "service", index), template_id=entity_id(config, "template", template),
+        name=f"Dịch vụ {index}", order_index=position * server.ORDER_INDEX_GAP,
+        estimated_hours=rng.choice([4, 8, 16, 24, 40]), required_skills=rng.sample(WORDS, 2),
+        dependencies=dependencies, created_at=config.now, updated_at=config.now,
+    )
+
+
+def build_task_templates(rng, config, index):
+    service, position = divmod(index, config.tasks_per_service)
+    return server.TaskTemplate.model_construct(
+        id=entity_id(config, "task_template", index), service_id=entity_id(config, "service", service),
+        name=TITLES[rng.randrange(len(TITLES))], order_index=position * server.ORDER_INDEX_GAP,
+        estimated_hours=rng.choice([1, 2, 4, 8]), priority=rng.choice(["low", "medium", "high"]),
+        required_deliverables=[],
+        created_at=config.now, updated_at=config.now,
+    )
+
+
+def build_components(rng, config, index):
+    task_template, position = divmod(index, config.components_per_task)
+    component_type = rng.choice(COMPONENT_TYPES)
+    data = {"items": rng.sample(WORDS, 4)} if component_type == "checklist" else {"text": rng.choice(DESCRIPTIONS)}
+    return server.TaskDetailComponent.model_construct(
+        id=entity_id(config, "component", index), task_template_id=entity_id(config, "task_template", task_template),
+        component_type=component_type, component_data=data, order_index=position * server.ORDER_INDEX_GAP,
+        required=rng.random() < 0.3, created_at=config.now, updated_at=config.now,
+    )
+
+
+# collection -> (model dùng để validate, hàm dựng document, hàm tính số lượng)
+GENERATORS: Dict[str, tuple] = {
+    "users": (server.UserInDB, build_users, lambda c: c.users),
+    "clients": (server.Client, build_clients, lambda c: c.clients),
+    "projects": (server.Project, build_projects, lambda c: c.projects),
+    "tasks": (server.Task, build_tasks, lambda c: c.tasks),
+    "task_feedbacks": (server.TaskFeedback, build_feedbacks, lambda c: c.feedbacks),
+    "contracts": (server.Contract, build_contracts, lambda c: c.contracts),
+    "invoices": (server.Invoice, build_invoices, lambda c: c.invoices),
+    "service_templates": (server.ServiceTemplate, build_templates, lambda c: c.templates),
+    "services": (server.Service, build_services, lambda c: c.templates * c.services_per_template),
+    "task_templates": (server.TaskTemplate, build_task_templates,
+                       lambda c: c.templates * c.services_per_template * c.tasks_per_service),
+    "task_detail_components": (server.TaskDetailComponent, build_components,
+                               lambda c: c.templates * c.services_per_template * c.tasks_per_service
+                               * c.components_per_task),
+}
+
+
+def generate_chunk(collection: str, config: DatasetConfig, start: int, stop: int) -> List[Dict[str, Any]]:
+    model, build, _ = GENERATORS[collection]
+    rng = random.Random(f"{config.seed}:{collection}:{start}")
+    documents = []
+    for index in range(start, stop):
+        document = build(rng, config, index)
+        documents.append(document if isinstance(document, dict) else document.model_dump())
+    if documents:
+        model.model_validate({key: value for key, value in documents[0].items() if key != "search"})
+        if collection == "tasks":
+            assert documents[0]["search"] == task_search_fields(documents[0]), "search field drifted"
+    return documents
+
+
+# Mỗi tiến trình con giữ một MongoClient
+_worker_db = None
+
+
+def _init_worker(mongo_url: str, db_name: str):
+    global _worker_db
+    _worker_db = MongoClient(mongo_url)[db_name]
+
+
+def _insert_chunk(collection: str, config: DatasetConfig, start: int, stop: int) -> int:
+    documents = generate_chunk(collection, config, start, stop)
+    _worker_db[collection].insert_many(documents, ordered=False)
+    return len(documents)
+
+
+def seed_dataset(config: DatasetConfig, mongo_url: str, db_name: str, workers: Optional[int] = None,
+                 progress: Callable[[str], None] = print) -> Dict[str, Dict[str, Any]]:
+    """Sinh và ghi toàn bộ dữ liệu; trả về số document và thời gian theo collection"""
+    if not config.hashed_password:
+        config.hashed_password = server.get_password_hash(SYNTHETIC_PASSWORD)
+    workers = workers or os.cpu_count() or 1
+    report = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(mongo_url, db_name)) as pool:
+        for collection, (_, _, count_of) in GENERATORS.items():
+            total = count_of(config)
+            started = time.perf_counter()
+            futures = [
+                pool.submit(_insert_chunk, collection, config, start, min(start + config.chunk_size, total))
+                for start in range(0, total, config.chunk_size)
+            ]
+            inserted = sum(future.result() for future in futures)
+            elapsed = time.perf_counter() - started
+            report[collection] = {
+                "documents": inserted,
+                "seconds": round(elapsed, 2),
+                "docs_per_second": round(inserted / elapsed) if elapsed else None,
+            }
+            progress(f"{collection}: {inserted} documents in {elapsed:.1f}s")
+    return report
+
+
+def config_summary(config: DatasetConfig) -> Dict[str, Any]:
+    summary = asdict(config)
+    summary["now"] = config.now.isoformat()
+    summary.pop("hashed_password")
+    return summary
@@ -0,0 +1,89 @@
+"""Fixture chung cho test cần MongoDB local.
+
+Test được bỏ qua nếu thiếu thư viện backend hoặc không kết nối được mongod.
+Database test lấy từ TEST_DB_NAME (mặc định `crm_test`) và bị xóa sau phiên test.
+"""
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ["DB_NAME"] = os.environ.get("TEST_DB_NAME", "crm_test")
+
+
+@pytest.fixture(scope="session")
+def loop():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop
+    loop.close()
+
+
+@pytest.fixture(scope="session")
+def server(loop):
+    pytest.importorskip("fastapi")
+    pymongo = pytest.importorskip("pymongo")
+    probe = pymongo.MongoClient(os.environ["MONGO_URL"], serverSelectionTimeoutMS=2000)
+    try:
+        probe.admin.command("ping")
+    except pymongo.errors.PyMongoError:
+        pytest.skip("local mongod is not available")
+    finally:
+        probe.close()
+
+    import server as server_module
+    loop.run_until_complete(server_module.client.drop_database(os.environ["DB_NAME"]))
+    yield server_module
+    loop.run_until_complete(server_module.client.drop_database(os.environ["DB_NAME"]))
+
+
+@pytest.fixture
+def run(loop):
+    return loop.run_until_complete
+
+
+@pytest.fixture
+def admin_user(server):
+    return server.User(email="admin@example.com", full_name="Admin User", role="admin")
+
+
+@pytest.fixture
+def command_recorder(server, monkeypatch):
+    """Chuyển server.db sang một client ghi lại mọi lệnh MongoDB gửi đi.
+
+    `commands` là danh sách (tên lệnh, nội dung lệnh); `count(tên lệnh, collection)`
+    đếm số lệnh theo loại.
+    """
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from pymongo import monitoring
+
+    class CommandRecorder(monitoring.CommandListener):
+        def __init__(self):
+            self.commands = []
+
+        def started(self, event):
+            self.commands.append((event.command_name, dict(event.command)))
+
+        def succeeded(self, event):
+            pass
+
+        def failed(self, event):
+            pass
+
+        def count(self, command_name, collection):
+            return sum(
+                1 for name, command in self.commands
+                if name == command_name and command.get(name) == collection
+            )
+
+    recorder = CommandRecorder()
+    client = AsyncIOMotorClient(server.mongo_url, event_listeners=[recorder])
+    monkeypatch.setattr(server, "db", client[server.db.name])
+    yield recorder
+    client.close()
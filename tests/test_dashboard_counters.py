@@ -0,0 +1,22 @@
+def test_reconcile_twice_reports_no_drift(server, run, admin_user):
+    async def scenario():
+        for collection in ("clients", "projects", "tasks", "invoices", "dashboard_counters"):
+            await server.db[collection].delete_many({})
+        customer = server.Client(name="Acme", company="Acme")
+        project = server.Project(name="Website", client_id=customer.id, status="in_progress")
+        await server.db.clients.insert_one(customer.dict())
+        await server.db.projects.insert_one(project.dict())
+        await server.db.tasks.insert_many([
+            server.Task(title=f"Task {i}", project_id=project.id, status=["todo", "completed"][i % 2]).dict()
+            for i in range(5)
+        ])
+
+        first = await server.reconcile_dashboard_counters()
+        second = await server.reconcile_dashboard_counters()
+        return first, second
+
+    first, second = run(scenario())
+
+    assert first["drift"]  # Chưa có document bộ đếm: mọi bộ đếm đều lệch
+    assert second["drift"] == {}
+    assert second["counters"]["tasks"]["status"] == {"todo": 3, "completed": 2}
@@ -0,0 +1,30 @@
+import asyncio
+
+
+def test_parallel_invoice_creation_has_unique_numbers(server, run, admin_user, command_recorder):
+    from indexes import ensure_indexes
+
+    async def scenario():
+        await server.db.invoices.delete_many({})
+        await server.db.counters.delete_many({})
+        await ensure_indexes(server.db)
+        customer = server.Client(name="Acme", company="Acme")
+        await server.db.clients.insert_one(customer.dict())
+        invoice = server.InvoiceCreate(
+            client_id=customer.id, title="Retainer", amount=100, due_date=server.datetime.utcnow()
+        )
+        return await asyncio.gather(*(
+            server.create_invoice(invoice, current_user=admin_user) for _ in range(1000)
+        ))
+
+    created = run(scenario())
+
+    numbers = [invoice.invoice_number for invoice in created]
+    assert len(set(numbers)) == 1000
+    assert sorted(int(number.rsplit("-", 1)[1]) for number in numbers) == list(range(1, 1001))
+
+    # O(1) mỗi lần tạo: không đếm hay quét collection invoices, chỉ một $inc trên counters
+    assert command_recorder.count("count", "invoices") == 0
+    assert command_recorder.count("aggregate", "invoices") <= 1  # seed dãy mới một lần
+    assert command_recorder.count("insert", "invoices") == 1000
+    assert command_recorder.count("findAndModify", "counters") <= 1000 + 2
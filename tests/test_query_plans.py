@@ -0,0 +1,202 @@
+"""Kiểm tra plan truy vấn của mọi route GET trong /api.
+
+Seed dữ liệu vào mongod local, gọi từng route qua ứng dụng ASGI, ghi lại các lệnh
+MongoDB mà route phát ra rồi explain("executionStats") từng lệnh. Test fail nếu
+một truy vấn có điều kiện lọc chạy COLLSCAN, hoặc số document phải đọc vượt quá
+QUERY_PLAN_MAX_RATIO lần số document trả về (chỉ xét find có lọc và pipeline
+$match không gộp nhóm).
+
+Route GET mới có tham số đường dẫn cần thêm giá trị vào `path_params`.
+"""
+import os
+from datetime import datetime, timedelta
+
+MAX_DOCS_EXAMINED_RATIO = float(os.environ.get("QUERY_PLAN_MAX_RATIO", "10"))
+
+EXPLAINED_COMMANDS = {"find", "aggregate", "count", "distinct"}
+
+# (route, collection) được phép COLLSCAN và lý do
+ALLOWED_COLLECTION_SCANS = {
+    ("/api/service-templates/categories", "service_templates"): "$group over every template",
+    ("/api/slow-queries", "slow_queries"): "capped collection read in $natural order",
+}
+
+# Các biến thể query string cho route có bộ lọc
+EXTRA_QUERIES = {
+    "/api/tasks/": [
+        "status=todo&priority=high", "search=banner&search_mode=text", "sort=-created_at", "sort=due_date&limit=20",
+    ],
+    "/api/clients/": ["sort=name"],
+    "/api/invoices/": ["sort=-created_at"],
+    "/api/service-templates": ["category=seo", "status=active"],
+    "/api/export/{collection}": ["status=todo", "format=csv&project_id={project_id}"],
+}
+
+
+async def asgi_get(app, path: str, query: str = ""):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+        "root_path": "", "headers": [], "client": ("127.0.0.1", 1), "server": ("test", 80),
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages[0]["status"]
+
+
+async def seed(server, admin_user):
+    """Dữ liệu đủ lớn để quét toàn collection khác hẳn truy vấn qua index"""
+    db = server.db
+    now = datetime.utcnow()
+    clients = [server.Client(name=f"Client {i}", company=f"Company {i}") for i in range(50)]
+    projects = [server.Project(name=f"Project {i}", client_id=clients[i % 50].id,
+                               status=["planning", "in_progress"][i % 2]) for i in range(200)]
+    tasks = [server.Task(
+        title=f"Thiết kế banner {i}", project_id=projects[i % 200].id, assigned_to=admin_user.id,
+        due_date=now + timedelta(days=i % 40), status=["todo", "in_progress", "completed"][i % 3],
+        priority=["low", "medium", "high"][i % 3],
+    ) for i in range(3000)]
+    contracts = [server.Contract(
+        client_id=clients[i % 50].id, project_id=projects[i % 200].id, title=f"Contract {i}",
+        start_date=now, end_date=now + timedelta(days=i), value=1000, status="active",
+    ) for i in range(100)]
+    invoices = [server.Invoice(
+        client_id=clients[i % 50].id, project_id=projects[i % 200].id, contract_id=contracts[i % 100].id,
+        invoice_number=f"INV-TEST-{i:04d}", title=f"Invoice {i}", amount=100, due_date=now,
+    ) for i in range(300)]
+    feedback = [server.TaskFeedback(task_id=tasks[i % 100].id, message=f"Feedback {i}", created_by=admin_user.id,
+                                    user_name="Admin User") for i in range(200)]
+    templates = [server.ServiceTemplate(name=f"Template {i}", category=["seo", "ads"][i % 2],
+                                        created_by=admin_user.id) for i in range(20)]
+    services = [server.Service(template_id=templates[i % 20].id, name=f"Service {i}", order_index=i)
+                for i in range(100)]
+    task_templates = [server.TaskTemplate(service_id=services[i % 100].id, name=f"Task template {i}",
+                                          order_index=i) for i in range(400)]
+    components = [server.TaskDetailComponent(task_template_id=task_templates[i % 400].id,
+                                             component_type="checklist", order_index=i) for i in range(800)]
+
+    for collection, models in (
+        ("clients", clients), ("projects", projects), ("contracts", contracts), ("invoices", invoices),
+        ("task_feedbacks", feedback), ("service_templates", templates), ("services", services),
+        ("task_templates", task_templates), ("task_detail_components", components),
+    ):
+        await db[collection].insert_many([model.dict() for model in models])
+    await db.tasks.insert_many([{**task.dict(), "search": server.task_search_fields(task.dict())} for task in tasks])
+    await db.users.insert_one({**admin_user.dict(), "hashed_password": "x"})
+
+    return {
+        "client_id": clients[0].id,
+        "project_id": projects[0].id,
+        "task_id": tasks[0].id,
+        "user_id": admin_user.id,
+        "contract_id": contracts[0].id,
+        "invoice_id": invoices[0].id,
+        "template_id": templates[0].id,
+        "service_id": services[0].id,
+        "collection": "tasks",
+    }
+
+
+def collect_stages(explain, stages=None):
+    """Tên mọi stage trong plan thắng (bỏ qua rejectedPlans)"""
+    if stages is None:
+        stages = []
+    if isinstance(explain, dict):
+        if isinstance(explain.get("stage"), str):
+            stages.append(explain["stage"])
+        for key, value in explain.items():
+            if key not in ("rejectedPlans", "allPlansExecution"):
+                collect_stages(value, stages)
+    elif isinstance(explain, list):
+        for item in explain:
+            collect_stages(item, stages)
+    return stages
+
+
+def has_filter(command_name: str, command: dict) -> bool:
+    if command_name == "find":
+        return bool(command.get("filter"))
+    if command_name == "aggregate":
+        pipeline = command.get("pipeline") or [{}]
+        return bool(pipeline[0].get("$match"))
+    return bool(command.get("query"))
+
+
+def returns_documents(command_name: str, command: dict) -> bool:
+    """find có lọc hoặc pipeline $match không gộp nhóm: nReturned là số document thật.
+
+    Với $group/$count, nReturned là số nhóm nên tỷ lệ đọc/trả về không có ý nghĩa.
+    """
+    if command_name == "find":
+        return has_filter(command_name, command)
+    if command_name == "aggregate":
+        pipeline = command.get("pipeline") or []
+        return has_filter(command_name, command) and not any(
+            "$group" in stage or "$count" in stage or "$facet" in stage for stage in pipeline
+        )
+    return False
+
+
+def test_get_routes_use_indexes(server, run, admin_user, monkeypatch, command_recorder):
+    from fastapi.routing import APIRoute
+    from indexes import ensure_indexes
+    from slow_queries import SESSION_FIELDS, explain_summary
+
+    monkeypatch.setitem(server.app.dependency_overrides, server.get_current_user, lambda: admin_user)
+    monkeypatch.setitem(server.app.dependency_overrides, server.get_current_active_user, lambda: admin_user)
+
+    async def scenario():
+        await server.client.drop_database(server.db.name)
+        await ensure_indexes(server.db)
+        path_params = await seed(server, admin_user)
+        assert await server.refresh_task_search_ready()
+
+        requests = []
+        for route in server.app.routes:
+            if not isinstance(route, APIRoute) or "GET" not in route.methods or not route.path.startswith("/api"):
+                continue
+            missing = [name for name in route.param_convertors if name not in path_params]
+            assert not missing, f"{route.path}: add a seeded value for {missing} to path_params"
+            for query in [""] + EXTRA_QUERIES.get(route.path, []):
+                requests.append((route.path, route.path.format(**path_params), query.format(**path_params)))
+
+        problems = []
+        for template, path, query in requests:
+            command_recorder.commands.clear()
+            status = await asgi_get(server.app, path, query)
+            assert status == 200, f"GET {path}?{query} returned {status}"
+            for command_name, command in list(command_recorder.commands):
+                if command_name not in EXPLAINED_COMMANDS:
+                    continue
+                collection = command.get(command_name)
+                explain = await server.db.command({
+                    "explain": {key: value for key, value in command.items() if key not in SESSION_FIELDS},
+                    "verbosity": "executionStats",
+                })
+                summary = explain_summary(explain)
+                label = f"GET {path}?{query} -> {command_name} {collection}"
+                if (
+                    "COLLSCAN" in collect_stages(explain)
+                    and has_filter(command_name, command)
+                    and (template, collection) not in ALLOWED_COLLECTION_SCANS
+                ):
+                    problems.append(f"{label}: COLLSCAN {command}")
+                if not returns_documents(command_name, command):
+                    continue
+                examined = summary["docs_examined"] or 0
+                returned = max(summary["n_returned"] or 0, 1)
+                if examined / returned > MAX_DOCS_EXAMINED_RATIO:
+                    problems.append(f"{label}: examined {examined} docs for {returned} returned")
+        return requests, problems
+
+    requests, problems = run(scenario())
+
+    assert len(requests) > 30
+    assert not problems, "\n".join(problems)
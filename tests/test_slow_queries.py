@@ -0,0 +1,94 @@
+import json
+
+import pytest
+
+pytest.importorskip("pymongo")
+
+from slow_queries import explain_summary, query_shape, redact  # noqa: E402
+
+
+def test_redact_hides_nested_values_and_keeps_operators():
+    query = {
+        "status": "todo",
+        "due_date": {"$gte": "2025-01-01", "$lt": "2025-02-01"},
+        "$or": [{"title": {"$regex": "banner", "$options": "i"}}, {"assigned_to": "user-1"}],
+        "project_id": {"$in": ["p1", "p2", "p3"]},
+        "tags": [],
+        "meta": {"client": {"id": "c1"}},
+    }
+
+    assert redact(query) == {
+        "status": "?",
+        "due_date": {"$gte": "?", "$lt": "?"},
+        "$or": [{"title": {"$regex": "?", "$options": "?"}}, {"assigned_to": "?"}],
+        "project_id": {"$in": ["?"]},
+        "tags": [],
+        "meta": {"client": {"id": "?"}},
+    }
+
+
+def test_redact_keeps_structural_keys():
+    assert redact({"sort": {"created_at": -1}, "projection": {"_id": 0}}) == {
+        "sort": {"created_at": -1}, "projection": {"_id": 0},
+    }
+    pipeline = [{"$match": {"status": "todo"}}, {"$sort": {"due_date": 1}}, {"$project": {"title": 1}}]
+    assert redact(pipeline) == [
+        {"$match": {"status": "?"}}, {"$sort": {"due_date": 1}}, {"$project": {"title": 1}},
+    ]
+
+
+def test_query_shape_drops_driver_fields_and_is_stable():
+    first = {
+        "find": "tasks", "filter": {"status": "todo", "project_id": {"$in": ["a"]}},
+        "sort": {"due_date": 1}, "limit": 20, "lsid": {"id": "session-1"}, "$db": "crm",
+        "batchSize": 101, "$clusterTime": {"clusterTime": 1},
+    }
+    second = {
+        "find": "tasks", "filter": {"status": "completed", "project_id": {"$in": ["b", "c"]}},
+        "sort": {"due_date": 1}, "limit": 50, "lsid": {"id": "session-2"}, "$db": "crm",
+    }
+
+    shape = query_shape("find", first)
+    assert shape == {
+        "find": "tasks", "filter": {"status": "?", "project_id": {"$in": ["?"]}},
+        "sort": {"due_date": 1}, "limit": "?",
+    }
+    assert json.dumps(shape, sort_keys=True) == json.dumps(query_shape("find", second), sort_keys=True)
+    # Giá trị của getMore là id cursor, không phải tên collection
+    assert query_shape("getMore", {"getMore": 123, "collection": "tasks"}) == {"getMore": "?", "collection": "?"}
+
+
+def test_explain_summary_for_find():
+    explain = {
+        "queryPlanner": {"winningPlan": {
+            "stage": "LIMIT", "inputStage": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}},
+        }},
+        "executionStats": {
+            "nReturned": 20, "totalKeysExamined": 25, "totalDocsExamined": 20, "executionTimeMillis": 3,
+        },
+    }
+
+    assert explain_summary(explain) == {
+        "stages": ["LIMIT", "FETCH", "IXSCAN"],
+        "n_returned": 20,
+        "keys_examined": 25,
+        "docs_examined": 20,
+        "execution_ms": 3,
+    }
+
+
+def test_explain_summary_for_aggregate_and_missing_stats():
+    explain = {"stages": [
+        {"$cursor": {
+            "queryPlanner": {"winningPlan": {"queryPlan": {"stage": "COLLSCAN"}}},
+            "executionStats": {"nReturned": 3, "totalKeysExamined": 0, "totalDocsExamined": 3000},
+        }},
+        {"$group": {}},
+    ]}
+
+    summary = explain_summary(explain)
+    assert summary["stages"] == ["COLLSCAN"]
+    assert (summary["n_returned"], summary["docs_examined"], summary["execution_ms"]) == (3, 3000, None)
+    assert explain_summary({}) == {
+        "stages": [], "n_returned": None, "keys_examined": None, "docs_examined": None, "execution_ms": None,
+    }